@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Allocation Benchmark - Memory allocated per block on the capture/broadcast path
+
+Under tracemalloc, measures the memory each streamed block leaves behind
+in two places:
+  ring        a BlockRing driven the way the capture callback and the
+              broadcaster use it (write a block, take the cached view for
+              every listener)
+  broadcast   server.py's own capture callback and audio_broadcast() task,
+              fanning each block out to in-process listeners whose send()
+              only takes the message
+The hot path is designed to allocate nothing in steady state. The check
+fails (exit status 1) when either path keeps more than BUDGET_BYTES per
+block.
+"""
+
+import os
+import sys
+import asyncio
+import argparse
+import tracemalloc
+import numpy as np
+
+SRC_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'src'))
+sys.path.insert(0, SRC_DIR)
+from audio_ring import BlockRing
+
+CHANNELS = 2
+BUDGET_BYTES = 64         # Kept per block before the check fails (allocator noise, not per-block buffers)
+WARMUP_BLOCKS = 512       # Fills the ring and the tracer before measuring
+
+
+class Status:
+    """Stands in for sounddevice's CallbackFlags"""
+    input_overflow = False
+
+
+class Socket:
+    """An in-process listener connection: send() takes the message and drops it"""
+    remote_address = ('127.0.0.1', 0)
+
+    def __init__(self):
+        self.sent = 0
+
+    async def send(self, message):
+        self.sent += 1
+
+    async def close(self, code=1000, reason=''):
+        pass
+
+
+def kept(before, after, blocks, prefix):
+    """Bytes / allocations per block still held at the end, from files under ``prefix``"""
+    stats = [s for s in after.compare_to(before, 'lineno') if s.traceback[0].filename.startswith(prefix)]
+    size = sum(max(s.size_diff, 0) for s in stats)
+    count = sum(max(s.count_diff, 0) for s in stats)
+    return {
+        'bytes_per_block': round(size / blocks, 2),
+        'allocations_per_block': round(count / blocks, 3),
+        'top': [str(s) for s in stats[:5] if s.size_diff > 0]
+    }
+
+
+def run_ring(block=512, blocks=5000, listeners=16, slots=256):
+    """Bytes / allocations per block for ring writes plus fan-out view lookups"""
+    ring = BlockRing(slots, block, CHANNELS)
+    indata = np.zeros((block, CHANNELS), dtype=np.int16)
+    sent = [None] * listeners
+
+    # Warm up so one-time caches do not count
+    for _ in range(slots):
+        ring.write(indata)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for _ in range(blocks):
+        ring.write(indata)
+        view = ring.view(ring.seq - 1)
+        for i in range(listeners):
+            sent[i] = view
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    return kept(before, after, blocks, SRC_DIR)
+
+
+async def broadcast(server, blocks, listeners):
+    room = server.Room('alloc')
+    server.event_loop = asyncio.get_running_loop()
+    room.start_broadcast()
+    await asyncio.sleep(0)  # Let the broadcaster start before the first block
+    sockets = [Socket() for _ in range(listeners)]
+    for ws in sockets:
+        room.add_client(server.Listener(ws, room))
+    indata = np.zeros((server.BLOCK, server.CHANNELS), dtype=np.int16)
+    status = Status()
+
+    async def stream(count):
+        for _ in range(count):
+            expected = sockets[-1].sent + 1
+            room.capture_callback(indata, server.BLOCK, None, status)
+            while sockets[-1].sent < expected:
+                await asyncio.sleep(0)
+
+    try:
+        await stream(WARMUP_BLOCKS)
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        await stream(blocks)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+    finally:
+        await room.shutdown()
+    return kept(before, after, blocks, SRC_DIR)
+
+
+def run_broadcast(block=512, blocks=5000, listeners=16):
+    """Bytes / allocations per block for the capture callback plus audio_broadcast() to ``listeners``"""
+    # server.py reads its options at import; pacing and load shedding would change what the fan-out does per block
+    argv = sys.argv
+    sys.argv = ['server.py', '--pace-rate', '0', '--shed-high', '0']
+    try:
+        import server
+    finally:
+        sys.argv = argv
+    server.logger.disabled = True
+    if server.BLOCK != block:
+        raise ValueError(f"server.py streams {server.BLOCK}-frame blocks")
+    return asyncio.run(broadcast(server, blocks, listeners))
+
+
+def run(block=512, blocks=5000, listeners=16):
+    """{'ring': {...}, 'broadcast': {...}, 'passed': bool} - bytes / allocations kept per block"""
+    results = {'ring': run_ring(block, blocks, listeners), 'broadcast': run_broadcast(block, blocks, listeners)}
+    results['passed'] = all(r['bytes_per_block'] <= BUDGET_BYTES for r in results.values())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure allocations on the streaming hot path")
+    parser.add_argument('--block', type=int, default=512)
+    parser.add_argument('--blocks', type=int, default=5000)
+    parser.add_argument('--listeners', type=int, default=16)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("  ALLOCATION BENCHMARK (tracemalloc)")
+    print("=" * 70)
+    results = run(args.block, args.blocks, args.listeners)
+    for name in ('ring', 'broadcast'):
+        r = results[name]
+        print(f"  {name:<10} {r['bytes_per_block']} bytes / block, {r['allocations_per_block']} allocations / block")
+        for line in r['top']:
+            print(f"    {line}")
+    print("=" * 70)
+    print(f"  {'PASS' if results['passed'] else 'FAIL'}: budget {BUDGET_BYTES} bytes kept per block")
+    sys.exit(0 if results['passed'] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+First Audio Benchmark - Time to first audio and early underruns for joining players
+
+Starts server.py and lets a group of simulated players join, each at a
+random moment. Every player records when its blocks arrive; playback is
+then replayed offline the way web/client.html plays: the first block is
+scheduled PLAY_LEAD after it is there, and an underrun is counted whenever
+a block arrives after the audio before it has finished. Scenarios:
+  cold       no prebuffer burst (--prebuffer-ms 0), Play opens the connection
+  burst      the server's prebuffer burst, Play opens the connection
+  preopen    burst, and the connection was opened PREOPEN_S before Play
+             (the player pre-opens it on hover / touch / focus of the
+             Play button, a moment before the click); only the newest
+             TARGET_BUFFER seconds received before the click are kept
+Reports time to first audio (Play -> first sample scheduled to sound) and
+the mean number of underruns in the first STARTUP_WINDOW_S seconds.
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', '..', 'src'))
+
+from bench_transport import start_server, stop_server
+from stream_client import StreamClient
+
+SCENARIOS = ('cold', 'burst', 'preopen')
+PLAY_LEAD = 0.05          # As web/client.html: the first block plays this long after it is there
+TARGET_BUFFER = 0.25      # As web/client.html: kept while waiting for the click
+PREOPEN_S = 0.5           # Pointer on the Play button to the click
+STARTUP_WINDOW_S = 5.0
+
+
+def replay(clicked, arrivals, block_s):
+    """Play the arrivals back like the browser: (time to first audio in s, underruns in the window)"""
+    before = [a for a in arrivals if a < clicked][-max(1, int(TARGET_BUFFER / block_s)):]
+    queue = [clicked] * len(before) + [a for a in arrivals if a >= clicked]
+    if not queue:
+        return None, 0
+    started = queue[0] + PLAY_LEAD
+    play_end = started
+    underruns = 0
+    for arrival in queue:
+        if arrival > play_end:
+            if arrival < started + STARTUP_WINDOW_S:
+                underruns += 1
+            play_end = arrival + PLAY_LEAD
+        play_end += block_s
+    return started - clicked, underruns
+
+
+async def player(url, preopen_s, results):
+    await asyncio.sleep(random.random())
+    client = StreamClient(url, decode=False, report_interval=0)
+    opened = time.perf_counter()
+    clicked = opened + preopen_s
+    arrivals = []
+
+    async def consume():
+        async for _ in client:
+            arrivals.append(time.perf_counter())
+    try:
+        await asyncio.wait_for(consume(), preopen_s + STARTUP_WINDOW_S + 1)
+    except asyncio.TimeoutError:
+        pass
+    if client.block_seconds:
+        results.append((*replay(clicked, arrivals, client.block_seconds), client.gaps))
+
+
+async def scenario(name, url, players):
+    results = []
+    preopen_s = PREOPEN_S if name == 'preopen' else 0.0
+    await asyncio.gather(*(player(url, preopen_s, results) for _ in range(players)))
+    ttfa = np.array([r[0] * 1000 for r in results if r[0] is not None] or [np.nan])
+    return {
+        'players': len(results),
+        'ttfa_ms_p50': round(float(np.percentile(ttfa, 50)), 1),
+        'ttfa_ms_p90': round(float(np.percentile(ttfa, 90)), 1),
+        'underruns_mean': round(sum(r[1] for r in results) / max(1, len(results)), 2),
+        'clean_starts': sum(1 for r in results if r[1] == 0),
+        'gaps_total': sum(r[2] for r in results)
+    }
+
+
+def run(scenarios=None, players=10, options=(), port_http=5805, port_ws=9805):
+    """Results per scenario: {name: {ttfa_ms_p50, ttfa_ms_p90, underruns_mean, ...}}"""
+    results = {}
+    for name in scenarios or SCENARIOS:
+        server_options = list(options) + (['--prebuffer-ms', '0'] if name == 'cold' else [])
+        try:
+            proc = start_server(server_options, port_http, port_ws)
+        except RuntimeError as e:
+            results[name] = {'error': str(e)}
+            continue
+        try:
+            results[name] = asyncio.run(scenario(name, f'ws://127.0.0.1:{port_ws}/', players))
+        finally:
+            stop_server(proc)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark time to first audio for joining players")
+    parser.add_argument('scenarios', nargs='*', help=f"Scenarios: {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument('--players', type=int, default=10, help="Players joining per scenario")
+    parser.add_argument('--port-http', type=int, default=5805, help="Spare HTTP port for the test server")
+    parser.add_argument('--port-ws', type=int, default=9805, help="Spare WebSocket port for the test server")
+    parser.add_argument('--server', default='', help="Extra server.py options, e.g. \"--prebuffer-ms 400\"")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    print("=" * 70)
+    print(f"  FIRST AUDIO BENCHMARK - {args.players} players per scenario {args.server}")
+    print("=" * 70)
+    print(f"  {'scenario':<10} {'ttfa p50':>9} {'ttfa p90':>9} {'underruns':>10} {'clean':>6} {'gaps':>6}")
+    results = run(args.scenarios, args.players, args.server.split(), args.port_http, args.port_ws)
+    for name, r in results.items():
+        if 'error' in r:
+            print(f"  {name:<10} {r['error']}")
+            continue
+        print(f"  {name:<10} {r['ttfa_ms_p50']:>9} {r['ttfa_ms_p90']:>9} {r['underruns_mean']:>10} "
+              f"{r['clean_starts']:>3}/{r['players']:<2} {r['gaps_total']:>6}")
+    print("=" * 70)
+    print(f"  ttfa in ms from Play; underruns = mean per player in the first {STARTUP_WINDOW_S:.0f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Mixing Benchmark - Cost of mixing 2-8 capture sources per block
+
+Feeds synthetic blocks through src/mixer.py exactly like the capture
+callbacks do and reports the time spent in Mixer.mix() against the block
+period (the time budget the capture callback has for each block).
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'src'))
+from mixer import Mixer
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+
+
+def bench(sources, block, iterations):
+    """Time Mixer.mix() with `sources` inputs; returns per-block times in microseconds"""
+    mixer = Mixer(block, CHANNELS, [1.0 / sources] * sources)
+    rng = np.random.default_rng(0)
+    blocks = rng.integers(-20000, 20000, size=(sources, block, CHANNELS), dtype=np.int16)
+
+    # Prime the jitter buffers so every source contributes from the first block
+    for _ in range(mixer.jitter_blocks):
+        for i in range(sources - 1):
+            mixer.feed(i, blocks[i + 1])
+
+    times = np.empty(iterations)
+    for n in range(iterations):
+        for i in range(sources - 1):
+            mixer.feed(i, blocks[i + 1])
+        started = time.perf_counter_ns()
+        mixer.mix(blocks[0])
+        times[n] = (time.perf_counter_ns() - started) / 1000
+    return times
+
+
+def run(block=512, iterations=5000):
+    """Results for 2-8 sources: {sources: {mean_us, p99_us, max_us, p99_pct_of_period}}"""
+    period_us = block / SAMPLE_RATE * 1e6
+    results = {}
+    for sources in range(2, 9):
+        times = bench(sources, block, iterations)
+        p99 = float(np.percentile(times, 99))
+        results[sources] = {
+            'mean_us': round(float(times.mean()), 1),
+            'p99_us': round(p99, 1),
+            'max_us': round(float(times.max()), 1),
+            'p99_pct_of_period': round(p99 / period_us * 100, 2)
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark multi-source mixing")
+    parser.add_argument('--block', type=int, default=512, help="Frames per block")
+    parser.add_argument('--iterations', type=int, default=5000)
+    args = parser.parse_args()
+
+    period_us = args.block / SAMPLE_RATE * 1e6
+    print("=" * 70)
+    print(f"  MIXING BENCHMARK - block {args.block} frames ({period_us:.0f} µs period)")
+    print("=" * 70)
+    print(f"  {'sources':>8} {'mean µs':>10} {'p99 µs':>10} {'max µs':>10} {'% of period':>12}")
+
+    for sources, r in run(args.block, args.iterations).items():
+        print(f"  {sources:>8} {r['mean_us']:>10.1f} {r['p99_us']:>10.1f} {r['max_us']:>10.1f} "
+              f"{r['p99_pct_of_period']:>11.2f}%")
+
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
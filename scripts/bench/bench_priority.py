@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Priority Benchmark - Players' latency next to heavy tolerant consumers
+
+Starts server.py and measures a group of interactive listeners (players)
+in three scenarios:
+  alone          only the players
+  background     the same players plus many ?class=tolerant consumers
+                 (recorders, relays). These are served after the players, so
+                 the players' p99 latency should hardly move.
+  unclassed      the same consumers connecting as ordinary players, for comparison
+Reports capture-to-arrival latency, missing blocks and the largest number
+of blocks a player received within 50 ms. That is about 4 in steady state;
+more means a burst the server's send pacing should have spread out.
+On a single core the simulated clients compete with the server for the
+CPU, which inflates both background scenarios.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', '..', 'src'))
+
+from bench_transport import start_server, stop_server
+from stream_client import StreamClient
+
+SCENARIOS = ('alone', 'background', 'unclassed')
+BURST_WINDOW_S = 0.05
+
+
+async def listen(client, seconds, latencies, arrivals):
+    async def consume():
+        async for block in client:
+            now = time.time()
+            latencies.append((int(now * 1000) - block.captured_ms) & 0xFFFFFFFF)
+            arrivals.append(now)
+    try:
+        await asyncio.wait_for(consume(), seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+def max_burst(arrivals):
+    """Most blocks received within any BURST_WINDOW_S"""
+    if not arrivals:
+        return 0
+    a = np.array(arrivals)
+    return int((np.searchsorted(a, a + BURST_WINDOW_S) - np.arange(len(a))).max())
+
+
+async def scenario(name, url, interactive, tolerant, seconds):
+    players = [StreamClient(url, decode=False) for _ in range(interactive)]
+    background = [StreamClient(url, decode=False, listener_class='tolerant' if name == 'background' else None)
+                  for _ in range(0 if name == 'alone' else tolerant)]
+    latencies = [[] for _ in players]
+    arrivals = [[] for _ in players]
+    tasks = [listen(c, seconds, [], []) for c in background]
+    tasks += [listen(c, seconds, latencies[i], arrivals[i]) for i, c in enumerate(players)]
+    await asyncio.gather(*tasks)
+
+    # Skip the first second: blocks replayed or buffered on connect arrive late by design
+    skip = int(len(latencies[0]) / seconds) if latencies and latencies[0] else 0
+    latency = np.array([x for l in latencies for x in l[skip:]] or [np.nan], dtype=np.float64)
+    return {
+        'latency_p50_ms': round(float(np.percentile(latency, 50)), 1),
+        'latency_p99_ms': round(float(np.percentile(latency, 99)), 1),
+        'gaps_total': sum(c.gaps for c in players),
+        'burst_max': max(max_burst(a[skip:]) for a in arrivals) if arrivals else 0,
+        'background_blocks': sum(c.blocks for c in background)
+    }
+
+
+def run(scenarios=None, interactive=20, tolerant=100, seconds=10, options=(), port_http=5804, port_ws=9804):
+    """Results per scenario: {name: {latency_p50_ms, latency_p99_ms, gaps_total, burst_max, ...}}"""
+    results = {}
+    for name in scenarios or SCENARIOS:
+        try:
+            proc = start_server(list(options), port_http, port_ws)
+        except RuntimeError as e:
+            results[name] = {'error': str(e)}
+            continue
+        try:
+            results[name] = asyncio.run(scenario(name, f'ws://127.0.0.1:{port_ws}/',
+                                                 interactive, tolerant, seconds))
+        finally:
+            stop_server(proc)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark listener priorities and send pacing")
+    parser.add_argument('scenarios', nargs='*', help=f"Scenarios: {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument('--interactive', type=int, default=20, help="Players measured")
+    parser.add_argument('--tolerant', type=int, default=100, help="Background consumers")
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--port-http', type=int, default=5804, help="Spare HTTP port for the test server")
+    parser.add_argument('--port-ws', type=int, default=9804, help="Spare WebSocket port for the test server")
+    parser.add_argument('--server', default='', help="Extra server.py options, e.g. \"--pace-rate 0\"")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    print("=" * 70)
+    print(f"  PRIORITY BENCHMARK - {args.interactive} players, {args.tolerant} tolerant, "
+          f"{args.seconds:.0f} s per scenario {args.server}")
+    print("=" * 70)
+    print(f"  {'scenario':<12} {'lat p50':>8} {'lat p99':>8} {'gaps':>6} {'burst':>6} {'bg blocks':>10}")
+    results = run(args.scenarios, args.interactive, args.tolerant, args.seconds, args.server.split(),
+                  args.port_http, args.port_ws)
+    for name, r in results.items():
+        if 'error' in r:
+            print(f"  {name:<12} {r['error']}")
+            continue
+        print(f"  {name:<12} {r['latency_p50_ms']:>8} {r['latency_p99_ms']:>8} {r['gaps_total']:>6} "
+              f"{r['burst_max']:>6} {r['background_blocks']:>10}")
+    print("=" * 70)
+    print(f"  latency in ms from capture to arrival; burst = most blocks within {BURST_WINDOW_S * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Reconnect Storm Benchmark - Time until every listener is back after a restart
+
+Starts server.py, connects N simulated listeners (src/stream_client.py,
+with the same jittered backoff as the browser player), waits until all of
+them stream, then kills the server and starts a fresh one on the same
+ports. Reports how long it took until each listener received audio from
+the new server, plus the new server's admission counters (admitted,
+delayed, turned away with a retry-after).
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import urllib.request
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', '..', 'src'))
+
+from bench_transport import start_server, stop_server
+from stream_client import StreamClient
+
+
+async def listen(client, state):
+    async for _ in client:
+        if client.stream_id != state['old_stream'] and client not in state['recovered'] \
+                and state['restarted_at'] is not None:
+            state['recovered'][client] = time.perf_counter() - state['restarted_at']
+        if state['old_stream'] is None:
+            state['connected'].add(client)
+
+
+async def storm(listeners, options, port_http, port_ws, timeout):
+    url = f'ws://127.0.0.1:{port_ws}/'
+    state = {'old_stream': None, 'restarted_at': None, 'recovered': {}, 'connected': set()}
+    proc = start_server(options, port_http, port_ws)
+    clients = [StreamClient(url, decode=False) for _ in range(listeners)]
+    tasks = [asyncio.ensure_future(listen(c, state)) for c in clients]
+    try:
+        deadline = time.perf_counter() + timeout
+        while len(state['connected']) < listeners and time.perf_counter() < deadline:
+            await asyncio.sleep(0.1)
+        connected = len(state['connected'])
+        state['old_stream'] = clients[0].stream_id
+
+        # Restart: every listener loses its connection at the same moment
+        stop_server(proc)
+        state['restarted_at'] = time.perf_counter()
+        proc = await asyncio.get_running_loop().run_in_executor(None, start_server, options, port_http, port_ws)
+        server_ready_s = time.perf_counter() - state['restarted_at']
+
+        deadline = time.perf_counter() + timeout
+        while len(state['recovered']) < connected and time.perf_counter() < deadline:
+            await asyncio.sleep(0.1)
+        with urllib.request.urlopen(f'http://127.0.0.1:{port_http}/api/status', timeout=2) as r:
+            admission = json.load(r).get('admission')
+    finally:
+        for c in clients:
+            await c.close()
+        for t in tasks:
+            t.cancel()
+        stop_server(proc)
+
+    times = np.array(sorted(state['recovered'].values()) or [np.nan])
+    return {
+        'listeners': listeners,
+        'connected_before': connected,
+        'recovered': len(state['recovered']),
+        'server_ready_s': round(server_ready_s, 2),
+        'all_back_s': round(float(times.max()), 2) if len(state['recovered']) == connected else None,
+        'p50_s': round(float(np.percentile(times, 50)), 2),
+        'p90_s': round(float(np.percentile(times, 90)), 2),
+        'admission': admission
+    }
+
+
+def run(listeners=100, options=(), port_http=5803, port_ws=9803, timeout=60):
+    """One restart with ``listeners`` connected; recovery times measured from the restart"""
+    return asyncio.run(storm(listeners, list(options), port_http, port_ws, timeout))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure recovery from a reconnect storm")
+    parser.add_argument('--listeners', type=int, default=100)
+    parser.add_argument('--port-http', type=int, default=5803, help="Spare HTTP port for the test server")
+    parser.add_argument('--port-ws', type=int, default=9803, help="Spare WebSocket port for the test server")
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('server_options', nargs=argparse.REMAINDER,
+                        help="Extra server.py options after --, e.g. -- --accept-rate 20")
+    args = parser.parse_args()
+    options = [o for o in args.server_options if o != '--']
+
+    print("=" * 70)
+    print(f"  RECONNECT STORM - {args.listeners} listeners {' '.join(options)}")
+    print("=" * 70)
+    result = run(args.listeners, options, args.port_http, args.port_ws, args.timeout)
+    for key, value in result.items():
+        print(f"  {key:<18} {value}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Slow Reader Check - Listeners that do not keep up must not hold up the others
+
+Starts server.py with a small socket send buffer and connects a group of
+ordinary listeners next to slow readers, which read only a trickle after
+the handshake (their receive buffers are tiny too, so their sockets stay
+backed up). A latency probe starts every PROBE_INTERVAL so control
+messages go out in front of blocks. The server must skip blocks for the
+slow readers: a send that pushed a socket past the write limit would wait
+for that reader to drain, and every listener after it would fall silent.
+Passes when every ordinary listener received blocks with no gaps and no
+arrival gap longer than MAX_STALL_MS; exits with status 1 otherwise.
+"""
+
+import os
+import sys
+import time
+import base64
+import socket
+import asyncio
+import argparse
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', '..', 'src'))
+
+from bench_transport import start_server, stop_server
+from stream_client import StreamClient
+
+MAX_STALL_MS = 250        # Longest silence an ordinary listener may see
+SMALL_BUFFER = 4096       # Socket buffers of the slow connection (bytes)
+SLOW_READ_BYTES = 256     # The slow listener reads this much ...
+SLOW_READ_INTERVAL = 0.02 # ... this often: about 13 kB/s of a 176 kB/s stream
+PROBE_INTERVAL = 0.05
+
+
+async def listen(client, seconds, longest):
+    async def consume():
+        last = None
+        async for _ in client:
+            now = time.perf_counter()
+            if last is not None:
+                longest[client] = max(longest.get(client, 0.0), now - last)
+            last = now
+    try:
+        await asyncio.wait_for(consume(), seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def slow_reader(port_ws, seconds):
+    """A listener that completes the handshake and then reads far slower than the stream arrives"""
+    # The stream reader's limit keeps asyncio from buffering ahead on its behalf
+    reader, writer = await asyncio.open_connection('127.0.0.1', port_ws, limit=SLOW_READ_BYTES)
+    writer.get_extra_info('socket').setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SMALL_BUFFER)
+    key = base64.b64encode(os.urandom(16)).decode()
+    writer.write((f"GET / HTTP/1.1\r\nHost: 127.0.0.1:{port_ws}\r\nUpgrade: websocket\r\n"
+                  f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n").encode())
+    await reader.readuntil(b'\r\n\r\n')
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        await reader.read(SLOW_READ_BYTES)
+        await asyncio.sleep(SLOW_READ_INTERVAL)
+    writer.close()
+
+
+async def probe(port_http, seconds):
+    """Latency probes add a control message in front of a block, the case the send check must include"""
+    loop = asyncio.get_running_loop()
+    request = urllib.request.Request(f'http://127.0.0.1:{port_http}/api/probe', data=b'{}',
+                                     headers={'Content-Type': 'application/json'}, method='POST')
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(PROBE_INTERVAL)
+        try:
+            await loop.run_in_executor(None, lambda: urllib.request.urlopen(request, timeout=2).close())
+        except OSError:
+            pass
+
+
+async def check(port_http, port_ws, listeners, slow, seconds):
+    url = f'ws://127.0.0.1:{port_ws}/'
+    clients = [StreamClient(url, decode=False) for _ in range(listeners)]
+    longest = {}
+    await asyncio.gather(probe(port_http, seconds), *(slow_reader(port_ws, seconds + 1) for _ in range(slow)),
+                         *(listen(c, seconds, longest) for c in clients))
+    return {
+        'listeners': listeners,
+        'blocks_min': min(c.blocks for c in clients),
+        'gaps_total': sum(c.gaps for c in clients),
+        'longest_silence_ms': round(max(longest.values(), default=0.0) * 1000, 1)
+    }
+
+
+def run(listeners=10, slow=10, seconds=10, options=(), port_http=5806, port_ws=9806):
+    """{listeners, blocks_min, gaps_total, longest_silence_ms, passed}"""
+    proc = start_server(['--sndbuf', str(SMALL_BUFFER), *options], port_http, port_ws)
+    try:
+        result = asyncio.run(check(port_http, port_ws, listeners, slow, seconds))
+    finally:
+        stop_server(proc)
+    expected = seconds * 44100 / 512 / 2  # Half the blocks of the run, however slow the machine
+    result['passed'] = (result['blocks_min'] >= expected and result['gaps_total'] == 0
+                        and result['longest_silence_ms'] <= MAX_STALL_MS)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that slow readers do not hold up the other listeners")
+    parser.add_argument('--listeners', type=int, default=10)
+    parser.add_argument('--slow', type=int, default=10, help="Slow readers")
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--port-http', type=int, default=5806, help="Spare HTTP port for the test server")
+    parser.add_argument('--port-ws', type=int, default=9806, help="Spare WebSocket port for the test server")
+    parser.add_argument('--server', default='', help="Extra server.py options")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"  SLOW READER CHECK - {args.listeners} listeners next to {args.slow} slow readers")
+    print("=" * 70)
+    result = run(args.listeners, args.slow, args.seconds, args.server.split(), args.port_http, args.port_ws)
+    for key, value in result.items():
+        print(f"  {key:<20} {value}")
+    print("=" * 70)
+    sys.exit(0 if result['passed'] else 1)
+
+
+if __name__ == "__main__":
+    main()
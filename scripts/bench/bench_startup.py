@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Startup Benchmark - Cold start of server.py until it listens and streams
+
+Launches the server on spare ports the way the launcher does and records
+wall-clock time from spawn until:
+  • listening  - the HTTP port accepts connections (STATUS LISTENING)
+  • ready      - capture is running (STATUS READY)
+plus the server's own phase timings from /api/status.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+import urllib.request
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'src')
+
+
+def port_open(port):
+    try:
+        with socket.create_connection(('127.0.0.1', port), timeout=0.05):
+            return True
+    except OSError:
+        return False
+
+
+def cold_start(port_http, port_ws, timeout):
+    """One cold start; returns {listening_s, ready_s, phases} (None where not reached)"""
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, 'server.py', '--port-http', str(port_http), '--port-ws', str(port_ws),
+         '--idle-timeout', '0'],
+        cwd=SRC_DIR, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        env={**os.environ, 'PYTHONUNBUFFERED': '1'}
+    )
+    result = {'listening_s': None, 'ready_s': None, 'phases': None}
+    try:
+        while time.perf_counter() - started < timeout and proc.poll() is None:
+            if result['listening_s'] is None and port_open(port_http):
+                result['listening_s'] = round(time.perf_counter() - started, 3)
+            if result['listening_s'] is not None:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port_http}/api/status', timeout=1) as r:
+                    status = json.load(r)
+                if status['state'] in ('ready', 'failed'):
+                    result['ready_s'] = round(time.perf_counter() - started, 3) if status['state'] == 'ready' else None
+                    result['phases'] = status['timings']
+                    break
+            time.sleep(0.01)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return result
+
+
+def run(runs=3, port_http=5801, port_ws=9801, timeout=30):
+    """Median listening / ready times over `runs` cold starts"""
+    samples = [cold_start(port_http, port_ws, timeout) for _ in range(runs)]
+
+    def median(key):
+        values = sorted(s[key] for s in samples if s[key] is not None)
+        return values[len(values) // 2] if values else None
+
+    return {'listening_s': median('listening_s'), 'ready_s': median('ready_s'), 'runs': samples}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark server cold start")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--port-http', type=int, default=5801, help="Spare HTTP port for the test server")
+    parser.add_argument('--port-ws', type=int, default=9801, help="Spare WebSocket port for the test server")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("  COLD START BENCHMARK")
+    print("=" * 70)
+    result = run(args.runs, args.port_http, args.port_ws)
+    for n, r in enumerate(result['runs'], 1):
+        print(f"  run {n}: listening {r['listening_s']} s, ready {r['ready_s']} s, phases {r['phases']}")
+    print("-" * 70)
+    print(f"  median: listening {result['listening_s']} s, ready {result['ready_s']} s")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
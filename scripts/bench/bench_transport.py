@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Transport Benchmark - Effect of event loop and socket options on delivery
+
+Starts server.py once per configuration (--loop, --tcp-nodelay, --sndbuf,
+--write-limit-blocks, --backlog) and runs the listener load test against
+it, reporting per-block latency (capture to arrival), arrival jitter,
+missing blocks and whether every listener got in - i.e. the impact of
+each option on latency and listener capacity.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, '..', '..', 'src')
+sys.path.insert(0, BENCH_DIR)
+
+import load_listeners
+from bench_startup import port_open
+
+CONFIGS = {
+    'baseline': ['--loop', 'asyncio'],
+    'uvloop': ['--loop', 'uvloop'],
+    'no-nodelay': ['--loop', 'asyncio', '--no-tcp-nodelay'],
+    'sndbuf-16k': ['--loop', 'asyncio', '--sndbuf', '16384'],
+    'write-limit-2': ['--loop', 'asyncio', '--write-limit-blocks', '2'],
+    'write-limit-32': ['--loop', 'asyncio', '--write-limit-blocks', '32'],
+    'backlog-16': ['--loop', 'asyncio', '--backlog', '16']
+}
+# Simulated listeners all come from 127.0.0.1: lift the listener caps unless a run sets them
+UNCAPPED = ['--max-per-ip', '0', '--max-listeners', '100000']
+
+
+def start_server(options, port_http, port_ws, timeout=30):
+    """Spawn server.py with ``options`` and wait until it streams; returns the process"""
+    proc = subprocess.Popen(
+        [sys.executable, 'server.py', '--port-http', str(port_http), '--port-ws', str(port_ws),
+         '--idle-timeout', '0', *UNCAPPED, *options],
+        cwd=SRC_DIR, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline and proc.poll() is None:
+        if port_open(port_http):
+            with urllib.request.urlopen(f'http://127.0.0.1:{port_http}/api/status', timeout=1) as r:
+                state = json.load(r)['state']
+            if state == 'ready':
+                return proc
+            if state == 'failed':
+                break
+        time.sleep(0.05)
+    stop_server(proc)
+    raise RuntimeError(f"server did not become ready with {' '.join(options) or 'defaults'}")
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def run(configs=None, listeners=50, seconds=10, port_http=5802, port_ws=9802):
+    """Load test results per configuration: {name: {latency_p50_ms, latency_p99_ms, ...}}"""
+    results = {}
+    for name in configs or CONFIGS:
+        try:
+            proc = start_server(CONFIGS[name], port_http, port_ws)
+        except RuntimeError as e:
+            results[name] = {'error': str(e)}
+            continue
+        try:
+            results[name] = load_listeners.run(f'ws://127.0.0.1:{port_ws}/', listeners, seconds, ramp=1.0)
+        finally:
+            stop_server(proc)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark event loop and socket options")
+    parser.add_argument('configs', nargs='*', help=f"Configurations: {', '.join(CONFIGS)} (default: all)")
+    parser.add_argument('--listeners', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--port-http', type=int, default=5802, help="Spare HTTP port for the test server")
+    parser.add_argument('--port-ws', type=int, default=9802, help="Spare WebSocket port for the test server")
+    args = parser.parse_args()
+    unknown = set(args.configs) - set(CONFIGS)
+    if unknown:
+        parser.error(f"unknown configuration(s): {', '.join(sorted(unknown))}")
+
+    print("=" * 70)
+    print(f"  TRANSPORT BENCHMARK - {args.listeners} listeners, {args.seconds:.0f} s per configuration")
+    print("=" * 70)
+    print(f"  {'config':<16} {'lat p50':>8} {'lat p99':>8} {'jit p99':>8} {'gaps':>6} {'missing':>8} {'Mbit/s':>8}")
+    results = run(args.configs, args.listeners, args.seconds, args.port_http, args.port_ws)
+    for name, r in results.items():
+        if 'error' in r:
+            print(f"  {name:<16} {r['error']}")
+            continue
+        print(f"  {name:<16} {r['latency_p50_ms']:>8} {r['latency_p99_ms']:>8} {r['jitter_p99_ms']:>8} "
+              f"{r['gaps_total']:>6} {r['never_connected']:>8} {r['mbit_per_s']:>8}")
+    print("=" * 70)
+    print("  latency in ms from capture to arrival; missing = listeners that never connected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Listener Load Test - Many simulated players against a running server
+
+Each listener is a StreamClient (src/stream_client.py) that does not decode
+or play: it receives blocks, answers pings and sends the same reports a
+browser would, so the server treats it as a real player. Reports blocks
+received, missing blocks, arrival jitter, reconnects and per-block latency
+(capture timestamp in the block header to arrival - meaningful when the
+listeners run on the server machine or on one with a synchronized clock).
+
+All listeners connect from one address, so the server under test needs
+--max-per-ip 0 (and --max-listeners when more should get in than its
+measured capacity). --start-server starts one like that on spare ports,
+with the options bench_transport.py uses.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'src'))
+from stream_client import StreamClient
+
+# Close reasons of a server turning listeners away because of its caps
+REFUSALS = ('full', 'too_many_connections')
+
+
+async def listen(client, seconds, latencies):
+    async def consume():
+        async for block in client:
+            latencies.append((int(time.time() * 1000) - block.captured_ms) & 0xFFFFFFFF)
+    try:
+        await asyncio.wait_for(consume(), seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def load(url, listeners, seconds, ramp, latencies):
+    clients = [StreamClient(url, decode=False) for _ in range(listeners)]
+    tasks = []
+    for client in clients:
+        tasks.append(asyncio.ensure_future(listen(client, seconds, latencies)))
+        await asyncio.sleep(ramp / max(listeners, 1))
+    await asyncio.gather(*tasks)
+    return [c.stats() for c in clients]
+
+
+def run(url='ws://127.0.0.1:9000/', listeners=20, seconds=30, ramp=2.0):
+    """Summary over all listeners: blocks, gaps, jitter and latency percentiles, reconnects, throughput"""
+    latencies = []
+    started = time.perf_counter()
+    stats = asyncio.run(load(url, listeners, seconds, ramp, latencies))
+    elapsed = time.perf_counter() - started
+    jitter = np.array([s['jitter_ms'] for s in stats])
+    blocks = np.array([s['blocks'] for s in stats])
+    # Skip the first second: replayed and buffered blocks arrive late by design
+    latency = np.array(latencies[int(len(latencies) / seconds):] or [np.nan], dtype=np.float64)
+    return {
+        'listeners': listeners,
+        'seconds': seconds,
+        'blocks_min': int(blocks.min()),
+        'blocks_median': int(np.median(blocks)),
+        'gaps_total': sum(s['gaps'] for s in stats),
+        'jitter_p50_ms': round(float(np.percentile(jitter, 50)), 2),
+        'jitter_p99_ms': round(float(np.percentile(jitter, 99)), 2),
+        'latency_p50_ms': round(float(np.percentile(latency, 50)), 1),
+        'latency_p99_ms': round(float(np.percentile(latency, 99)), 1),
+        'reconnects': sum(max(s['connects'] - 1, 0) for s in stats),
+        'never_connected': sum(1 for s in stats if s['connects'] == 0),
+        'refused': sum(1 for s in stats if s['last_error'] in REFUSALS),  # Some may get in later, on a retry
+        'tier_switches': sum(s['tier_switches'] for s in stats),
+        'mbit_per_s': round(sum(s['bytes'] for s in stats) * 8 / elapsed / 1e6, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many listeners")
+    parser.add_argument('--url', default='ws://127.0.0.1:9000/', help="Stream URL (ws://host:9000/ws/<room>)")
+    parser.add_argument('--listeners', type=int, default=20)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--ramp', type=float, default=2.0, help="Seconds over which listeners connect")
+    parser.add_argument('--start-server', action='store_true',
+                        help="Start server.py with the listener caps lifted and test it instead of --url")
+    parser.add_argument('--port-http', type=int, default=5807, help="Spare HTTP port for --start-server")
+    parser.add_argument('--port-ws', type=int, default=9807, help="Spare WebSocket port for --start-server")
+    args = parser.parse_args()
+
+    url, proc = args.url, None
+    if args.start_server:
+        from bench_transport import start_server, stop_server  # bench_transport imports this module
+        proc = start_server([], args.port_http, args.port_ws)
+        url = f'ws://127.0.0.1:{args.port_ws}/'
+
+    print("=" * 70)
+    print(f"  LISTENER LOAD TEST - {args.listeners} listeners for {args.seconds:.0f} s")
+    print("=" * 70)
+    try:
+        result = run(url, args.listeners, args.seconds, args.ramp)
+    finally:
+        if proc:
+            stop_server(proc)
+    for key, value in result.items():
+        print(f"  {key:<18} {value}")
+    print("=" * 70)
+    if result['refused']:
+        print(f"  {result['refused']} listener(s) were turned away by the server's listener caps.")
+        print("  Start the server with --max-per-ip 0 (and --max-listeners N), or use --start-server.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite - Run every benchmark and keep a history
+
+Runs the benchmarks in this directory and appends one JSON line per run to
+run/bench_history.jsonl, so results can be compared across changes.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+HISTORY_FILE = os.path.join(BENCH_DIR, '..', '..', 'run', 'bench_history.jsonl')
+sys.path.insert(0, BENCH_DIR)
+
+import bench_alloc
+import bench_mix
+import bench_startup
+import bench_transport
+import bench_reconnect
+import bench_priority
+import bench_first_audio
+import bench_slow_reader
+
+BENCHMARKS = {
+    'alloc': lambda quick: bench_alloc.run(blocks=1000 if quick else 5000),
+    'mix': lambda quick: bench_mix.run(iterations=500 if quick else 5000),
+    'startup': lambda quick: bench_startup.run(runs=1 if quick else 3),
+    'transport': lambda quick: bench_transport.run(listeners=10 if quick else 50, seconds=3 if quick else 10),
+    'reconnect': lambda quick: bench_reconnect.run(listeners=20 if quick else 100),
+    'priority': lambda quick: bench_priority.run(interactive=10 if quick else 20, tolerant=40 if quick else 100,
+                                                 seconds=3 if quick else 10),
+    'first_audio': lambda quick: bench_first_audio.run(players=5 if quick else 10),
+    'slow_reader': lambda quick: bench_slow_reader.run(slow=5 if quick else 10, seconds=3 if quick else 10)
+}
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument('names', nargs='*', help=f"Benchmarks to run: {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument('--quick', action='store_true', help="Fewer iterations")
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    record = {
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'revision': git_revision(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'results': {}
+    }
+
+    for name in args.names or BENCHMARKS:
+        print(f"▶ {name} ...", flush=True)
+        try:
+            record['results'][name] = BENCHMARKS[name](args.quick)
+        except Exception as e:
+            record['results'][name] = {'error': str(e)}
+        print(f"  {json.dumps(record['results'][name])[:300]}")
+
+    os.makedirs(os.path.dirname(HISTORY_FILE), exist_ok=True)
+    with open(HISTORY_FILE, 'a') as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"\n✅ Results appended to {os.path.normpath(HISTORY_FILE)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Benchmark Capture Devices - Rank candidates by how well they actually perform
+
+find_monitor_device.py picks a device by name. This opens every candidate
+(the system audio sources the server would capture from: monitor, pulse,
+default, loopback and similar inputs with 2+ channels; microphones are
+skipped) for a few seconds with the server's settings and measures:
+  • reported input latency
+  • callback jitter (spread of callback intervals vs. the block period)
+  • overflow rate
+  • actual sample rate (frames delivered per second of wall-clock time)
+  • signal level (a silent monitor is probably the wrong one)
+
+The ranking and the best device are written to config/device_config.json,
+which the server prefers at startup.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import numpy as np
+import sounddevice as sd
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+BLOCK = 512
+# As the server: names of sources that carry system audio rather than a microphone
+SYSTEM_AUDIO_KEYWORDS = ('monitor', 'pulse', 'default', 'loopback', 'stereo mix',
+                         'blackhole', 'soundflower', 'aggregate')
+
+
+def candidates(include_loopback):
+    """System audio inputs with 2+ channels (and WASAPI loopback outputs on Windows when requested).
+    Microphones are left out: a fast, quiet mic must not win over the system audio source."""
+    found = []
+    for i, dev in enumerate(sd.query_devices()):
+        name = dev['name'].lower()
+        if dev['max_input_channels'] >= CHANNELS and any(k in name for k in SYSTEM_AUDIO_KEYWORDS):
+            found.append({'id': i, 'name': dev['name'], 'loopback': False})
+        elif include_loopback and dev['max_output_channels'] > 0:
+            found.append({'id': i, 'name': dev['name'], 'loopback': True})
+    return found
+
+
+def measure(device, seconds, block):
+    """Open `device` for `seconds` and return its measurements (raises if it cannot open)"""
+    max_calls = int(seconds * SAMPLE_RATE / block) * 2 + 16
+    stamps = np.zeros(max_calls)
+    state = {'calls': 0, 'frames': 0, 'overflows': 0, 'energy': 0.0}
+
+    def callback(indata, frames, time_info, status):
+        n = state['calls']
+        if n < max_calls:
+            stamps[n] = time.perf_counter()
+        state['calls'] = n + 1
+        state['frames'] += frames
+        state['energy'] += float(np.square(indata, dtype=np.float64).sum())
+        if status.input_overflow:
+            state['overflows'] += 1
+
+    channels = CHANNELS
+    if not device['loopback']:
+        channels = min(CHANNELS, sd.query_devices(device['id'])['max_input_channels'])
+    extra = sd.WasapiSettings(loopback=True) if device['loopback'] else None
+
+    with sd.InputStream(device=device['id'], samplerate=SAMPLE_RATE, channels=channels,
+                        blocksize=block, dtype='int16', extra_settings=extra,
+                        callback=callback) as stream:
+        time.sleep(seconds)
+        latency = stream.latency
+
+    calls = min(state['calls'], max_calls)
+    if calls < 3:
+        raise RuntimeError("no audio callbacks received")
+
+    # The first callbacks include device start-up; measure from the second one
+    intervals = np.diff(stamps[1:calls]) * 1000
+    period = block / SAMPLE_RATE * 1000
+    elapsed = stamps[calls - 1] - stamps[1]
+    frames = (calls - 2) * block
+    rms = np.sqrt(state['energy'] / max(state['frames'] * channels, 1))
+
+    return {
+        'latency_ms': round(latency * 1000, 2),
+        'jitter_ms': round(float(np.std(intervals)), 3),
+        'jitter_p99_ms': round(float(np.percentile(np.abs(intervals - period), 99)), 3),
+        'overflows_per_min': round(state['overflows'] / seconds * 60, 2),
+        'measured_rate': round(frames / elapsed, 1) if elapsed > 0 else None,
+        'rate_error_ppm': round((frames / elapsed / SAMPLE_RATE - 1) * 1e6) if elapsed > 0 else None,
+        'signal_db': round(20 * np.log10(rms / 32768), 1) if rms > 0 else None
+    }
+
+
+def score(m):
+    """Lower is better: latency + jitter, heavily penalizing overflows and clock errors"""
+    return (m['latency_ms'] + 2 * m['jitter_p99_ms'] + 50 * m['overflows_per_min']
+            + abs(m['rate_error_ppm'] or 0) / 100 + (0 if m['signal_db'] is not None else 25))
+
+
+def save_device_config(best, ranking, path):
+    """Write the winner in the format the server (and test_audio.py) already read"""
+    config = {
+        'device_id': best['id'],
+        'device_name': best['name'],
+        'method': 'benchmark',
+        'loopback': best['loopback'],
+        'note': 'Best capture device measured by benchmark_devices.py',
+        'measured_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'ranking': ranking
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(config, f, indent=2)
+    print(f"\n✅ Configuration saved to {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark and rank capture devices")
+    parser.add_argument('--seconds', type=float, default=3.0, help="Measurement time per device")
+    parser.add_argument('--block', type=int, default=BLOCK, help="Frames per block (as the server)")
+    parser.add_argument('--devices', type=int, nargs='*', help="Only these device IDs")
+    parser.add_argument('--loopback', action='store_true',
+                        help="Windows: also try WASAPI loopback on output devices")
+    parser.add_argument('--dry-run', action='store_true', help="Do not write device_config.json")
+    args = parser.parse_args()
+
+    print("\n" + "="*70)
+    print("  Capture Device Benchmark")
+    print("="*70)
+    print("  Play some music while this runs - silent devices rank lower.\n")
+
+    devices = candidates(args.loopback and platform.system() == "Windows")
+    if args.devices:
+        devices = [d for d in devices if d['id'] in args.devices]
+
+    ranking = []
+    for dev in devices:
+        label = f"[{dev['id']}] {dev['name']}" + (" (loopback)" if dev['loopback'] else "")
+        print(f"🔍 {label} ...", end=" ", flush=True)
+        try:
+            m = measure(dev, args.seconds, args.block)
+        except Exception as e:
+            print(f"❌ {e}")
+            continue
+        m['score'] = round(score(m), 2)
+        ranking.append({**dev, **m})
+        print(f"latency {m['latency_ms']} ms, jitter p99 {m['jitter_p99_ms']} ms, "
+              f"overflows {m['overflows_per_min']}/min, rate {m['measured_rate']} Hz, "
+              f"signal {m['signal_db'] if m['signal_db'] is not None else 'silent'}")
+
+    if not devices:
+        print("❌ No system audio source found (monitor, pulse, default or loopback input with 2+ channels)")
+        if platform.system() == "Windows" and not args.loopback:
+            print("   Try --loopback, or enable Stereo Mix")
+        sys.exit(1)
+    if not ranking:
+        print("\n❌ No device could be opened")
+        sys.exit(1)
+
+    ranking.sort(key=lambda r: r['score'])
+    print("\n" + "="*70)
+    print(f"  {'#':>2} {'score':>7} {'lat ms':>7} {'jit ms':>7} {'ovf/min':>8}  device")
+    for n, r in enumerate(ranking, 1):
+        print(f"  {n:>2} {r['score']:>7} {r['latency_ms']:>7} {r['jitter_p99_ms']:>7} "
+              f"{r['overflows_per_min']:>8}  [{r['id']}] {r['name']}")
+    print("="*70)
+
+    best = ranking[0]
+    print(f"\n🏆 Best device: [{best['id']}] {best['name']}")
+    if not args.dry_run:
+        save_device_config(best, ranking, os.path.join('..', '..', 'config', 'device_config.json'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Monitor Levels - Live levels from the RUNNING streaming server
+
+Unlike test_audio.py this does not open the capture device a second time:
+it subscribes to the server's telemetry channel and shows the peak / RMS
+and spectrum the server measures on what it actually streams.
+"""
+
+import sys
+import json
+import asyncio
+import argparse
+import websockets
+
+BLOCKS = " ▁▂▃▄▅▆▇█"
+
+
+def meter(db, width=30):
+    """Horizontal bar for a dBFS value (-60 dB .. 0 dB)"""
+    filled = int(max(0.0, min(1.0, (db + 60) / 60)) * width)
+    return "█" * filled + "·" * (width - filled)
+
+
+def spectrum(bands_db):
+    """One character per band"""
+    return "".join(BLOCKS[int(max(0.0, min(1.0, (db + 60) / 60)) * (len(BLOCKS) - 1))] for db in bands_db)
+
+
+async def monitor(url):
+    print(f"Connecting to {url} (Ctrl+C to stop)\n")
+    async with websockets.connect(url) as ws:
+        async for message in ws:
+            d = json.loads(message)
+            lines = [f"  CH{ch + 1} {meter(peak)} peak {peak:6.1f} dB  rms {d['rms_db'][ch]:6.1f} dB"
+                     for ch, peak in enumerate(d['peak_db'])]
+            lines.append(f"  Spectrum {d['band_hz'][0]} Hz .. {spectrum(d['bands_db'])} .. 22 kHz")
+            sys.stdout.write("\n".join(lines) + f"\033[{len(lines) - 1}A\r")
+            sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show live levels from the running server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000, help="WebSocket port")
+    parser.add_argument('--room', default=None, help="Room name (default room when omitted)")
+    args = parser.parse_args()
+
+    url = f"ws://{args.host}:{args.port}/telemetry" + (f"/{args.room}" if args.room else "")
+    try:
+        asyncio.run(monitor(url))
+    except KeyboardInterrupt:
+        print("\n" * 4)
+    except (OSError, websockets.exceptions.WebSocketException) as e:
+        print(f"❌ Cannot reach the streaming server: {e}")
+        print("   Is it running? Start it with the launcher first.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Probe Latency - Measure capture-to-ear delay of every connected player
+
+Asks the RUNNING streaming server to mark the next captured block. Each
+player echoes when that block is audible (browser) or received (Python
+receiver), and the server splits the delay into device, server, network,
+player buffer and output latency. Run it a few times while music plays.
+"""
+
+import sys
+import json
+import time
+import argparse
+import urllib.error
+import urllib.request
+
+PARTS = ('device_ms', 'server_ms', 'network_ms', 'buffer_ms', 'output_ms')
+
+
+def api(url, payload=None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'},
+                                 method='POST' if data is not None else 'GET')
+    try:
+        with urllib.request.urlopen(req, timeout=5) as r:
+            return json.load(r)
+    except urllib.error.HTTPError as e:
+        return json.load(e)
+
+
+def probe(base, room, wait):
+    """Start one probe and return its report once every player answered (or ``wait`` expires)"""
+    started = api(f"{base}/api/probe", {'room': room})
+    if not started.get('success'):
+        raise RuntimeError(started.get('message', 'probe failed'))
+    deadline = time.monotonic() + wait
+    while True:
+        time.sleep(0.25)
+        report = next(p for p in api(f"{base}/api/probe?room={started['room']}")['probes'] if p['id'] == started['id'])
+        if (report['results'] and not report['pending']) or time.monotonic() > deadline:
+            return report
+
+
+def print_report(report):
+    print(f"  {'player':<22} {'tier':<5} " + " ".join(f"{p[:-3]:>8}" for p in PARTS) + f" {'total':>8}")
+    for r in report['results']:
+        print(f"  {r['address'] or '?':<22} {r['tier']:<5} " + " ".join(f"{r[p]:>8.1f}" for p in PARTS)
+              + f" {r['total_ms']:>8.1f}" + ("" if r['played'] else "  (not playing: receipt + buffer)"))
+    if report['pending']:
+        print(f"  {report['pending']} player(s) did not answer")
+    b = report['breakdown']
+    if b:
+        print(f"  {'median':<28} " + " ".join(f"{b[p]:>8.1f}" for p in PARTS) + f" {b['total_ms']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure capture-to-ear latency per player")
+    parser.add_argument('--host', default='127.0.0.1', help="Streaming server address")
+    parser.add_argument('--port', type=int, default=5001, help="Streaming server HTTP port")
+    parser.add_argument('--room', default=None, help="Room to probe (default: the main room)")
+    parser.add_argument('--count', type=int, default=3, help="Number of probes")
+    parser.add_argument('--wait', type=float, default=3.0, help="Seconds to wait for echoes")
+    args = parser.parse_args()
+    base = f"http://{args.host}:{args.port}"
+
+    print("\n" + "="*70)
+    print("  Capture-to-ear Latency (ms)")
+    print("="*70)
+    totals = []
+    for n in range(1, args.count + 1):
+        try:
+            report = probe(base, args.room, args.wait)
+        except (RuntimeError, OSError) as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        print(f"\nProbe {n} (block {report['seq']}):")
+        print_report(report)
+        if report['breakdown']:
+            totals.append(report['breakdown']['total_ms'])
+        time.sleep(0.5)
+
+    if totals:
+        print("\n" + "="*70)
+        print(f"  Median total over {len(totals)} probe(s): {sorted(totals)[len(totals) // 2]:.0f} ms")
+        print("="*70)
+
+
+if __name__ == "__main__":
+    main()
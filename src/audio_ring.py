@@ -0,0 +1,75 @@
+# audio_ring.py – Preallocated block ring shared by capture and broadcast
+import numpy as np
+
+# Every slot starts with a small header sent to clients as-is:
+#   uint32 sequence number (low 32 bits), uint32 capture wall-clock time (ms, low 32 bits)
+HEADER_BYTES = 8
+
+
+class BlockRing:
+    """[BlockRing] Fixed pool of audio blocks reused for every capture.
+
+    The capture callback copies each block into the next slot and bumps
+    ``seq``; readers address blocks by sequence number and send the cached
+    memoryview of the slot (header + int16 PCM), so the hot path never
+    allocates a new array or bytes object. A single writer is assumed (the
+    PortAudio callback thread) and readers take no locks: a block stays valid
+    until the writer wraps around to its slot, which ``available()`` checks.
+
+    With ``path`` the ring is backed by a memory-mapped file instead of
+    anonymous memory, which makes hours of history practical.
+    """
+
+    def __init__(self, slots, frames, channels, path=None):
+        self.slots = slots
+        self.frames = frames
+        self.channels = channels
+        slot_bytes = HEADER_BYTES + frames * channels * 2
+
+        if path:
+            self.buffers = np.memmap(path, dtype=np.uint8, mode='w+', shape=(slots, slot_bytes))
+        else:
+            self.buffers = np.zeros((slots, slot_bytes), dtype=np.uint8)
+
+        # Per-slot views are created once so nothing is built per block
+        self.headers = self.buffers[:, :HEADER_BYTES].view('<u4')
+        self.arrays = [self.buffers[i, HEADER_BYTES:].view(np.int16).reshape(frames, channels)
+                       for i in range(slots)]
+        self.views = [memoryview(self.buffers[i]) for i in range(slots)]
+        self.seq = 0          # sequence number of the next block to be written
+        self.first = 0        # sequence number of the first block written
+        self.overflows = 0
+
+    def start_at(self, seq):
+        """[BlockRing.start_at] Number blocks from ``seq`` on (before the first write)"""
+        self.seq = self.first = seq
+
+    def write(self, indata, overflowed=False, timestamp_ms=0):
+        """[BlockRing.write] Copy one captured block into the next slot"""
+        slot = self.seq % self.slots
+        np.copyto(self.arrays[slot], indata)
+        self.headers[slot, 0] = self.seq & 0xFFFFFFFF
+        self.headers[slot, 1] = timestamp_ms & 0xFFFFFFFF
+        if overflowed:
+            self.overflows += 1
+        self.seq += 1
+
+    def available(self, seq):
+        """[BlockRing.available] True if block ``seq`` is still held by the ring"""
+        return max(self.seq - self.slots, self.first - 1) < seq < self.seq
+
+    def oldest(self, margin=0):
+        """[BlockRing.oldest] Oldest readable sequence number, ``margin`` blocks clear of the writer"""
+        return max(self.seq - self.slots + 1 + margin, self.first)
+
+    def resolve(self, seq32):
+        """[BlockRing.resolve] Full sequence number for a 32-bit one seen by a client"""
+        return self.seq - ((self.seq - seq32) & 0xFFFFFFFF)
+
+    def view(self, seq):
+        """[BlockRing.view] Bytes view of block ``seq`` (valid until overwritten)"""
+        return self.views[seq % self.slots]
+
+    def array(self, seq):
+        """[BlockRing.array] NumPy view of block ``seq`` PCM (valid until overwritten)"""
+        return self.arrays[seq % self.slots]
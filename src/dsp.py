@@ -0,0 +1,248 @@
+# dsp.py – Per-stream processing chain applied once per captured block
+import time
+import numpy as np
+
+try:
+    from scipy.signal import lfilter  # Optional - needed for EQ and K-weighted loudness
+except ImportError:
+    lfilter = None
+
+
+def db_to_gain(db):
+    return 10.0 ** (db / 20.0)
+
+
+def peaking_biquad(freq, gain_db, q, rate):
+    """RBJ cookbook peaking EQ coefficients (b, a), normalized to a[0] = 1"""
+    a_gain = 10.0 ** (gain_db / 40.0)
+    w0 = 2 * np.pi * freq / rate
+    alpha = np.sin(w0) / (2 * q)
+    b = np.array([1 + alpha * a_gain, -2 * np.cos(w0), 1 - alpha * a_gain])
+    a = np.array([1 + alpha / a_gain, -2 * np.cos(w0), 1 - alpha / a_gain])
+    return b / a[0], a / a[0]
+
+
+def shelf_biquad(freq, gain_db, q, rate):
+    """RBJ cookbook high-shelf coefficients (b, a), normalized to a[0] = 1"""
+    a_gain = 10.0 ** (gain_db / 40.0)
+    w0 = 2 * np.pi * freq / rate
+    alpha = np.sin(w0) / (2 * q)
+    cos_w0, sqrt_a = np.cos(w0), np.sqrt(a_gain)
+    b = np.array([a_gain * ((a_gain + 1) + (a_gain - 1) * cos_w0 + 2 * sqrt_a * alpha),
+                  -2 * a_gain * ((a_gain - 1) + (a_gain + 1) * cos_w0),
+                  a_gain * ((a_gain + 1) + (a_gain - 1) * cos_w0 - 2 * sqrt_a * alpha)])
+    a = np.array([(a_gain + 1) - (a_gain - 1) * cos_w0 + 2 * sqrt_a * alpha,
+                  2 * ((a_gain - 1) - (a_gain + 1) * cos_w0),
+                  (a_gain + 1) - (a_gain - 1) * cos_w0 - 2 * sqrt_a * alpha])
+    return b / a[0], a / a[0]
+
+
+def highpass_biquad(freq, q, rate):
+    """RBJ cookbook high-pass coefficients (b, a), normalized to a[0] = 1"""
+    w0 = 2 * np.pi * freq / rate
+    alpha = np.sin(w0) / (2 * q)
+    cos_w0 = np.cos(w0)
+    b = np.array([(1 + cos_w0) / 2, -(1 + cos_w0), (1 + cos_w0) / 2])
+    a = np.array([1 + alpha, -2 * cos_w0, 1 - alpha])
+    return b / a[0], a / a[0]
+
+
+class Biquad:
+    """Stateful IIR section filtering (frames, channels) blocks along time"""
+
+    def __init__(self, b, a, channels):
+        self.b, self.a = b, a
+        self.state = np.zeros((2, channels))
+
+    def __call__(self, block):
+        out, self.state = lfilter(self.b, self.a, block, axis=0, zi=self.state)
+        return out
+
+
+class Gain:
+    """[Gain] Fixed gain in dB"""
+    name = 'gain'
+
+    def __init__(self, frames, channels, rate, db=0.0):
+        self.gain = np.float32(db_to_gain(db))
+
+    def process(self, block):
+        block *= self.gain
+
+
+class Limiter:
+    """[Limiter] Peak limiter with instant attack and exponential release.
+
+    The gain is decided once per block from the block peak; when it has to
+    rise again it is ramped across the block so releases do not click.
+    """
+    name = 'limiter'
+
+    def __init__(self, frames, channels, rate, threshold_db=-1.0, release_ms=80.0):
+        self.threshold = 32767 * db_to_gain(threshold_db)
+        self.release = np.exp(-frames / (rate * release_ms / 1000.0))
+        self.gain = 1.0
+        self.ramp = np.linspace(0.0, 1.0, frames, dtype=np.float32)[:, None]
+        self.envelope = np.empty((frames, 1), dtype=np.float32)
+        self.reduction_db = 0.0
+
+    def process(self, block):
+        peak = float(np.abs(block).max())
+        target = min(1.0, self.threshold / peak) if peak > 0 else 1.0
+
+        if target <= self.gain:
+            self.gain = target
+            block *= np.float32(target)
+        else:
+            previous = self.gain
+            self.gain = target + (previous - target) * self.release
+            # envelope = previous + (gain - previous) * ramp; the clip only guards rounding
+            np.multiply(self.ramp, self.gain - previous, out=self.envelope)
+            self.envelope += previous
+            block *= self.envelope
+            np.clip(block, -self.threshold, self.threshold, out=block)
+        self.reduction_db = float(-20 * np.log10(self.gain))
+
+
+class Loudness:
+    """[Loudness] EBU R128-style loudness normalization.
+
+    Short-term loudness is the mean energy of the last ``window`` seconds of
+    blocks (K-weighted when SciPy is installed, unweighted otherwise), with
+    an absolute gate at -70 LUFS so silence does not pump the gain up. The
+    correction moves towards the target by at most ``max_step_db`` per block
+    and is ramped across the block.
+    """
+    name = 'loudness'
+
+    def __init__(self, frames, channels, rate, target_lufs=-16.0, window=3.0,
+                 max_gain_db=12.0, max_step_db=0.05):
+        self.target = target_lufs
+        self.max_gain_db = max_gain_db
+        self.max_step_db = max_step_db
+        self.energies = np.zeros(max(int(window * rate / frames), 1))
+        self.gated = np.zeros(len(self.energies), dtype=bool)
+        self.index = 0
+        self.gain_db = 0.0
+        self.loudness = None
+        self.ramp = np.linspace(0.0, 1.0, frames, dtype=np.float32)[:, None]
+        self.envelope = np.empty((frames, 1), dtype=np.float32)
+
+        self.weighting = None
+        if lfilter is not None:
+            # ITU-R BS.1770 K-weighting: high shelf (+4 dB) then RLB high-pass
+            self.weighting = [Biquad(*shelf_biquad(1681.97, 4.0, 0.7072, rate), channels),
+                              Biquad(*highpass_biquad(38.13, 0.5003, rate), channels)]
+
+    def process(self, block):
+        weighted = block / 32768.0
+        if self.weighting:
+            for section in self.weighting:
+                weighted = section(weighted)
+
+        # BS.1770 sums channel mean squares
+        energy = float(np.square(weighted).mean(axis=0).sum())
+        self.energies[self.index] = energy
+        self.gated[self.index] = energy > 0 and -0.691 + 10 * np.log10(energy) > -70
+        self.index = (self.index + 1) % len(self.energies)
+
+        previous = self.gain_db
+        if self.gated.any():
+            self.loudness = float(-0.691 + 10 * np.log10(self.energies[self.gated].mean()))
+            wanted = min(self.target - self.loudness, self.max_gain_db)
+            self.gain_db += float(np.clip(wanted - self.gain_db, -self.max_step_db, self.max_step_db))
+
+        start, end = db_to_gain(previous), db_to_gain(self.gain_db)
+        np.multiply(self.ramp, end - start, out=self.envelope)
+        self.envelope += start
+        block *= self.envelope
+
+
+class Equalizer:
+    """[Equalizer] Peaking EQ bands: [{"freq": Hz, "gain_db": dB, "q": Q}] (needs SciPy)"""
+    name = 'eq'
+
+    def __init__(self, frames, channels, rate, bands=()):
+        if lfilter is None:
+            raise ValueError("EQ needs the 'scipy' package (pip install scipy)")
+        self.sections = [Biquad(*peaking_biquad(b['freq'], b.get('gain_db', 0.0), b.get('q', 1.0), rate), channels)
+                         for b in bands]
+
+    def process(self, block):
+        filtered = block
+        for section in self.sections:
+            filtered = section(filtered)
+        block[:] = filtered
+
+
+# Config key -> stage, in processing order
+STAGES = {
+    'gain': Gain,
+    'eq': Equalizer,
+    'loudness': Loudness,
+    'limiter': Limiter
+}
+
+
+class DspChain:
+    """[DspChain] Ordered processing stages run on each block in float32.
+
+    Built from a config dict such as::
+
+        {"gain": {"db": -3}, "eq": {"bands": [{"freq": 100, "gain_db": 3}]},
+         "loudness": {"target_lufs": -16}, "limiter": {"threshold_db": -1}}
+
+    Stages always run in the order of ``STAGES`` regardless of key order.
+    The int16 block is converted once into a preallocated float32 buffer,
+    every stage works on it in place, and the result is written back to a
+    preallocated int16 buffer. Each stage's CPU time is accumulated so the
+    cost of the chain is visible per stage.
+    """
+
+    def __init__(self, config, frames, channels, rate):
+        unknown = set(config) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown DSP stage(s): {', '.join(sorted(unknown))}")
+
+        self.config = config
+        self.stages = [cls(frames, channels, rate, **(config[key] or {}))
+                       for key, cls in STAGES.items() if key in config]
+        self.work = np.empty((frames, channels), dtype=np.float32)
+        self.output = np.empty((frames, channels), dtype=np.int16)
+        self.blocks = 0
+        self.stage_ns = [0] * len(self.stages)
+        self.stage_max_ns = [0] * len(self.stages)
+
+    def process(self, indata):
+        """[DspChain.process] Run every stage on one int16 block (result buffer is reused)"""
+        np.copyto(self.work, indata, casting='unsafe')
+
+        for i, stage in enumerate(self.stages):
+            started = time.perf_counter_ns()
+            stage.process(self.work)
+            elapsed = time.perf_counter_ns() - started
+            self.stage_ns[i] += elapsed
+            if elapsed > self.stage_max_ns[i]:
+                self.stage_max_ns[i] = elapsed
+
+        np.clip(self.work, -32768, 32767, out=self.work)
+        np.copyto(self.output, self.work, casting='unsafe')
+        self.blocks += 1
+        return self.output
+
+    def stats(self):
+        """[DspChain.stats] Per-stage CPU time per block and stage state"""
+        stages = []
+        for i, stage in enumerate(self.stages):
+            entry = {
+                'stage': stage.name,
+                'us_avg': round(self.stage_ns[i] / self.blocks / 1000, 1) if self.blocks else None,
+                'us_max': round(self.stage_max_ns[i] / 1000, 1)
+            }
+            if isinstance(stage, Limiter):
+                entry['reduction_db'] = round(stage.reduction_db, 2)
+            elif isinstance(stage, Loudness):
+                entry['loudness_lufs'] = round(stage.loudness, 1) if stage.loudness is not None else None
+                entry['gain_db'] = round(stage.gain_db, 2)
+            stages.append(entry)
+        return {'config': self.config, 'stages': stages}
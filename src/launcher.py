@@ -3,7 +3,19 @@ import subprocess
 import signal
 import os
 import sys
-from flask import Flask, send_from_directory, jsonify
+import json
+import socket
+import ipaddress
+import base64
+import urllib.error
+import urllib.parse
+import urllib.request
+import time
+import threading
+import queue
+from collections import deque
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from flask import Flask, send_from_directory, jsonify, request, Response
 import psutil
 import logging
 
@@ -21,39 +33,706 @@ CONTROL_PORT = 5000       # Launcher control panel port
 STREAM_PORT = 5001        # Audio streaming server port
 GITHUB_URL = "https://github.com/nikhilmishra243"  # Replace with your GitHub
 LINKEDIN_URL = "https://www.linkedin.com/in/nikhil-mishra-0039881a1"  # Replace with your LinkedIn
+STATUS_REFRESH_INTERVAL = 1.0  # Seconds between liveness checks of the audio server
+SSE_HEARTBEAT = 15             # Seconds between keep-alive comments on event streams
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PID_FILE = os.path.join(BASE_DIR, '..', 'run', 'server.pid')
+LOG_RING_SIZE = 2000      # Recent audio server output lines kept in memory
+LOG_PAGE_SIZE = 200       # Default/maximum lines per /api/admin/logs page
+LOG_FILE = None           # e.g. os.path.join(BASE_DIR, '..', 'logs', 'server.log') to also rotate to disk
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+WS_PORT = 9000            # Audio server WebSocket port (health probe target)
+
+# Supervisor - health-checks the audio server and restarts it on failure
+SUPERVISOR_ENABLED = True
+HEALTH_CHECK_INTERVAL = 2.0    # Seconds between health checks
+HEALTH_STARTUP_GRACE = 20.0    # Device probing can take a while after a (re)start
+HEALTH_FAILURE_THRESHOLD = 3   # Consecutive failed checks before restarting a live process
+MIN_BLOCK_RATE_RATIO = 0.5     # Capture counts as wedged below this fraction of the expected block rate
+RESTART_BACKOFF_INITIAL = 1.0
+RESTART_BACKOFF_MAX = 60.0
+RESTART_BACKOFF_RESET = 120.0  # Healthy seconds after which the backoff starts over
+STANDBY_ENABLED = False        # Keep a pre-warmed server (device already open) for instant failover
 
 def get_local_ip():
-    """Get local IP address"""
-    import socket
+    """Get local IP address from the network interfaces (no network round trip)"""
     try:
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        s.connect(("8.8.8.8", 80))
-        ip = s.getsockname()[0]
-        s.close()
-        return ip
-    except:
-        return "127.0.0.1"
+        stats = psutil.net_if_stats()
+        for name, addrs in psutil.net_if_addrs().items():
+            if name in stats and not stats[name].isup:
+                continue
+            for addr in addrs:
+                if addr.family == socket.AF_INET and ipaddress.ip_address(addr.address).is_private \
+                        and not addr.address.startswith(('127.', '169.254.')):
+                    return addr.address
+    except Exception as e:
+        logger.warning(f"[get_local_ip] Cannot list interfaces: {e}")
+    return "127.0.0.1"
 
 LOCAL_IP = get_local_ip()
 
+# ================== PROCESS TRACKING ==================
+def write_pid_file(pid):
+    """Record the audio server PID so a restarted launcher can adopt it"""
+    try:
+        os.makedirs(os.path.dirname(PID_FILE), exist_ok=True)
+        with open(PID_FILE, 'w') as f:
+            f.write(str(pid))
+    except OSError as e:
+        logger.warning(f"[write_pid_file] Could not write PID file: {e}")
+
+def clear_pid_file():
+    """Remove the PID file"""
+    try:
+        os.remove(PID_FILE)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"[clear_pid_file] Could not remove PID file: {e}")
+
+def adopt_from_pid_file():
+    """Return a handle for the server named in the PID file, if it is still alive"""
+    try:
+        with open(PID_FILE) as f:
+            pid = int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+    try:
+        proc = psutil.Process(pid)
+        if 'server.py' in ' '.join(proc.cmdline()):
+            logger.info(f"[adopt_from_pid_file] Adopted running audio server PID: {pid}")
+            return proc
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        pass
+
+    clear_pid_file()
+    return None
+
+def process_alive(proc):
+    """Liveness check for either a Popen handle or an adopted psutil.Process"""
+    if isinstance(proc, subprocess.Popen):
+        return proc.poll() is None
+    try:
+        return proc.is_running() and proc.status() != psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return False
+
 def is_server_running():
-    """Check if audio server is running"""
+    """Check if audio server is running (process handle or PID file, no process scan)"""
     global server_process
 
-    if server_process and server_process.poll() is None:
+    if server_process is None:
+        server_process = adopt_from_pid_file()
+
+    if server_process and process_alive(server_process):
         return True
 
-    # Check if process is running by port
-    for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
+    if server_process:
+        logger.warning(f"[is_server_running] Audio server PID {server_process.pid} has exited")
+        server_process = None
+        clear_pid_file()
+
+    return False
+
+# ================== SERVER OUTPUT ==================
+# The audio server's stdout/stderr are drained continuously by reader threads
+# so its pipes never fill up. Lines land in a bounded ring (oldest dropped)
+# tagged with a monotonically increasing sequence number used for paging and
+# as the SSE event id. Disk rotation, when enabled, goes through a queue so a
+# slow disk cannot stall the readers either.
+log_changed = threading.Condition()
+log_lines = deque(maxlen=LOG_RING_SIZE)
+log_seq = 0
+log_file_listener = None
+output_logger = logging.getLogger('server_output')
+output_logger.propagate = False
+
+def setup_log_file():
+    """Enable rotation of audio server output to LOG_FILE, if configured"""
+    global log_file_listener
+
+    if not LOG_FILE or log_file_listener:
+        return
+
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(LOG_FILE)), exist_ok=True)
+        handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        log_queue = queue.SimpleQueue()
+        output_logger.addHandler(QueueHandler(log_queue))
+        output_logger.setLevel(logging.INFO)
+        log_file_listener = QueueListener(log_queue, handler)
+        log_file_listener.start()
+        logger.info(f"[setup_log_file] Rotating audio server output to {LOG_FILE}")
+    except OSError as e:
+        logger.warning(f"[setup_log_file] Could not open log file: {e}")
+
+def append_log(stream_name, line, pid=None):
+    """Store one line of server output and wake log streams"""
+    global log_seq
+
+    with log_changed:
+        log_seq += 1
+        log_lines.append({'seq': log_seq, 'time': time.time(), 'stream': stream_name, 'pid': pid, 'line': line})
+        log_changed.notify_all()
+
+    if log_file_listener:
+        output_logger.info(f"{stream_name}: {line}")
+
+def drain_output(pipe, stream_name, pid):
+    """Reader thread: consume a child pipe until EOF"""
+    try:
+        for raw in iter(pipe.readline, b''):
+            line = raw.decode('utf-8', errors='replace').rstrip()
+            if line.startswith('STATUS '):
+                note_server_state(pid, line[len('STATUS '):])
+                refresh_status()
+            elif line.startswith('CAPACITY '):
+                server_full[pid] = line[len('CAPACITY '):] == 'FULL'
+                refresh_status()
+            append_log(stream_name, line, pid)
+    except (OSError, ValueError) as e:
+        logger.debug(f"[drain_output] {stream_name} reader stopped: {e}")
+    finally:
+        pipe.close()
+
+def start_output_readers(proc):
+    """Start background readers for the audio server's stdout and stderr"""
+    for pipe, name in ((proc.stdout, 'stdout'), (proc.stderr, 'stderr')):
+        threading.Thread(target=drain_output, args=(pipe, name, proc.pid), daemon=True).start()
+
+def logs_after(seq, limit):
+    """Up to `limit` stored lines with a sequence number greater than `seq`"""
+    with log_changed:
+        return [entry for entry in log_lines if entry['seq'] > seq][:limit]
+
+def logs_before(seq, limit):
+    """Up to `limit` stored lines immediately preceding `seq`"""
+    with log_changed:
+        older = [entry for entry in log_lines if entry['seq'] < seq]
+    return older[-limit:]
+
+# ================== STATUS SNAPSHOT ==================
+# Request handlers read this snapshot instead of probing the process. It is
+# replaced (never mutated) whenever running/pid/config/supervisor stats change, and
+# `version` doubles as the ETag and the SSE event id.
+status_changed = threading.Condition()
+status_snapshot = {'running': False, 'pid': None, 'phase': None, 'full': False, 'capacity': None, 'config': None,
+                   'supervisor': None, 'version': 0, 'since': time.time()}
+
+def refresh_status():
+    """Re-check the audio server and publish a new snapshot if anything changed"""
+    global status_snapshot
+
+    running = is_server_running()
+    state = {
+        'running': running,
+        'pid': server_process.pid if running else None,
+        'phase': server_states.get(server_process.pid) if running else None,  # Last STATUS line
+        'full': server_full.get(server_process.pid, False) if running else False,
+        'capacity': server_capacity.get(server_process.pid) if running else None,
+        'config': dict(server_config),
+        'supervisor': supervisor_status()
+    }
+
+    with status_changed:
+        if any(state[key] != status_snapshot[key] for key in state):
+            if running != status_snapshot['running']:
+                logger.info(f"[refresh_status] Server status: {'Running' if running else 'Stopped'}")
+            status_snapshot = {
+                **state,
+                'version': status_snapshot['version'] + 1,
+                'since': time.time()
+            }
+            status_changed.notify_all()
+        return status_snapshot
+
+def status_monitor():
+    """Background thread keeping the status snapshot current"""
+    while True:
         try:
-            cmdline = proc.info['cmdline']
-            if cmdline and 'server.py' in ' '.join(cmdline):
-                server_process = proc
-                return True
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            refresh_status()
+        except Exception as e:
+            logger.error(f"[status_monitor] Error: {e}")
+        time.sleep(STATUS_REFRESH_INTERVAL)
+
+def admin_status_payload(snap):
+    """Admin view of a status snapshot"""
+    running = snap['running']
+    return {
+        'running': running,
+        'stream_url': f'http://{LOCAL_IP}:{STREAM_PORT}/stream' if running else None,
+        'user_page_url': f'http://{LOCAL_IP}:{CONTROL_PORT}',
+        'pid': snap['pid'],
+        'phase': snap['phase'],
+        'full': snap['full'],
+        'capacity': snap['capacity'],
+        'config': snap['config'],
+        'supervisor': snap['supervisor']
+    }
+
+def user_status_payload(snap):
+    """User view of a status snapshot"""
+    running = snap['running']
+    if not running:
+        message = 'Server is currently offline'
+    elif snap['full']:
+        message = 'Server is full right now - try again in a moment'
+    else:
+        message = 'Server is online and ready to stream!'
+    return {
+        'online': running,
+        'full': running and snap['full'],
+        'message': message,
+        'stream_url': f'http://{LOCAL_IP}:{STREAM_PORT}/stream' if running else None
+    }
+
+def conditional_status(build):
+    """JSON status response with an ETag so pollers get 304 when nothing changed"""
+    snap = status_snapshot
+    response = jsonify(build(snap))
+    response.set_etag(f"status-{snap['version']}")
+    return response.make_conditional(request)
+
+def status_event_stream(build):
+    """Server-Sent Events stream pushing a status event whenever the snapshot changes"""
+    def generate():
+        version = None
+        while True:
+            with status_changed:
+                if status_snapshot['version'] == version:
+                    status_changed.wait(SSE_HEARTBEAT)
+                snap = status_snapshot
+
+            if snap['version'] == version:
+                yield ': keep-alive\n\n'
+                continue
+
+            version = snap['version']
+            yield f"id: {version}\nevent: status\ndata: {json.dumps(build(snap))}\n\n"
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+# ================== SUPERVISOR ==================
+# Once an admin starts the server it is kept running: the supervisor thread
+# checks process liveness, the HTTP health endpoint (capture block rate) and a
+# WebSocket handshake, and restarts the server with exponential backoff. With
+# STANDBY_ENABLED a second server waits with its device already open and is
+# promoted over stdin instead of paying a cold start.
+process_lock = threading.RLock()
+standby_process = None
+desired_running = False
+server_started_at = 0.0
+supervisor_stats = {
+    'restarts': 0,
+    'failovers': 0,
+    'consecutive_failures': 0,
+    'last_failure': None,
+    'last_failure_at': None,
+    'last_recovery_seconds': None,
+    'next_restart_at': None
+}
+
+# Lifecycle states reported by each server on stdout ("STATUS READY", ...)
+server_states = {}
+server_full = {}  # pid -> True while the server turns newcomers away ("CAPACITY FULL")
+server_capacity = {}  # pid -> listener cap counters from the last health check
+server_state_changed = threading.Condition()
+
+def note_server_state(pid, state):
+    """Record a lifecycle state reported by a server process"""
+    with server_state_changed:
+        server_states[pid] = state
+        server_state_changed.notify_all()
+
+def wait_for_state(proc, state, timeout):
+    """Block until `proc` reports `state`; False on timeout, on FAILED or if it exits"""
+    deadline = time.time() + timeout
+    with server_state_changed:
+        while server_states.get(proc.pid) != state:
+            remaining = deadline - time.time()
+            if remaining <= 0 or not process_alive(proc) or server_states.get(proc.pid) == 'FAILED':
+                return False
+            server_state_changed.wait(min(remaining, 0.5))
+    return True
+
+def supervisor_status():
+    """Supervisor counters for the admin status"""
+    standby = standby_process if standby_process and process_alive(standby_process) else None
+    return {
+        'enabled': SUPERVISOR_ENABLED,
+        'standby_pid': standby.pid if standby else None,
+        **supervisor_stats
+    }
+
+def spawn_server(standby=False, config=None, handover=None):
+    """Launch server.py (optionally as a pre-warmed standby, or continuing a `handover`) with drained output"""
+    config = config or server_config
+    command = [sys.executable, 'server.py',
+               '--port-http', str(config['port_http']),
+               '--port-ws', str(config['port_ws'])]
+    if config.get('device') is not None:
+        command += ['--device', str(config['device'])]
+    if config.get('block'):
+        command += ['--block', str(config['block'])]
+    for source in config.get('mix') or []:
+        command += ['--mix', source]
+    if config.get('loop'):
+        command += ['--loop', config['loop']]
+    if config.get('tcp_nodelay') is not None:
+        command.append('--tcp-nodelay' if config['tcp_nodelay'] else '--no-tcp-nodelay')
+    for key in ('sndbuf', 'write_limit_blocks', 'backlog', 'accept_rate', 'accept_burst', 'accept_queue',
+                'max_listeners', 'max_per_ip'):
+        if config.get(key) is not None:
+            command += ['--' + key.replace('_', '-'), str(config[key])]
+    if REUSE_PORT_SUPPORTED:
+        command.append('--reuse-port')
+    if standby:
+        command.append('--standby')
+    if handover:
+        command += ['--handover', json.dumps(handover)]
+
+    proc = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        stdin=subprocess.PIPE,
+        cwd=BASE_DIR,  # Run in src/ directory
+        env={**os.environ, 'PYTHONUNBUFFERED': '1'}
+    )
+    start_output_readers(proc)
+    return proc
+
+def send_command(proc, command):
+    """Send a one-line control command to a server started by this launcher"""
+    proc.stdin.write(f"{command}\n".encode())
+    proc.stdin.flush()
+
+def fetch_handover():
+    """Stream id and block numbering of the running server, for its replacement (None if unavailable)"""
+    try:
+        return stream_api('/api/handover', timeout=2)
+    except Exception as e:
+        logger.warning(f"[fetch_handover] Players will rejoin at live: {e}")
+        return None
+
+def drain_server(proc):
+    """Have a server hand its listeners over (close code 1012) and wait for it to exit"""
+    send_command(proc, 'DRAIN')
+    try:
+        proc.wait(timeout=RELOAD_DRAIN_TIMEOUT)
+    except (subprocess.TimeoutExpired, psutil.TimeoutExpired):
+        logger.warning("[drain_server] Server did not drain in time, terminating")
+        terminate_process(proc)
+
+def terminate_process(proc):
+    """Terminate a server process, killing it if it does not exit within 5s"""
+    try:
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except (subprocess.TimeoutExpired, psutil.TimeoutExpired):
+            proc.kill()
+            proc.wait()
+    except psutil.NoSuchProcess:
+        pass
+
+def ensure_standby():
+    """Keep one pre-warmed standby server around while the stream is wanted"""
+    global standby_process
+
+    if not (STANDBY_ENABLED and desired_running):
+        return
+
+    with process_lock:
+        if standby_process is None or not process_alive(standby_process):
+            standby_process = spawn_server(standby=True)
+            logger.info(f"[ensure_standby] Standby audio server started with PID: {standby_process.pid}")
+
+def stop_standby():
+    """Terminate the standby server, if any"""
+    global standby_process
+
+    with process_lock:
+        if standby_process:
+            terminate_process(standby_process)
+            standby_process = None
+
+def probe_websocket():
+    """True if the audio server completes a WebSocket handshake"""
+    key = base64.b64encode(os.urandom(16)).decode()
+    handshake = (
+        f"GET /health HTTP/1.1\r\n"
+        f"Host: 127.0.0.1:{WS_PORT}\r\n"
+        f"Upgrade: websocket\r\n"
+        f"Connection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: {key}\r\n"
+        f"Sec-WebSocket-Version: 13\r\n\r\n"
+    )
+    try:
+        with socket.create_connection(('127.0.0.1', WS_PORT), timeout=2) as s:
+            s.sendall(handshake.encode())
+            return s.recv(1024).startswith(b'HTTP/1.1 101')
+    except OSError:
+        return False
+
+def capacity_counts(stats):
+    """Admitted listeners and current / refused counts per cap, from the server's capacity stats"""
+    if not stats:
+        return None
+    return {
+        'admitted': stats['admitted'],
+        'listeners': {'limit': stats['limit'], 'current': stats['current'], 'refused': stats['rejected_full']},
+        'per_ip': {'limit': stats['max_per_ip'] or None, 'current': stats['busiest_ip'], 'refused': stats['rejected_ip']}
+    }
+
+def check_health(proc, heartbeat):
+    """Run all health checks; returns (healthy, reason, heartbeat)"""
+    if not process_alive(proc):
+        return False, 'process exited', None
+
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{STREAM_PORT}/api/health', timeout=2) as r:
+            health = json.load(r)
+    except Exception as e:
+        return False, f'health endpoint unreachable: {e}', None
+
+    server_capacity[proc.pid] = capacity_counts(health.get('capacity'))
+
+    if not probe_websocket():
+        return False, 'WebSocket handshake failed', None
+
+    if health.get('state') == 'failed':
+        return False, f"startup failed: {health.get('detail')}", None
+
+    # Block-rate heartbeat: capture must keep advancing at close to real time.
+    # A new capture_epoch (room started/stopped/paused/resumed) only resets the baseline.
+    now = time.time()
+    epoch = health.get('capture_epoch')
+    if heartbeat and heartbeat[2] == epoch:
+        last_time, last_blocks, _ = heartbeat
+        rate = (health['blocks'] - last_blocks) / max(now - last_time, 1e-6)
+        if rate < health['block_rate_expected'] * MIN_BLOCK_RATE_RATIO:
+            return False, f'capture stalled ({rate:.1f} blocks/s)', (now, health['blocks'], epoch)
+
+    return True, None, (now, health['blocks'], epoch)
+
+def restart_server(reason, delay):
+    """Replace a failed server: promote the standby, or respawn after `delay` seconds"""
+    global server_process, standby_process, server_started_at
+
+    logger.warning(f"[restart_server] Restarting audio server: {reason}")
+
+    with process_lock:
+        if server_process:
+            terminate_process(server_process)
+            server_process = None
+            clear_pid_file()
+
+        if standby_process and process_alive(standby_process):
+            send_command(standby_process, 'PROMOTE')
+            server_process, standby_process = standby_process, None
+            server_started_at = time.time()
+            write_pid_file(server_process.pid)
+            supervisor_stats['restarts'] += 1
+            supervisor_stats['failovers'] += 1
+            logger.info(f"[restart_server] Promoted standby PID: {server_process.pid}")
+            refresh_status()
+            return
+
+    supervisor_stats['next_restart_at'] = time.time() + delay
+    refresh_status()
+    time.sleep(delay)
+
+    with process_lock:
+        supervisor_stats['next_restart_at'] = None
+        if not desired_running or is_server_running():
+            return
+        server_process = spawn_server()
+        server_started_at = time.time()
+        write_pid_file(server_process.pid)
+        supervisor_stats['restarts'] += 1
+        logger.info(f"[restart_server] Audio server restarted with PID: {server_process.pid} (after {delay:.0f}s backoff)")
+    refresh_status()
+
+# ================== RELOAD ==================
+# A reload starts a replacement server with the new configuration while the
+# old one keeps streaming. Where SO_REUSEPORT exists both bind the same ports;
+# once the new server reports READY the old one is told to DRAIN, which stops
+# accepting and closes listeners with code 1012 so players reconnect at once
+# and land on the new process, which continues the old one's stream id and block
+# numbering (/api/handover) so they resume where they were. Without SO_REUSEPORT the replacement waits as a
+# standby (device already open) and is promoted the moment the old one exits.
+# Both need the capture device open twice for a moment. Exclusive devices
+# (ALSA hw:, WASAPI exclusive mode) refuse that, so when the replacement cannot
+# open its device the reload falls back to a restart: the old server drains
+# first, and listeners reconnect once the new one is up.
+REUSE_PORT_SUPPORTED = hasattr(socket, 'SO_REUSEPORT') and sys.platform != 'win32'
+RELOAD_READY_TIMEOUT = 30.0
+RELOAD_DRAIN_TIMEOUT = 10.0
+server_config = {'device': None, 'block': None, 'port_http': STREAM_PORT, 'port_ws': WS_PORT, 'mix': [],
+                 'loop': None, 'tcp_nodelay': None, 'sndbuf': None, 'write_limit_blocks': None, 'backlog': None,
+                 'accept_rate': None, 'accept_burst': None, 'accept_queue': None,
+                 'max_listeners': None, 'max_per_ip': None}
+# Optional integer settings (None = server default) and their allowed ranges
+OPTIONAL_INT_RANGES = {'block': (64, 8192), 'sndbuf': (0, 16 * 1024 * 1024),
+                       'write_limit_blocks': (2, 256), 'backlog': (1, 65535),
+                       'accept_rate': (0, 10000), 'accept_burst': (1, 10000), 'accept_queue': (0, 100000),
+                       'max_listeners': (0, 100000), 'max_per_ip': (0, 10000)}
+EVENT_LOOPS = ('auto', 'asyncio', 'uvloop')
+reloading = False
+
+def validate_config(changes):
+    """Merge requested changes into the current server config; raises ValueError"""
+    config = dict(server_config)
+    for key, value in changes.items():
+        if key not in config:
+            raise ValueError(f"Unknown setting: {key}")
+        if key == 'device':
+            config[key] = value if value not in ('', None) else None
+            continue
+        if key == 'mix':
+            # Extra capture sources: ["DEVICE[:GAIN]", ...]
+            if not isinstance(value, list) or not all(isinstance(v, str) and v for v in value):
+                raise ValueError("mix must be a list of \"DEVICE[:GAIN]\" strings")
+            config[key] = value
+            continue
+        if key == 'loop':
+            if value not in EVENT_LOOPS + ('', None):
+                raise ValueError(f"loop must be one of {', '.join(EVENT_LOOPS)}")
+            config[key] = value or None
+            continue
+        if key == 'tcp_nodelay':
+            if value not in (True, False, '', None):
+                raise ValueError("tcp_nodelay must be true or false")
+            config[key] = value if isinstance(value, bool) else None
             continue
+        if value in ('', None):
+            config[key] = None if key in OPTIONAL_INT_RANGES else config[key]
+            continue
+        value = int(value)
+        if key in OPTIONAL_INT_RANGES:
+            low, high = OPTIONAL_INT_RANGES[key]
+            if not low <= value <= high:
+                raise ValueError(f"{key} must be between {low} and {high}")
+        if key.startswith('port') and value != config[key]:
+            # Open players and the admin panel keep connecting to the running ports after the 1012
+            raise ValueError(f"{key} cannot change on a reload; restart the launcher to use other ports")
+        config[key] = value
+    return config
 
-    return False
+def reload_server(config):
+    """Replace the running server with one using `config` (same ports), keeping listeners connected"""
+    global server_process, server_config, server_started_at, reloading
+
+    with process_lock:
+        old = server_process
+        reloading = True
+        try:
+            stop_standby()  # Its device/block settings are stale now
+            # With SO_REUSEPORT the new server listens next to the old one; otherwise it waits as a standby
+            overlap = REUSE_PORT_SUPPORTED
+
+            # Fetched before the replacement shares the port, so it can only come from the old server
+            new = spawn_server(standby=not overlap, config=config, handover=fetch_handover())
+            logger.info(f"[reload_server] Replacement server PID {new.pid} starting ({'overlap' if overlap else 'standby'})")
+
+            if wait_for_state(new, 'READY' if overlap else 'STANDBY', RELOAD_READY_TIMEOUT):
+                started = time.time()
+                drain_server(old)
+                if not overlap:
+                    send_command(new, 'PROMOTE')
+                    if not wait_for_state(new, 'READY', RELOAD_READY_TIMEOUT):
+                        logger.error("[reload_server] Promoted server did not report READY")
+            else:
+                device_failed = not process_alive(new) or server_states.get(new.pid) == 'FAILED'
+                terminate_process(new)
+                if not device_failed:
+                    raise RuntimeError("Replacement server did not become ready")
+                logger.warning("[reload_server] Replacement could not open capture next to the running server "
+                               "(exclusive device?) - restarting instead")
+                started = time.time()
+                handover = fetch_handover()
+                drain_server(old)
+                new = spawn_server(config=config, handover=handover)
+                if not wait_for_state(new, 'READY', RELOAD_READY_TIMEOUT):
+                    # The new settings themselves do not work: bring the old ones back
+                    terminate_process(new)
+                    server_process = spawn_server()
+                    server_started_at = time.time()
+                    write_pid_file(server_process.pid)
+                    raise RuntimeError("Server did not start with the new settings, previous settings restored")
+
+            server_process = new
+            server_config = config
+            server_started_at = time.time()
+            write_pid_file(new.pid)
+            logger.info(f"[reload_server] Reload complete, listeners handed over in {time.time() - started:.2f}s")
+        finally:
+            reloading = False
+
+    refresh_status()
+    return new
+
+def supervisor_loop():
+    """Background thread: health-check the audio server and restart it on failure"""
+    failures = 0
+    backoff = RESTART_BACKOFF_INITIAL
+    heartbeat = None      # (time, blocks, capture_epoch) from the previous successful check
+    failed_at = None      # When the current outage was first detected
+    healthy_since = None
+
+    while True:
+        time.sleep(HEALTH_CHECK_INTERVAL)
+        try:
+            if not desired_running or reloading:
+                failures, heartbeat, failed_at, healthy_since = 0, None, None, None
+                continue
+
+            ensure_standby()
+            proc = server_process
+            if proc is None:
+                healthy, reason = False, 'process not running'
+            else:
+                healthy, reason, heartbeat = check_health(proc, heartbeat)
+                if not healthy and process_alive(proc) and time.time() - server_started_at < HEALTH_STARTUP_GRACE:
+                    continue
+
+            now = time.time()
+            if healthy:
+                failures = 0
+                supervisor_stats['consecutive_failures'] = 0
+                if failed_at is not None:
+                    supervisor_stats['last_recovery_seconds'] = round(now - failed_at, 2)
+                    logger.info(f"[supervisor_loop] Audio server recovered after {now - failed_at:.1f}s")
+                    failed_at = None
+                if healthy_since is None:
+                    healthy_since = now
+                elif now - healthy_since > RESTART_BACKOFF_RESET:
+                    backoff = RESTART_BACKOFF_INITIAL
+                continue
+
+            failures += 1
+            healthy_since = None
+            if failed_at is None:
+                failed_at = now
+            supervisor_stats['consecutive_failures'] = failures
+            supervisor_stats['last_failure'] = reason
+            supervisor_stats['last_failure_at'] = now
+            logger.warning(f"[supervisor_loop] Health check failed ({failures}/{HEALTH_FAILURE_THRESHOLD}): {reason}")
+
+            if proc is None or not process_alive(proc) or failures >= HEALTH_FAILURE_THRESHOLD:
+                restart_server(reason, backoff)
+                backoff = min(backoff * 2, RESTART_BACKOFF_MAX)
+                failures, heartbeat = 0, None
+
+        except Exception as e:
+            logger.error(f"[supervisor_loop] Error: {e}")
 
 # ================== ADMIN ROUTES ==================
 @app.route('/admin')
@@ -65,68 +744,51 @@ def admin_panel():
 @app.route('/api/admin/start', methods=['POST'])
 def start_server():
     """Start the audio streaming server"""
-    global server_process
+    global server_process, desired_running, server_started_at
 
     logger.info("[start_server] Attempting to start audio server")
 
-    if is_server_running():
-        logger.warning("[start_server] Server already running")
-        return jsonify({
-            'success': False,
-            'message': 'Server is already running'
-        })
-
-    try:
-        # Start server.py as subprocess - path relative to src/
-        server_process = subprocess.Popen(
-            [sys.executable, 'server.py'],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            stdin=subprocess.PIPE,
-            cwd=os.path.dirname(os.path.abspath(__file__))  # Run in src/ directory
-        )
-
-        logger.info(f"[start_server] Audio server started with PID: {server_process.pid}")
+    with process_lock:
+        if is_server_running():
+            logger.warning("[start_server] Server already running")
+            return jsonify({
+                'success': False,
+                'message': 'Server is already running'
+            })
 
-        return jsonify({
-            'success': True,
-            'message': 'Audio server started successfully',
-            'pid': server_process.pid,
-            'stream_url': f'http://{LOCAL_IP}:{STREAM_PORT}/stream'
-        })
+        try:
+            server_process = spawn_server()
+            server_started_at = time.time()
+            desired_running = True
+            write_pid_file(server_process.pid)
+        except Exception as e:
+            logger.error(f"[start_server] Failed to start server: {e}")
+            return jsonify({
+                'success': False,
+                'message': f'Failed to start server: {str(e)}'
+            })
 
-    except Exception as e:
-        logger.error(f"[start_server] Failed to start server: {e}")
-        return jsonify({
-            'success': False,
-            'message': f'Failed to start server: {str(e)}'
-        })
+    refresh_status()
+    logger.info(f"[start_server] Audio server started with PID: {server_process.pid}")
 
-@app.route('/api/admin/stop', methods=['POST'])
-def stop_server():
-    """Stop the audio streaming server"""
-    global server_process
+    return jsonify({
+        'success': True,
+        'message': 'Audio server started successfully',
+        'pid': server_process.pid,
+        'stream_url': f'http://{LOCAL_IP}:{STREAM_PORT}/stream'
+    })
 
-    logger.info("[stop_server] Attempting to stop audio server")
+def shutdown_servers():
+    """Stop the audio server, its standby and any orphaned server.py processes"""
+    global server_process, desired_running
 
-    if not is_server_running():
-        logger.warning("[stop_server] No server running")
-        return jsonify({
-            'success': False,
-            'message': 'Server is not running'
-        })
+    with process_lock:
+        desired_running = False
+        stop_standby()
 
-    try:
         if server_process:
-            # Terminate the process
-            server_process.terminate()
-            try:
-                server_process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                server_process.kill()
-                server_process.wait()
-
-            logger.info("[stop_server] Audio server stopped successfully")
+            terminate_process(server_process)
+            logger.info("[shutdown_servers] Audio server stopped successfully")
 
         # Also kill any orphaned server.py processes
         for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
@@ -134,12 +796,33 @@ def stop_server():
                 cmdline = proc.info['cmdline']
                 if cmdline and 'server.py' in ' '.join(cmdline):
                     proc.terminate()
-                    logger.info(f"[stop_server] Terminated orphaned process PID: {proc.pid}")
+                    logger.info(f"[shutdown_servers] Terminated orphaned process PID: {proc.pid}")
             except (psutil.NoSuchProcess, psutil.AccessDenied):
                 continue
 
         server_process = None
+        clear_pid_file()
+
+    refresh_status()
+
+@app.route('/api/admin/stop', methods=['POST'])
+def stop_server():
+    """Stop the audio streaming server"""
+    global desired_running
+
+    logger.info("[stop_server] Attempting to stop audio server")
+
+    if not is_server_running():
+        desired_running = False
+        stop_standby()
+        logger.warning("[stop_server] No server running")
+        return jsonify({
+            'success': False,
+            'message': 'Server is not running'
+        })
 
+    try:
+        shutdown_servers()
         return jsonify({
             'success': True,
             'message': 'Audio server stopped successfully'
@@ -152,20 +835,201 @@ def stop_server():
             'message': f'Failed to stop server: {str(e)}'
         })
 
+@app.route('/api/admin/reload', methods=['POST'])
+def reload_route():
+    """Restart the audio server with new settings without dropping listeners"""
+    changes = request.get_json(silent=True) or {}
+    logger.info(f"[reload_route] Reload requested: {changes}")
+
+    if not isinstance(server_process, subprocess.Popen) or not is_server_running():
+        return jsonify({
+            'success': False,
+            'message': 'Reload needs a server started from this launcher'
+        })
+
+    try:
+        config = validate_config(changes)
+        new = reload_server(config)
+    except (ValueError, TypeError) as e:
+        return jsonify({'success': False, 'message': f'Invalid settings: {e}'})
+    except Exception as e:
+        logger.error(f"[reload_route] Reload failed: {e}")
+        return jsonify({'success': False, 'message': f'Reload failed: {e}'})
+
+    return jsonify({
+        'success': True,
+        'message': 'Audio server reloaded',
+        'pid': new.pid,
+        'config': config,
+        'stream_url': f'http://{LOCAL_IP}:{STREAM_PORT}/stream'
+    })
+
+def stream_api(path, payload=None, timeout=5):
+    """Call the streaming server's HTTP API (POST when a payload is given)"""
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(
+        f'http://127.0.0.1:{STREAM_PORT}{path}',
+        data=data,
+        headers={'Content-Type': 'application/json'},
+        method='POST' if data is not None else 'GET'
+    )
+    with urllib.request.urlopen(req, timeout=timeout) as r:
+        return json.load(r)
+
+@app.route('/api/admin/recording', methods=['GET', 'POST'])
+def admin_recording():
+    """Recording status (GET) or toggle (POST {"action": "start"|"stop", "format", "rotate_seconds", "rotate_mb"})"""
+    if not status_snapshot['running']:
+        return jsonify({'success': False, 'active': False, 'message': 'Server is not running'})
+
+    room = urllib.parse.quote(request.args.get('room', 'main'))
+    try:
+        if request.method == 'GET':
+            return jsonify(stream_api(f'/api/recording?room={room}'))
+
+        options = request.get_json(silent=True) or {}
+        action = options.pop('action', 'start')
+        if action not in ('start', 'stop'):
+            return jsonify({'success': False, 'message': f'Unknown action: {action}'})
+
+        logger.info(f"[admin_recording] Recording {action} requested")
+        return jsonify(stream_api(f'/api/recording/{action}?room={room}', options))
+
+    except Exception as e:
+        logger.error(f"[admin_recording] Streaming server unreachable: {e}")
+        return jsonify({'success': False, 'message': f'Streaming server unreachable: {e}'})
+
+@app.route('/api/admin/rooms')
+def admin_rooms():
+    """List the streaming server's rooms with per-stream metrics"""
+    if not status_snapshot['running']:
+        return jsonify({'rooms': [], 'message': 'Server is not running'})
+    try:
+        return jsonify(stream_api('/api/rooms'))
+    except Exception as e:
+        logger.error(f"[admin_rooms] Streaming server unreachable: {e}")
+        return jsonify({'rooms': [], 'message': f'Streaming server unreachable: {e}'})
+
+@app.route('/api/admin/clients')
+def admin_clients():
+    """Per-listener connection stats from the streaming server (?room= to filter)"""
+    if not status_snapshot['running']:
+        return jsonify({'clients': [], 'message': 'Server is not running'})
+    room = request.args.get('room')
+    try:
+        return jsonify(stream_api('/api/clients' + (f'?room={urllib.parse.quote(room)}' if room else '')))
+    except Exception as e:
+        logger.error(f"[admin_clients] Streaming server unreachable: {e}")
+        return jsonify({'clients': [], 'message': f'Streaming server unreachable: {e}'})
+
+@app.route('/api/admin/trace', methods=['GET', 'POST'])
+def admin_trace():
+    """Per-stage pipeline timings (GET) or switch tracing (POST {"enabled": bool, "reset": bool})"""
+    if not status_snapshot['running']:
+        return jsonify({'success': False, 'message': 'Server is not running'})
+    try:
+        payload = (request.get_json(silent=True) or {}) if request.method == 'POST' else None
+        return jsonify(stream_api('/api/trace', payload))
+    except Exception as e:
+        logger.error(f"[admin_trace] Streaming server unreachable: {e}")
+        return jsonify({'success': False, 'message': f'Streaming server unreachable: {e}'})
+
+@app.route('/api/admin/profile', methods=['POST'])
+def admin_profile():
+    """Profile the streaming server for {"seconds": N} and return the hottest functions"""
+    if not status_snapshot['running']:
+        return jsonify({'success': False, 'message': 'Server is not running'})
+    data = request.get_json(silent=True) or {}
+    try:
+        seconds = float(data.get('seconds', 5))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'seconds must be a number'})
+    try:
+        logger.info(f"[admin_profile] Profiling the streaming server for {seconds}s")
+        return jsonify(stream_api('/api/profile', data, timeout=seconds + 10))
+    except urllib.error.HTTPError as e:
+        return jsonify(json.load(e))
+    except Exception as e:
+        logger.error(f"[admin_profile] Streaming server unreachable: {e}")
+        return jsonify({'success': False, 'message': f'Streaming server unreachable: {e}'})
+
+@app.route('/api/admin/rooms/<name>/<action>', methods=['POST'])
+def admin_room_action(name, action):
+    """Start (optionally creating, JSON {"device"}) or stop a room, or set its DSP chain"""
+    if action not in ('start', 'stop', 'dsp'):
+        return jsonify({'success': False, 'message': f'Unknown action: {action}'})
+    if not status_snapshot['running']:
+        return jsonify({'success': False, 'message': 'Server is not running'})
+    try:
+        logger.info(f"[admin_room_action] Room '{name}' {action} requested")
+        return jsonify(stream_api(f'/api/rooms/{urllib.parse.quote(name)}/{action}',
+                                  request.get_json(silent=True) or {}))
+    except Exception as e:
+        logger.error(f"[admin_room_action] Streaming server unreachable: {e}")
+        return jsonify({'success': False, 'message': f'Streaming server unreachable: {e}'})
+
 @app.route('/api/admin/status')
 def admin_status():
     """Get server status for admin"""
-    running = is_server_running()
+    return conditional_status(admin_status_payload)
 
-    status = {
-        'running': running,
-        'stream_url': f'http://{LOCAL_IP}:{STREAM_PORT}/stream' if running else None,
-        'user_page_url': f'http://{LOCAL_IP}:{CONTROL_PORT}',
-        'pid': server_process.pid if server_process and running else None
-    }
+@app.route('/api/admin/events')
+def admin_events():
+    """Push server status changes to the admin panel"""
+    return status_event_stream(admin_status_payload)
+
+@app.route('/api/admin/logs')
+def admin_logs():
+    """Page through recent audio server output (?after=<seq> or ?before=<seq>, &limit=<n>)"""
+    limit = min(request.args.get('limit', LOG_PAGE_SIZE, type=int), LOG_PAGE_SIZE)
+    before = request.args.get('before', type=int)
+
+    if before is not None:
+        lines = logs_before(before, limit)
+    else:
+        lines = logs_after(request.args.get('after', 0, type=int), limit)
+
+    with log_changed:
+        first = log_lines[0]['seq'] if log_lines else None
+        latest = log_seq
 
-    logger.info(f"[admin_status] Server status: {'Running' if running else 'Stopped'}")
-    return jsonify(status)
+    return jsonify({
+        'lines': lines,
+        'first': first,
+        'latest': latest,
+        'next': lines[-1]['seq'] if lines else None
+    })
+
+@app.route('/api/admin/logs/stream')
+def admin_logs_stream():
+    """Stream audio server output as Server-Sent Events (resumes from Last-Event-ID)"""
+    start = request.headers.get('Last-Event-ID', type=int)
+    if start is None:
+        start = request.args.get('after', 0, type=int)
+
+    def generate():
+        seq = start
+        while True:
+            with log_changed:
+                if log_seq <= seq:
+                    log_changed.wait(SSE_HEARTBEAT)
+                if log_seq <= seq:
+                    pending = None
+                else:
+                    pending = [entry for entry in log_lines if entry['seq'] > seq][:LOG_PAGE_SIZE]
+
+            if pending is None:
+                yield ': keep-alive\n\n'
+                continue
+
+            for entry in pending:
+                yield f"id: {entry['seq']}\nevent: log\ndata: {json.dumps(entry)}\n\n"
+            seq = pending[-1]['seq']
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 # ================== USER ROUTES ==================
 @app.route('/')
@@ -177,7 +1041,7 @@ def user_landing():
 @app.route('/stream')
 def stream_redirect():
     """Redirect to streaming server"""
-    if is_server_running():
+    if status_snapshot['running']:
         # Redirect to actual streaming server
         from flask import redirect
         stream_url = f'http://{LOCAL_IP}:{STREAM_PORT}/stream'
@@ -193,15 +1057,12 @@ def stream_redirect():
 @app.route('/api/user/status')
 def user_status():
     """Get server status for users"""
-    running = is_server_running()
-
-    status = {
-        'online': running,
-        'message': 'Server is online and ready to stream!' if running else 'Server is currently offline',
-        'stream_url': f'http://{LOCAL_IP}:{STREAM_PORT}/stream' if running else None
-    }
+    return conditional_status(user_status_payload)
 
-    return jsonify(status)
+@app.route('/api/user/events')
+def user_events():
+    """Push server status changes to the landing page"""
+    return status_event_stream(user_status_payload)
 
 # ================== DEVELOPER INFO ==================
 @app.route('/api/developer')
@@ -228,11 +1089,17 @@ if __name__ == '__main__':
     print("="*70 + "\n")
 
     try:
-        app.run(host='0.0.0.0', port=CONTROL_PORT, debug=False)
+        setup_log_file()
+        refresh_status()
+        desired_running = status_snapshot['running']  # Keep supervising a server adopted from the PID file
+        threading.Thread(target=status_monitor, daemon=True).start()
+        if SUPERVISOR_ENABLED:
+            threading.Thread(target=supervisor_loop, daemon=True).start()
+        app.run(host='0.0.0.0', port=CONTROL_PORT, debug=False, threaded=True)
     except KeyboardInterrupt:
         logger.info("[main] Shutting down...")
         if is_server_running():
-            stop_server()
+            shutdown_servers()
         print("\nControl panel stopped.")
     except Exception as e:
         logger.error(f"[main] Fatal error: {e}")
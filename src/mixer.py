@@ -0,0 +1,105 @@
+# mixer.py – Mix several capture sources into one block stream
+import time
+import numpy as np
+from audio_ring import BlockRing
+
+
+class Mixer:
+    """[Mixer] Combine a primary capture source with extra inputs, once per block.
+
+    The primary source is the clock: its callback calls ``mix()`` with the
+    block it just captured. Every extra source (a mic, another sink monitor)
+    runs its own PortAudio stream whose callback only calls ``feed()``, which
+    copies the block into a small per-source BlockRing acting as a jitter
+    buffer. ``mix()`` takes one block from each jitter buffer - running
+    ``jitter_blocks`` behind that source's newest block - and mixes everything
+    with a single matrix product ``gains @ stack`` into a preallocated buffer.
+
+    Clock drift between devices is absorbed by the jitter buffers: a source
+    that runs dry contributes silence (``underruns``), one that runs ahead is
+    pulled back to the target depth (``dropped``). Nothing is allocated per
+    block.
+    """
+
+    def __init__(self, frames, channels, gains, source_channels=None, jitter_blocks=2, depth=16):
+        self.frames = frames
+        self.channels = channels
+        self.jitter_blocks = jitter_blocks
+        self.gains = np.asarray(gains, dtype=np.float32)
+        extra = len(self.gains) - 1
+        source_channels = source_channels or [channels] * extra
+
+        self.rings = [BlockRing(depth, frames, source_channels[i]) for i in range(extra)]
+        self.cursors = [None] * extra   # Next block to mix per source (None until primed)
+        self.underruns = [0] * extra
+        self.dropped = [0] * extra
+
+        # Row i holds source i's block as float32; rows of idle sources stay zero
+        self.stack = np.zeros((extra + 1, frames * channels), dtype=np.float32)
+        self.rows = [row.reshape(frames, channels) for row in self.stack]
+        self.mixed = np.empty(frames * channels, dtype=np.float32)
+        self.output = np.empty((frames, channels), dtype=np.int16)
+
+        self.blocks = 0
+        self.mix_ns = 0
+        self.max_mix_ns = 0
+
+    def feed(self, index, indata, overflow=False):
+        """[Mixer.feed] Store a block from extra source ``index`` in its jitter buffer"""
+        self.rings[index].write(indata, overflow)
+
+    def callback(self, index):
+        """[Mixer.callback] PortAudio callback feeding extra source ``index``"""
+        feed = self.feed
+        def source_callback(indata, frames, time_info, status):
+            if frames == self.frames:
+                feed(index, indata, status.input_overflow)
+        return source_callback
+
+    def mix(self, primary):
+        """[Mixer.mix] Mix ``primary`` with one block of every extra source (int16 result, reused)"""
+        started = time.perf_counter_ns()
+        np.copyto(self.rows[0], primary, casting='unsafe')
+
+        for i, ring in enumerate(self.rings):
+            row = self.rows[i + 1]
+            cursor = self.cursors[i]
+            if cursor is None:
+                # Prime: wait until the jitter buffer holds its target depth
+                if ring.seq < self.jitter_blocks:
+                    continue
+                cursor = ring.seq - self.jitter_blocks
+
+            depth = ring.seq - cursor
+            if depth <= 0:
+                self.underruns[i] += 1
+                row.fill(0)
+                continue
+            if depth > 2 * self.jitter_blocks + 1:
+                self.dropped[i] += depth - self.jitter_blocks
+                cursor = ring.seq - self.jitter_blocks
+
+            np.copyto(row, ring.array(cursor), casting='unsafe')  # Mono sources broadcast to all channels
+            self.cursors[i] = cursor + 1
+
+        np.matmul(self.gains, self.stack, out=self.mixed)
+        np.clip(self.mixed, -32768, 32767, out=self.mixed)
+        np.copyto(self.output.reshape(-1), self.mixed, casting='unsafe')
+
+        elapsed = time.perf_counter_ns() - started
+        self.blocks += 1
+        self.mix_ns += elapsed
+        if elapsed > self.max_mix_ns:
+            self.max_mix_ns = elapsed
+        return self.output
+
+    def stats(self):
+        """[Mixer.stats] Per-source jitter buffer counters and mixing cost"""
+        return {
+            'gains': self.gains.tolist(),
+            'underruns': list(self.underruns),
+            'dropped': list(self.dropped),
+            'overflows': [ring.overflows for ring in self.rings],
+            'mix_us_avg': round(self.mix_ns / self.blocks / 1000, 1) if self.blocks else None,
+            'mix_us_max': round(self.max_mix_ns / 1000, 1)
+        }
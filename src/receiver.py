@@ -0,0 +1,168 @@
+# receiver.py – Headless player: plays a room's stream on a local output device
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import threading
+from collections import deque
+import numpy as np
+import sounddevice as sd
+
+from stream_client import StreamClient
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - [%(funcName)s] %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+OUTPUT_RATE = 44100
+OUTPUT_CHANNELS = 2
+STATUS_INTERVAL = 10   # Seconds between status lines
+STARTUP_WINDOW_S = 5   # Underruns in the first seconds of playback are reported to the server
+
+
+def to_output(block):
+    """[to_output] int16 (frames, OUTPUT_CHANNELS) at OUTPUT_RATE for a block in any tier"""
+    pcm = block.pcm
+    if block.sample_rate != OUTPUT_RATE:
+        # Linear interpolation; only the low tier (half rate) needs this
+        frames = len(pcm)
+        out_frames = round(frames * OUTPUT_RATE / block.sample_rate)
+        positions = np.linspace(0, frames - 1, out_frames)
+        pcm = np.stack([np.interp(positions, np.arange(frames), pcm[:, ch])
+                        for ch in range(pcm.shape[1])], axis=1).astype(np.int16)
+    if pcm.shape[1] != OUTPUT_CHANNELS:
+        pcm = np.repeat(pcm[:, :1], OUTPUT_CHANNELS, axis=1)
+    return pcm
+
+
+class JitterBuffer:
+    """[JitterBuffer] Blocks waiting for the output device.
+
+    Filled from the network side, drained by the PortAudio callback.
+    Playback starts - and restarts after an underrun - once ``target``
+    seconds are buffered; beyond twice the target the oldest blocks are
+    dropped so latency cannot creep up when the network delivers a burst.
+    """
+
+    def __init__(self, target, rate=OUTPUT_RATE):
+        self.rate = rate
+        self.target_frames = int(target * rate)
+        self.blocks = deque()
+        self.frames = 0          # Buffered frames, including what is left of ``current``
+        self.current = None
+        self.offset = 0
+        self.playing = False
+        self.underruns = 0
+        self.dropped = 0
+        self.started_at = None   # time.monotonic() when playback first started
+        self.startup_underruns = 0
+        self.lock = threading.Lock()
+
+    def level(self):
+        """[JitterBuffer.level] Buffered seconds"""
+        return self.frames / self.rate
+
+    def push(self, pcm):
+        """[JitterBuffer.push] Queue one block (int16, output format)"""
+        with self.lock:
+            self.blocks.append(pcm)
+            self.frames += len(pcm)
+            while self.frames > 2 * self.target_frames and len(self.blocks) > 1:
+                self.frames -= len(self.blocks.popleft())
+                self.dropped += 1
+
+    def fill(self, outdata):
+        """[JitterBuffer.fill] Output callback: copy the next frames, silence while (re)buffering"""
+        frames = len(outdata)
+        written = 0
+        with self.lock:
+            if not self.playing:
+                if self.frames < self.target_frames:
+                    outdata.fill(0)
+                    return
+                self.playing = True
+                if self.started_at is None:
+                    self.started_at = time.monotonic()
+            while written < frames:
+                if self.current is None:
+                    if not self.blocks:
+                        self.underruns += 1
+                        if time.monotonic() - self.started_at < STARTUP_WINDOW_S:
+                            self.startup_underruns += 1
+                        self.playing = False
+                        outdata[written:].fill(0)
+                        return
+                    self.current = self.blocks.popleft()
+                    self.offset = 0
+                n = min(frames - written, len(self.current) - self.offset)
+                outdata[written:written + n] = self.current[self.offset:self.offset + n]
+                written += n
+                self.offset += n
+                self.frames -= n
+                if self.offset == len(self.current):
+                    self.current = None
+
+
+async def play(url, latency_ms, device=None):
+    """[play] Receive ``url`` and play it until interrupted"""
+    client = StreamClient(url)
+    buffer = JitterBuffer(latency_ms / 1000)
+
+    def callback(outdata, frames, time_info, status):
+        buffer.fill(outdata)
+
+    logger.info(f"[play] Receiving {url} with {latency_ms} ms target latency")
+    began = time.monotonic()
+    with sd.OutputStream(samplerate=OUTPUT_RATE, channels=OUTPUT_CHANNELS, dtype='int16',
+                         device=device, latency='low', callback=callback) as stream:
+        client.output_ms = round(stream.latency * 1000, 1)
+        next_status = time.monotonic() + STATUS_INTERVAL
+        async for block in client:
+            buffer.push(to_output(block))
+            client.buffer_s = round(buffer.level(), 3)
+            client.underruns = buffer.underruns
+
+            if client.startup is None and buffer.started_at and time.monotonic() - buffer.started_at >= STARTUP_WINDOW_S:
+                ttfa_ms = (buffer.started_at - began) * 1000 + client.output_ms
+                client.startup = {'ttfa_ms': round(ttfa_ms), 'underruns': buffer.startup_underruns, 'preopened': False}
+                logger.info(f"[play] Audible after {ttfa_ms:.0f} ms, {buffer.startup_underruns} underrun(s) "
+                            f"in the first {STARTUP_WINDOW_S}s")
+
+            if time.monotonic() >= next_status:
+                next_status += STATUS_INTERVAL
+                s = client.stats()
+                logger.info(f"[play] {s['blocks']} blocks, {s['gaps']} missing, tier {s['tier']}, "
+                            f"jitter {s['jitter_ms']} ms, buffer {buffer.level() * 1000:.0f} ms, "
+                            f"{buffer.underruns} underruns, {buffer.dropped} dropped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a room's stream without a browser")
+    parser.add_argument('host', nargs='?', default='127.0.0.1', help="Streaming server address")
+    parser.add_argument('--port', type=int, default=9000, help="WebSocket port")
+    parser.add_argument('--room', default=None, help="Room to play (default: the main room)")
+    parser.add_argument('--latency', type=float, default=150, help="Target buffer in milliseconds")
+    parser.add_argument('--device', default=None, help="Output device (name or ID)")
+    parser.add_argument('--list-devices', action='store_true', help="List output devices and exit")
+    args = parser.parse_args()
+
+    if args.list_devices:
+        print(sd.query_devices())
+        return
+
+    device = int(args.device) if args.device and args.device.isdigit() else args.device
+    url = f"ws://{args.host}:{args.port}/" + (f"ws/{args.room}" if args.room else "")
+    try:
+        asyncio.run(play(url, args.latency, device))
+    except KeyboardInterrupt:
+        pass
+    except sd.PortAudioError as e:
+        logger.error(f"[main] Audio output failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# recorder.py – Background recording of the live stream to rotating files
+import os
+import time
+import wave
+import logging
+import threading
+from datetime import datetime
+import numpy as np
+
+try:
+    import soundfile  # Optional - only needed for FLAC output
+except ImportError:
+    soundfile = None
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('wav', 'flac')
+
+
+class Recorder:
+    """[Recorder] Archive captured blocks to rotating WAV/FLAC files.
+
+    The recorder is just another reader of the BlockRing: a dedicated writer
+    thread wakes every ``poll_interval``, copies every block captured since
+    its last visit into a staging buffer and writes them in one large call.
+    Nothing ever waits on it - if the writer falls more than ``max_lag``
+    blocks behind (slow disk), the oldest blocks are skipped and counted in
+    ``dropped_blocks`` instead of backing up into capture or broadcast.
+    While ``held`` (load shedding) the writer skips its visits; the blocks
+    stay in the ring and are written in one go once it is released.
+    """
+
+    def __init__(self, ring, sample_rate, channels, directory, fmt='wav',
+                 rotate_seconds=3600, rotate_bytes=None, max_lag=None,
+                 poll_interval=0.25, margin=16):
+        if fmt not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+        if fmt == 'flac' and soundfile is None:
+            raise ValueError("FLAC recording needs the 'soundfile' package (pip install soundfile)")
+
+        self.ring = ring
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.directory = directory
+        self.format = fmt
+        self.rotate_seconds = rotate_seconds
+        self.rotate_bytes = rotate_bytes
+        self.poll_interval = poll_interval
+        self.margin = margin
+        self.max_lag = max_lag or ring.slots - 2 * margin
+
+        # Staging buffer sized for everything one poll can possibly collect
+        self.staging = np.empty((self.max_lag * ring.frames, channels), dtype=np.int16)
+
+        self.file = None
+        self.raw_file = None
+        self.path = None
+        self.file_started = 0.0
+        self.file_bytes = 0
+        self.files_written = 0
+        self.bytes_written = 0
+        self.dropped_blocks = 0
+        self.started_at = None
+        self.stop_requested = threading.Event()
+        self.thread = None
+        self.held = False
+
+    # ---------- lifecycle ----------
+    def start(self):
+        """[Recorder.start] Begin recording from the current live edge"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.stop_requested.clear()
+        self.started_at = time.time()
+        self.thread = threading.Thread(target=self._run, name='recorder', daemon=True)
+        self.thread.start()
+        logger.info(f"[Recorder.start] Recording {self.format.upper()} to {self.directory}")
+
+    def stop(self):
+        """[Recorder.stop] Flush what is buffered, close the file and stop the writer"""
+        self.stop_requested.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        logger.info(f"[Recorder.stop] Recording stopped ({self.files_written} files, {self.dropped_blocks} blocks dropped)")
+
+    @property
+    def active(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def status(self):
+        """[Recorder.status] Counters for the admin API"""
+        return {
+            'active': self.active,
+            'format': self.format,
+            'file': self.path,
+            'files_written': self.files_written,
+            'bytes_written': self.bytes_written,
+            'dropped_blocks': self.dropped_blocks,
+            'held': self.held,
+            'rotate_seconds': self.rotate_seconds,
+            'rotate_bytes': self.rotate_bytes,
+            'started_at': self.started_at
+        }
+
+    # ---------- writer thread ----------
+    def _run(self):
+        cursor = self.ring.seq
+        try:
+            while True:
+                stopping = self.stop_requested.wait(self.poll_interval)
+                if self.held and not stopping:
+                    continue
+                cursor = self._drain(cursor)
+                if stopping:
+                    break
+        except Exception as e:
+            logger.error(f"[Recorder._run] Recording failed: {e}")
+        finally:
+            self._close_file()
+
+    def _drain(self, cursor):
+        """Write every block in [cursor, live) as one batch; returns the new cursor"""
+        end = self.ring.seq
+        oldest = max(end - self.max_lag, self.ring.oldest(self.margin))
+        if cursor < oldest:
+            self.dropped_blocks += oldest - cursor
+            logger.warning(f"[Recorder._drain] Writer overrun, dropped {oldest - cursor} blocks")
+            cursor = oldest
+
+        count = end - cursor
+        if count <= 0:
+            return cursor
+
+        frames = self.ring.frames
+        for i in range(count):
+            self.staging[i * frames:(i + 1) * frames] = self.ring.array(cursor + i)
+
+        self._write(self.staging[:count * frames])
+        return end
+
+    def _write(self, pcm):
+        if self.file is None or self._should_rotate():
+            self._close_file()
+            self._open_file()
+
+        if self.format == 'flac':
+            self.file.write(pcm)
+        else:
+            self.file.writeframesraw(memoryview(pcm).cast('B'))
+
+        self.file_bytes += pcm.nbytes
+        self.bytes_written += pcm.nbytes
+
+    def _should_rotate(self):
+        if self.rotate_seconds and time.time() - self.file_started >= self.rotate_seconds:
+            return True
+        return bool(self.rotate_bytes) and self.file_bytes >= self.rotate_bytes
+
+    def _open_file(self):
+        name = datetime.now().strftime(f"recording-%Y%m%d-%H%M%S.{self.format}")
+        self.path = os.path.join(self.directory, name)
+
+        if self.format == 'flac':
+            self.file = soundfile.SoundFile(self.path, 'w', samplerate=self.sample_rate,
+                                            channels=self.channels, format='FLAC', subtype='PCM_16')
+        else:
+            raw = open(self.path, 'wb', buffering=1024 * 1024)
+            self.file = wave.open(raw, 'wb')
+            self.file.setnchannels(self.channels)
+            self.file.setsampwidth(2)
+            self.file.setframerate(self.sample_rate)
+            self.raw_file = raw
+
+        self.file_started = time.time()
+        self.file_bytes = 0
+        self.files_written += 1
+        logger.info(f"[Recorder._open_file] Recording to {self.path}")
+
+    def _close_file(self):
+        if self.file is None:
+            return
+        try:
+            self.file.close()
+            if self.format == 'wav':
+                self.raw_file.close()  # wave does not close file objects it was handed
+        except Exception as e:
+            logger.error(f"[Recorder._close_file] Failed to close {self.path}: {e}")
+        self.file = None
@@ -6,50 +6,482 @@ import platform
 import subprocess
 import os
 import json
-from threading import Thread
-from flask import Flask, send_from_directory, jsonify
+import time
+import atexit
+import argparse
+import ipaddress
+from collections import deque
+from urllib.parse import urlsplit, parse_qs
+from threading import Thread, Event, Lock
+from flask import Flask, send_from_directory, jsonify, request
+from werkzeug.serving import make_server
 import sounddevice as sd
 import websockets
 import logging
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - [%(funcName)s] %(message)s'
-)
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from audio_ring import BlockRing, HEADER_BYTES
+from recorder import Recorder
+from mixer import Mixer
+from dsp import DspChain
+from telemetry import LevelMeter
+from tiers import TIERS, TierEncoder, TierController, tier_format
+from tracing import StageTracer, sample_profile
+from shedding import LoadShedder, SHED_HIGH, SHED_LOW
+
+try:
+    import psutil  # Optional - preferred for listing network interfaces
+except ImportError:
+    psutil = None
+
+try:
+    import uvloop  # Optional - faster event loop (--loop)
+except ImportError:
+    uvloop = None
+
+# Configure logging - records are handed to a listener thread through a queue,
+# so the capture/broadcast path never blocks writing to a (possibly full) pipe
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - [%(funcName)s] %(message)s'))
+log_queue = queue.SimpleQueue()
+log_listener = QueueListener(log_queue, log_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
+queue_handler = QueueHandler(log_queue)
+queue_handler.setFormatter(logging.Formatter('%(message)s'))  # Full format is applied by log_handler
+logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
 logger = logging.getLogger(__name__)
 
+class HealthCheckFilter(logging.Filter):
+    """[HealthCheckFilter] Keep the launcher's periodic health probes out of the access log"""
+    def filter(self, record):
+        return '/api/health' not in record.getMessage()
+
+logging.getLogger('werkzeug').addFilter(HealthCheckFilter())
+
 # Audio settings - Optimized for low latency
 SAMPLE_RATE = 44100
 CHANNELS = 2
 BLOCK = 512  # Reduced from 1024 for lower latency
 PORT_HTTP = 5001  # Changed from 5000 to avoid conflict with launcher.py
 PORT_WS = 9000
+LIVE_MAX_LAG = 64         # Blocks (~0.75s at 512 frames) the live fan-out may fall behind before skipping
+HISTORY_SECONDS = 60      # Time-shift history kept for resuming / late-joining listeners
+HISTORY_MARGIN = 16       # Blocks kept clear of the capture writer when replaying history
+CATCHUP_RATE = 1.1        # History replay speed relative to real time
+TRACE_STAGES = ('mix', 'dsp', 'ring_write', 'wake', 'encode', 'send', 'meter')
+TRACE_SAMPLES = 2048      # Recent samples kept per stage (~24s of blocks)
+PROFILE_MAX_SECONDS = 60
+WRITE_LIMIT_BLOCKS = 8    # Per-listener socket buffer (in full-quality blocks) before send() would wait
+LISTEN_BACKLOG = 100      # Pending connections the WebSocket listener queues (asyncio's default)
+ACCEPT_RATE = 50          # New listeners admitted per second (0 = unlimited)
+ACCEPT_BURST = 20         # ... of which this many may arrive at once
+ACCEPT_QUEUE = 200        # Listeners waiting for admission before newcomers get a retry-after
+MAX_PER_IP = 16           # Listeners one address may hold open (0 = unlimited)
+CAPACITY_BUDGET = 0.5     # Share of each block period the fan-out may spend when the cap is derived
+CAPACITY_MIN = 8          # A derived cap never drops below this (noisy measurement on an idle box)
+CAPACITY_WARMUP = 256     # Blocks with listeners measured before a derived cap is enforced (~3s)
+CAPACITY_COST_FLOOR = 1e-6  # Per-listener seconds assumed when a fan-out measures as free (timer resolution)
+FULL_RETRY_AFTER = 15     # Seconds a player turned away as "full" waits before trying again
+CAPACITY_REPORT_S = 2     # Full/open changes reach the launcher at most this often (listeners at the cap flap)
+COALESCE_BLOCKS = 4       # Blocks per message for tolerant listeners while load shedding coalesces
+PACE_RATE = 1.5           # A backlog after a stall reaches interactive listeners at this x real time ...
+PACE_BURST = 16           # ... after this many blocks at once (~0.19s - below the players' 0.25s target)
+BACKGROUND_YIELD = 32     # Tolerant listeners served between two yields to the event loop
+PREBUFFER_MS = 200        # Newest audio sent to a joining player at once so its buffer starts full
+STARTUP_WINDOW_S = 5      # Players report underruns over their first seconds of playback
+STARTUP_HISTORY = 100     # Player start reports kept per room
+LISTENER_CLASSES = ('interactive', 'tolerant')  # ?class= of a connection; tolerant = recorders, relays
+PROBE_HISTORY = 20        # Latency probe results kept per room
+PING_INTERVAL = 5         # Seconds between application-level pings measuring listener RTT
+IDLE_TIMEOUT = 300        # Seconds without listeners before a room pauses capture (0 = never)
+TTFA_TARGET_MS = 200      # Time-to-first-audio target for a listener that wakes a paused room
+RECORDINGS_DIR = os.path.join('..', 'recordings')
+STARTED_AT = time.time()
+STREAM_ID = f"{os.getpid()}-{int(STARTED_AT)}"  # Sequence numbers only mean something within one stream
+
+def parse_args():
+    """[parse_args] Command line options (normally supplied by launcher.py)"""
+    parser = argparse.ArgumentParser(description="System audio streaming server")
+    parser.add_argument('--standby', action='store_true',
+                        help="Open the capture device but wait for PROMOTE on stdin before serving")
+    parser.add_argument('--device', default=None,
+                        help="Capture device index or name to try before auto-detection")
+    parser.add_argument('--mix', action='append', default=[], metavar='DEVICE[:GAIN]',
+                        help="Extra capture source mixed into the stream (repeatable)")
+    parser.add_argument('--gain', type=float, default=1.0, help="Gain of the primary capture source")
+    parser.add_argument('--block', type=int, default=BLOCK, help="Frames per block")
+    parser.add_argument('--port-http', type=int, default=PORT_HTTP, help="HTTP port")
+    parser.add_argument('--port-ws', type=int, default=PORT_WS, help="WebSocket port")
+    parser.add_argument('--reuse-port', action='store_true',
+                        help="Bind with SO_REUSEPORT so a replacement server can take over the ports")
+    parser.add_argument('--handover', type=json.loads, default=None, metavar='JSON',
+                        help="/api/handover of the server this one replaces, to continue its stream (set on reload)")
+    parser.add_argument('--idle-timeout', type=float, default=IDLE_TIMEOUT,
+                        help="Pause capture after this many seconds without listeners (0 = never)")
+    parser.add_argument('--history-seconds', type=float, default=HISTORY_SECONDS,
+                        help="Seconds of audio kept for resume / time-shift")
+    parser.add_argument('--history-file', default=None,
+                        help="Back the history with a memory-mapped file (for hours of audio)")
+    parser.add_argument('--loop', choices=('auto', 'asyncio', 'uvloop'), default='auto',
+                        help="Event loop (auto = uvloop when installed)")
+    parser.add_argument('--tcp-nodelay', action=argparse.BooleanOptionalAction, default=True,
+                        help="Disable Nagle's algorithm on listener sockets")
+    parser.add_argument('--sndbuf', type=int, default=0,
+                        help="SO_SNDBUF for listener sockets in bytes (0 = OS default)")
+    parser.add_argument('--write-limit-blocks', type=int, default=WRITE_LIMIT_BLOCKS,
+                        help="Per-listener write buffer in blocks; a listener further behind skips blocks")
+    parser.add_argument('--backlog', type=int, default=LISTEN_BACKLOG,
+                        help="Listen backlog of the WebSocket port")
+    parser.add_argument('--accept-rate', type=float, default=ACCEPT_RATE,
+                        help="New listeners admitted per second (0 = unlimited)")
+    parser.add_argument('--accept-burst', type=int, default=ACCEPT_BURST,
+                        help="Listeners admitted at once before pacing kicks in")
+    parser.add_argument('--accept-queue', type=int, default=ACCEPT_QUEUE,
+                        help="Listeners held waiting for admission; beyond this they are told to retry later")
+    parser.add_argument('--max-listeners', type=int, default=0,
+                        help="Listeners served at once (0 = derived from the measured per-listener cost)")
+    parser.add_argument('--max-per-ip', type=int, default=MAX_PER_IP,
+                        help="Listeners one address may hold open (0 = unlimited)")
+    parser.add_argument('--capacity-budget', type=float, default=CAPACITY_BUDGET,
+                        help="Share of each block period listeners may cost when the cap is derived")
+    parser.add_argument('--prebuffer-ms', type=float, default=PREBUFFER_MS,
+                        help="Most recent audio burst to a joining player so it can start at once (0 = off)")
+    parser.add_argument('--pace-rate', type=float, default=PACE_RATE,
+                        help="Speed (x real time) at which a backlog reaches listeners after a stall (0 = unpaced)")
+    parser.add_argument('--pace-burst', type=int, default=PACE_BURST,
+                        help="Blocks of a backlog sent at once before pacing starts")
+    parser.add_argument('--shed-high', type=float, default=SHED_HIGH,
+                        help="Share of the block period in use above which optional work is shed (0 = never)")
+    parser.add_argument('--shed-low', type=float, default=SHED_LOW,
+                        help="Share of the block period below which shed work is restored")
+    parser.add_argument('--trace', action='store_true',
+                        help="Time every pipeline stage from the start (also switchable via /api/trace)")
+    args = parser.parse_args()
+    if args.device is not None and args.device.isdigit():
+        args.device = int(args.device)
+    args.mix = [parse_mix_source(spec) for spec in args.mix]
+    if args.write_limit_blocks < 2:
+        parser.error("--write-limit-blocks must be at least 2")
+    return args
+
+def parse_mix_source(spec):
+    """[parse_mix_source] "DEVICE[:GAIN]" -> {"device": ..., "gain": ...}"""
+    device, _, gain = spec.rpartition(':') if ':' in spec else (spec, '', '')
+    try:
+        gain = float(gain) if gain else 1.0
+    except ValueError:
+        device, gain = spec, 1.0  # Device names may contain colons
+    return {'device': int(device) if device.isdigit() else device, 'gain': gain}
+
+args = parse_args()
+BLOCK = args.block
+# A reload keeps the stream id and numbering, so players resume instead of rejoining at live.
+# Other block settings number blocks differently: then this is a new stream.
+HANDOVER = args.handover if args.handover and args.handover.get('block') == BLOCK else None
+if HANDOVER:
+    STREAM_ID = HANDOVER['stream']
+PORT_HTTP = args.port_http
+PORT_WS = args.port_ws
+IDLE_TIMEOUT = args.idle_timeout
+BLOCK_BYTES = HEADER_BYTES + BLOCK * CHANNELS * 2
+WRITE_LIMIT = args.write_limit_blocks * BLOCK_BYTES
+CLIENT_MAX_QUEUE = WRITE_LIMIT - BLOCK_BYTES  # Socket backlog the tier controller treats as congested
+FRAME_OVERHEAD = 10       # Largest WebSocket frame header of a server message (unmasked, 64-bit length)
+
+# ------------------ STARTUP STATE ------------------
+# Ports are bound first; address discovery and device probing happen afterwards.
+# starting -> probing -> ready, or failed (status stays reachable with the reason)
+startup = {'state': 'starting', 'detail': None, 'timings': {}}
+
+def set_startup_state(state, detail=None):
+    """[set_startup_state] Record a startup phase and how long after launch it was reached"""
+    startup['state'] = state
+    startup['detail'] = detail
+    startup['timings'].setdefault(state, round(time.time() - STARTED_AT, 3))
+    logger.info(f"[set_startup_state] {state}{f' ({detail})' if detail else ''}")
 
 # ------------------ HTTP SERVER ------------------
 app = Flask(__name__)
 
 @app.route('/stream')
-def stream():
-    """[stream] Serve streaming client"""
-    logger.info("[stream] Serving client.html (streaming interface)")
+@app.route('/stream/<name>')
+def stream(name=None):
+    """[stream] Serve streaming client (the room is taken from the page path)"""
+    logger.info(f"[stream] Serving client.html (streaming interface, room={name or DEFAULT_ROOM})")
     return send_from_directory('../web', 'client.html')
 
-def get_ip():
-    """[get_ip] Get local IP address"""
-    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+@app.route('/api/handover')
+def handover():
+    """[handover] Stream id and per-room numbering a replacement server continues (read by launcher.py)"""
+    return jsonify({
+        'stream': STREAM_ID,
+        'block': BLOCK,
+        'time': time.time(),
+        'rooms': {room.name: {'seq': room.ring.seq, 'capturing': room.running and not room.paused}
+                  for room in list(rooms.values())}
+    })
+
+@app.route('/api/health')
+def health():
+    """[health] Liveness and capture heartbeat polled by the launcher's supervisor"""
+    all_rooms = list(rooms.values())
+    running = [room for room in all_rooms if room.running]
+    capturing = [room for room in running if not room.paused]
+    state = startup['state'] if startup['state'] != 'ready' else 'streaming' if capturing else 'idle'
+    return jsonify({
+        'state': state,
+        'detail': startup['detail'],
+        # Monotonic over all rooms; the rate only applies while capture_epoch is unchanged
+        'blocks': sum(room.ring.seq for room in all_rooms),
+        'overflows': sum(room.ring.overflows for room in all_rooms),
+        'history_seconds': HISTORY_SLOTS * BLOCK / SAMPLE_RATE,
+        'block_rate_expected': SAMPLE_RATE / BLOCK * len(capturing),
+        'capture_epoch': capture_epoch,
+        'rooms': len(running),
+        'capturing': len(capturing),
+        'clients': sum(len(room.clients) for room in running),
+        'recording': any(room.recorder and room.recorder.active for room in running),
+        'capacity': capacity.stats(),
+        'uptime': time.time() - STARTED_AT
+    })
+
+@app.route('/api/status')
+def status():
+    """[status] Startup phase (starting / probing / ready / failed) with timings since launch"""
+    return jsonify({
+        **startup,
+        'host': HOST,
+        'port_http': PORT_HTTP,
+        'port_ws': PORT_WS,
+        'rooms': [name for name, room in list(rooms.items()) if room.running],
+        'admission': admission.stats(),
+        'capacity': capacity.stats(),
+        'shedding': shedder.stats(),
+        'uptime': time.time() - STARTED_AT
+    })
+
+# ------------------ ROOM MANAGEMENT ------------------
+rooms_lock = Lock()
+
+@app.route('/api/rooms')
+def list_rooms():
+    """[list_rooms] All rooms with their per-stream metrics"""
+    return jsonify({'rooms': [room.metrics() for room in list(rooms.values())]})
+
+@app.route('/api/rooms/<name>/start', methods=['POST'])
+def room_start(name):
+    """[room_start] Open a room's capture source, creating the room if needed (JSON: device)"""
+    if not valid_room_name(name):
+        return jsonify({'success': False, 'message': 'Invalid room name'}), 400
+    device = (request.get_json(silent=True) or {}).get('device')
+    if isinstance(device, str) and device.isdigit():
+        device = int(device)
+
+    if event_loop is None:
+        return jsonify({'success': False, 'message': 'Server still starting'}), 503
+
+    with rooms_lock:
+        room = rooms.get(name)
+        if room and room.running:
+            return jsonify({'success': False, 'message': 'Room already running', **room.metrics()})
+        if room is None:
+            room = Room(name, device)
+        elif device is not None:
+            room.device = device
+        if not room.open():
+            return jsonify({'success': False, 'message': 'Could not open a capture device'})
+        rooms[name] = room
+        event_loop.call_soon_threadsafe(room.start_broadcast)
+
+    logger.info(f"[room_start] Room '{name}' started (device={room.device})")
+    return jsonify({'success': True, 'message': 'Room started', **room.metrics()})
+
+@app.route('/api/rooms/<name>/stop', methods=['POST'])
+def room_stop(name):
+    """[room_stop] Close a room's capture source and disconnect its listeners"""
+    with rooms_lock:
+        room = rooms.get(name)
+        if not (room and room.running):
+            return jsonify({'success': False, 'message': 'Room not running'})
+        asyncio.run_coroutine_threadsafe(room.shutdown(), event_loop).result(timeout=10)
+
+    logger.info(f"[room_stop] Room '{name}' stopped")
+    return jsonify({'success': True, 'message': 'Room stopped', **room.metrics()})
+
+@app.route('/api/rooms/<name>/levels')
+def room_levels(name):
+    """[room_levels] Newest peak / RMS / spectrum reading (also pushed on ws://<host>:9000/telemetry/<room>)"""
+    room = rooms.get(name)
+    if room is None:
+        return jsonify({'success': False, 'message': 'Unknown room'}), 404
+    return jsonify(room.meter.latest or {'type': 'levels', 'seq': 0})
+
+@app.route('/api/rooms/<name>/dsp', methods=['GET', 'POST'])
+def room_dsp(name):
+    """[room_dsp] Current processing chain with per-stage cost (GET) or replace it (POST config, {} disables)"""
+    room = rooms.get(name)
+    if room is None:
+        return jsonify({'success': False, 'message': 'Unknown room'}), 404
+    if request.method == 'POST':
+        try:
+            room.set_dsp(request.get_json(silent=True) or {})
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)})
+        logger.info(f"[room_dsp] Room '{name}' DSP set to {room.dsp.config if room.dsp else 'off'}")
+    return jsonify({'success': True, 'dsp': room.dsp.stats() if room.dsp else None})
+
+@app.route('/api/clients')
+def list_clients():
+    """[list_clients] Per-listener connection stats (?room= to filter)"""
+    name = request.args.get('room')
+    selected = [room for room in list(rooms.values()) if name in (None, room.name)]
+    return jsonify({'clients': [client.stats() for room in selected for client in room.client_list]})
+
+@app.route('/api/trace', methods=['GET', 'POST'])
+def trace():
+    """[trace] Per-stage timing (p50/p99/max µs) per room; POST {"enabled": bool, "reset": bool} to switch"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        for room in list(rooms.values()):
+            if data.get('reset'):
+                room.tracer.reset()
+            if 'enabled' in data:
+                room.tracer.enabled = bool(data['enabled'])
+                room.written_at = 0.0
+        if 'enabled' in data:
+            logger.info(f"[trace] Stage tracing {'enabled' if data['enabled'] else 'disabled'}")
+    name = request.args.get('room')
+    selected = [room for room in list(rooms.values()) if name in (None, room.name)]
+    return jsonify({
+        'enabled': any(room.tracer.enabled for room in selected),
+        'block_us': round(BLOCK / SAMPLE_RATE * 1e6),
+        'rooms': {room.name: room.tracer.summary() for room in selected}
+    })
+
+probe_counter = 0
+
+@app.route('/api/probe', methods=['GET', 'POST'])
+def latency_probe():
+    """[latency_probe] POST {"room"} marks the next block and collects player echoes; GET lists recent results"""
+    global probe_counter
+    name = request.args.get('room') or (request.get_json(silent=True) or {}).get('room') or DEFAULT_ROOM
+    room = rooms.get(name)
+    if room is None:
+        return jsonify({'success': False, 'message': 'Unknown room'}), 404
+    if request.method == 'GET':
+        return jsonify({'room': room.name, 'probes': [probe.report() for probe in reversed(room.probes)]})
+    if not room.running or room.paused:
+        return jsonify({'success': False, 'message': 'Room is not capturing'}), 409
+    if not room.clients:
+        return jsonify({'success': False, 'message': 'No listeners to measure'}), 409
+    probe_counter += 1
+    probe = LatencyProbe(probe_counter, room)
+    room.probes.append(probe)
+    room.probe = probe
+    logger.info(f"[latency_probe] Probe {probe.id} started in '{room.name}' with {len(room.clients)} listeners")
+    return jsonify({'success': True, 'id': probe.id, 'room': room.name})
+
+profile_lock = Lock()
+
+@app.route('/api/profile', methods=['POST'])
+def profile():
+    """[profile] Run the sampling profiler for {"seconds": N, "interval_ms": M} and return the hottest code"""
+    data = request.get_json(silent=True) or {}
     try:
-        s.connect(("8.8.8.8", 80))
-        ip = s.getsockname()[0]
-        logger.info(f"[get_ip] Detected IP: {ip}")
-        return ip
-    except Exception as e:
-        logger.warning(f"[get_ip] Failed to detect IP: {e}, using 127.0.0.1")
-        return "127.0.0.1"
+        seconds = float(data.get('seconds', 5))
+        interval = float(data.get('interval_ms', 5)) / 1000
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': 'seconds and interval_ms must be numbers'}), 400
+    if not 0 < seconds <= PROFILE_MAX_SECONDS or not 0.001 <= interval <= 1:
+        return jsonify({'success': False, 'message': f'seconds must be 0-{PROFILE_MAX_SECONDS}, interval_ms 1-1000'}), 400
+    if not profile_lock.acquire(blocking=False):
+        return jsonify({'success': False, 'message': 'A profile is already running'}), 409
+    try:
+        logger.info(f"[profile] Sampling for {seconds}s")
+        return jsonify({'success': True, **sample_profile(seconds, interval)})
     finally:
-        s.close()
+        profile_lock.release()
+
+# ------------------ RECORDING ------------------
+recorder_lock = Lock()
+
+def requested_room():
+    """[requested_room] Room selected with ?room= (default room when omitted)"""
+    return rooms.get(request.args.get('room', DEFAULT_ROOM))
+
+@app.route('/api/recording')
+def recording_status():
+    """[recording_status] Current recording state"""
+    room = requested_room()
+    if room is None:
+        return jsonify({'active': False, 'message': 'Unknown room'}), 404
+    return jsonify(room.recorder.status() if room.recorder else {'active': False})
+
+@app.route('/api/recording/start', methods=['POST'])
+def recording_start():
+    """[recording_start] Start archiving a room's stream (JSON: format, rotate_seconds, rotate_mb)"""
+    room = requested_room()
+    if not (room and room.running):
+        return jsonify({'success': False, 'message': 'Room not running'})
+    if room.paused:
+        asyncio.run_coroutine_threadsafe(room.resume(), event_loop).result(timeout=10)
+    options = request.get_json(silent=True) or {}
+
+    with recorder_lock:
+        if room.recorder and room.recorder.active:
+            return jsonify({'success': False, 'message': 'Already recording', **room.recorder.status()})
+        try:
+            rotate_mb = options.get('rotate_mb')
+            directory = RECORDINGS_DIR if room.name == DEFAULT_ROOM else os.path.join(RECORDINGS_DIR, room.name)
+            room.recorder = Recorder(
+                room.ring, SAMPLE_RATE, CHANNELS, directory,
+                fmt=options.get('format', 'wav'),
+                rotate_seconds=float(options.get('rotate_seconds', 3600)),
+                rotate_bytes=int(float(rotate_mb) * 1024 * 1024) if rotate_mb else None,
+                margin=HISTORY_MARGIN
+            )
+            room.recorder.held = shedder.shed['recording']
+            room.recorder.start()
+        except (ValueError, TypeError, OSError) as e:
+            logger.error(f"[recording_start] Cannot start recording: {e}")
+            return jsonify({'success': False, 'message': str(e)})
+
+    return jsonify({'success': True, 'message': 'Recording started', **room.recorder.status()})
 
-HOST = get_ip()
+@app.route('/api/recording/stop', methods=['POST'])
+def recording_stop():
+    """[recording_stop] Stop archiving and close the current file"""
+    room = requested_room()
+    with recorder_lock:
+        if not (room and room.recorder and room.recorder.active):
+            return jsonify({'success': False, 'message': 'Not recording'})
+        room.recorder.stop()
+
+    return jsonify({'success': True, 'message': 'Recording stopped', **room.recorder.status()})
+
+def get_ip():
+    """[get_ip] LAN address from the local interfaces (no network round trip)"""
+    candidates = []
+    try:
+        if psutil:
+            stats = psutil.net_if_stats()
+            for name, addrs in psutil.net_if_addrs().items():
+                if name in stats and not stats[name].isup:
+                    continue
+                candidates += [a.address for a in addrs if a.family == socket.AF_INET]
+        else:
+            candidates = [info[4][0] for info in socket.getaddrinfo(socket.gethostname(), None, socket.AF_INET)]
+    except (OSError, socket.gaierror) as e:
+        logger.warning(f"[get_ip] Cannot list interfaces: {e}")
+
+    usable = [ip for ip in candidates if not ip.startswith(('127.', '169.254.'))]
+    private = [ip for ip in usable if ipaddress.ip_address(ip).is_private]
+    ip = (private or usable or ['127.0.0.1'])[0]
+    logger.info(f"[get_ip] Detected IP: {ip}")
+    return ip
+
+HOST = '127.0.0.1'   # Replaced by get_ip() during startup
 
 # ------------------ PLATFORM DETECTION ------------------
 def get_platform():
@@ -71,8 +503,27 @@ def list_all_devices():
         logger.error(f"[list_all_devices] Error listing devices: {e}")
         return []
 
+# ------------------ CAPTURE STREAM ------------------
+PREBUFFER_BLOCKS = round(args.prebuffer_ms / 1000 * SAMPLE_RATE / BLOCK)
+HISTORY_SLOTS = max(int(args.history_seconds * SAMPLE_RATE / BLOCK), 2 * HISTORY_MARGIN)
+event_loop = None    # Set by ws_main so capture callbacks can wake the broadcasters
+
+def open_input_stream(device, callback, extra_settings=None, channels=CHANNELS):
+    """[open_input_stream] Open and start a capture stream feeding a room's block ring"""
+    stream = sd.InputStream(
+        device=device,
+        samplerate=SAMPLE_RATE,
+        channels=channels,
+        blocksize=BLOCK,
+        dtype="int16",
+        extra_settings=extra_settings,
+        callback=callback
+    )
+    stream.start()
+    return stream
+
 # ------------------ WINDOWS AUDIO SETUP ------------------
-def setup_windows_audio():
+def setup_windows_audio(callback):
     """[setup_windows_audio] Setup SYSTEM AUDIO capture for Windows using WASAPI loopback"""
     logger.info("[setup_windows_audio] Setting up Windows WASAPI loopback (SYSTEM AUDIO)")
 
@@ -87,15 +538,7 @@ def setup_windows_audio():
         try:
             logger.info(f"[setup_windows_audio] Trying WASAPI loopback on device {idx}: {devs[idx]['name']}")
             ws = sd.WasapiSettings(loopback=True)
-            stream = sd.InputStream(
-                device=idx,
-                samplerate=SAMPLE_RATE,
-                channels=CHANNELS,
-                blocksize=BLOCK,
-                dtype="int16",
-                extra_settings=ws
-            )
-            stream.start()
+            stream = open_input_stream(idx, callback, extra_settings=ws)
             logger.info(f"[setup_windows_audio] ✅ Capturing SYSTEM AUDIO from device {idx}")
             return stream
         except Exception as e:
@@ -109,15 +552,8 @@ def setup_windows_audio():
     for idx in stereo_candidates:
         try:
             logger.info(f"[setup_windows_audio] Trying Stereo Mix on device {idx}")
-            stream = sd.InputStream(
-                device=idx,
-                samplerate=SAMPLE_RATE,
-                channels=CHANNELS,
-                blocksize=BLOCK,
-                dtype="int16"
-            )
-            stream.start()
-            logger.info(f"[setup_windows_audio] ✅ Capturing from Stereo Mix")
+            stream = open_input_stream(idx, callback)
+            logger.info("[setup_windows_audio] ✅ Capturing from Stereo Mix")
             return stream
         except Exception as e:
             logger.debug(f"[setup_windows_audio] Stereo Mix failed: {e}")
@@ -186,7 +622,7 @@ def get_monitor_sources_via_pactl():
 
     return []
 
-def setup_linux_audio():
+def setup_linux_audio(callback):
     """[setup_linux_audio] Setup SYSTEM AUDIO capture for Linux (NOT microphone)"""
     logger.info("[setup_linux_audio] Setting up Linux SYSTEM AUDIO capture (monitors only)")
 
@@ -199,14 +635,7 @@ def setup_linux_audio():
         logger.info(f"[setup_linux_audio] Using device config: ID={device_id}, Name={device_name}, Method={method}")
 
         try:
-            stream = sd.InputStream(
-                device=device_id,
-                samplerate=SAMPLE_RATE,
-                channels=CHANNELS,
-                blocksize=BLOCK,
-                dtype="int16"
-            )
-            stream.start()
+            stream = open_input_stream(device_id, callback)
             logger.info(f"[setup_linux_audio] ✅ Capturing SYSTEM AUDIO via device {device_id} ({device_name})")
             return stream
         except Exception as e:
@@ -219,14 +648,7 @@ def setup_linux_audio():
         logger.info(f"[setup_linux_audio] Using audio config device: {device_id} ({device_name})")
 
         try:
-            stream = sd.InputStream(
-                device=device_id,
-                samplerate=SAMPLE_RATE,
-                channels=CHANNELS,
-                blocksize=BLOCK,
-                dtype="int16"
-            )
-            stream.start()
+            stream = open_input_stream(device_id, callback)
             logger.info(f"[setup_linux_audio] ✅ Capturing SYSTEM AUDIO via device {device_id}")
             return stream
         except Exception as e:
@@ -241,15 +663,8 @@ def setup_linux_audio():
             if monitor['status'] == 'RUNNING':
                 try:
                     logger.info(f"[setup_linux_audio] Trying RUNNING monitor: {monitor['name']}")
-                    stream = sd.InputStream(
-                        device=monitor['name'],
-                        samplerate=SAMPLE_RATE,
-                        channels=CHANNELS,
-                        blocksize=BLOCK,
-                        dtype="int16"
-                    )
-                    stream.start()
-                    logger.info(f"[setup_linux_audio] ✅ Capturing SYSTEM AUDIO from RUNNING monitor")
+                    stream = open_input_stream(monitor['name'], callback)
+                    logger.info("[setup_linux_audio] ✅ Capturing SYSTEM AUDIO from RUNNING monitor")
                     return stream
                 except Exception as e:
                     logger.debug(f"[setup_linux_audio] Failed on {monitor['name']}: {e}")
@@ -258,15 +673,8 @@ def setup_linux_audio():
         for monitor in monitors:
             try:
                 logger.info(f"[setup_linux_audio] Trying monitor: {monitor['name']}")
-                stream = sd.InputStream(
-                    device=monitor['name'],
-                    samplerate=SAMPLE_RATE,
-                    channels=CHANNELS,
-                    blocksize=BLOCK,
-                    dtype="int16"
-                )
-                stream.start()
-                logger.info(f"[setup_linux_audio] ✅ Capturing SYSTEM AUDIO from monitor")
+                stream = open_input_stream(monitor['name'], callback)
+                logger.info("[setup_linux_audio] ✅ Capturing SYSTEM AUDIO from monitor")
                 return stream
             except Exception as e:
                 logger.debug(f"[setup_linux_audio] Failed: {e}")
@@ -280,14 +688,7 @@ def setup_linux_audio():
         if device_name_lower in ['pulse', 'default'] and d['max_input_channels'] >= CHANNELS:
             try:
                 logger.info(f"[setup_linux_audio] Trying {d['name']} device {i}")
-                stream = sd.InputStream(
-                    device=i,
-                    samplerate=SAMPLE_RATE,
-                    channels=CHANNELS,
-                    blocksize=BLOCK,
-                    dtype="int16"
-                )
-                stream.start()
+                stream = open_input_stream(i, callback)
                 logger.info(f"[setup_linux_audio] ✅ Successfully initialized on device {i}")
                 return stream
             except Exception as e:
@@ -300,14 +701,7 @@ def setup_linux_audio():
         if 'monitor' in d['name'].lower() and d['max_input_channels'] >= CHANNELS:
             try:
                 logger.info(f"[setup_linux_audio] Trying device {i}: {d['name']}")
-                stream = sd.InputStream(
-                    device=i,
-                    samplerate=SAMPLE_RATE,
-                    channels=CHANNELS,
-                    blocksize=BLOCK,
-                    dtype="int16"
-                )
-                stream.start()
+                stream = open_input_stream(i, callback)
                 logger.info(f"[setup_linux_audio] ✅ Capturing SYSTEM AUDIO from device {i}")
                 return stream
             except Exception as e:
@@ -317,7 +711,7 @@ def setup_linux_audio():
     return None
 
 # ------------------ MACOS AUDIO SETUP ------------------
-def setup_macos_audio():
+def setup_macos_audio(callback):
     """[setup_macos_audio] Setup SYSTEM AUDIO capture for macOS"""
     logger.info("[setup_macos_audio] Setting up macOS SYSTEM AUDIO capture")
 
@@ -334,14 +728,7 @@ def setup_macos_audio():
             if d['max_input_channels'] >= CHANNELS:
                 try:
                     logger.info(f"[setup_macos_audio] Trying loopback device {i}: {d['name']}")
-                    stream = sd.InputStream(
-                        device=i,
-                        samplerate=SAMPLE_RATE,
-                        channels=CHANNELS,
-                        blocksize=BLOCK,
-                        dtype="int16"
-                    )
-                    stream.start()
+                    stream = open_input_stream(i, callback)
                     logger.info(f"[setup_macos_audio] ✅ Capturing SYSTEM AUDIO from device {i}")
                     return stream
                 except Exception as e:
@@ -351,30 +738,481 @@ def setup_macos_audio():
     return None
 
 # ------------------ UNIFIED AUDIO SETUP ------------------
-def setup_audio_capture():
+# Names of sources that carry system audio rather than a microphone (as scripts/setup/benchmark_devices.py)
+SYSTEM_AUDIO_KEYWORDS = ('monitor', 'pulse', 'default', 'loopback', 'stereo mix',
+                         'blackhole', 'soundflower', 'aggregate')
+
+def is_system_audio_source(name):
+    """[is_system_audio_source] True if a device name looks like a monitor / loopback source, not a microphone"""
+    name = (name or '').lower()
+    return any(keyword in name for keyword in SYSTEM_AUDIO_KEYWORDS)
+
+def measured_best_device():
+    """[measured_best_device] (device_id, loopback) ranked best by benchmark_devices.py, or None.
+    Device indices shift when hardware changes, so the saved name is checked first."""
+    config = load_audio_config()
+    if not config or config.get('method') != 'benchmark':
+        return None
+
+    name = config.get('device_name')
+    if not config.get('loopback') and not is_system_audio_source(name):
+        # Older benchmark runs ranked microphones too; never stream one instead of system audio
+        logger.warning(f"[measured_best_device] Benchmarked device '{name}' is not a system audio source, ignoring it")
+        return None
+    device_id = config.get('device_id')
+    try:
+        devs = sd.query_devices()
+        if not (isinstance(device_id, int) and device_id < len(devs) and devs[device_id]['name'] == name):
+            device_id = next((i for i, d in enumerate(devs) if d['name'] == name), None)
+    except Exception as e:
+        logger.warning(f"[measured_best_device] Cannot query devices: {e}")
+        return None
+
+    if device_id is None:
+        logger.warning(f"[measured_best_device] Benchmarked device '{name}' is gone, re-run benchmark_devices.py")
+        return None
+    return device_id, bool(config.get('loopback'))
+
+def setup_audio_capture(callback, device=None):
     """[setup_audio_capture] Setup SYSTEM AUDIO capture based on platform"""
     current_platform = get_platform()
 
+    # Explicitly requested device (command line / room config) wins
+    if device is not None:
+        try:
+            extra = sd.WasapiSettings(loopback=True) if current_platform == "Windows" else None
+            stream = open_input_stream(device, callback, extra_settings=extra)
+            logger.info(f"[setup_audio_capture] ✅ Capturing from requested device {device}")
+            return stream
+        except Exception as e:
+            logger.error(f"[setup_audio_capture] Requested device {device} failed: {e}, auto-detecting")
+
+    # Measured best device (scripts/setup/benchmark_devices.py) before name heuristics
+    if device is None:
+        measured = measured_best_device()
+        if measured is not None:
+            device_id, loopback = measured
+            try:
+                extra = sd.WasapiSettings(loopback=True) if loopback else None
+                stream = open_input_stream(device_id, callback, extra_settings=extra)
+                logger.info(f"[setup_audio_capture] ✅ Capturing from benchmarked device {device_id}")
+                return stream
+            except Exception as e:
+                logger.warning(f"[setup_audio_capture] Benchmarked device {device_id} failed: {e}, auto-detecting")
+
     if current_platform == "Windows":
-        return setup_windows_audio()
+        return setup_windows_audio(callback)
     elif current_platform == "Linux":
-        return setup_linux_audio()
+        return setup_linux_audio(callback)
     elif current_platform == "Darwin":
-        return setup_macos_audio()
+        return setup_macos_audio(callback)
     else:
         logger.error(f"[setup_audio_capture] Unsupported platform: {current_platform}")
         return None
 
-# Initialize audio stream
-logger.info("[main] ==============================================")
-logger.info("[main] Starting SYSTEM AUDIO capture initialization")
-logger.info("[main] (This captures playback audio, NOT microphone)")
-logger.info("[main] ==============================================")
+# ------------------ ROOMS ------------------
+# Each room is an independent stream: its own capture source, history ring,
+# listener set, broadcaster task and recorder. All rooms share the one event
+# loop; the default room is what "/" and "/stream" have always served.
+DEFAULT_ROOM = 'main'
+ROOMS_CONFIG = os.path.join('..', 'config', 'rooms.json')
+DSP_CONFIG = os.path.join('..', 'config', 'dsp.json')   # Processing chain of the default room
+
+class SendPacer:
+    """[SendPacer] Spaces out the interactive fan-out when it has a backlog.
+
+    The same GCRA as Admission, counted in blocks: ``burst`` blocks may go
+    out back to back, after that one every block period / ``rate``. In
+    steady state (one block per wake-up) it never waits. After a stall, the
+    players' buffers refill right away and the rest of the backlog follows
+    at ``rate`` x real time. Without pacing it would all land at once and
+    overshoot their target. ``rate`` = 0 disables pacing.
+    """
+
+    def __init__(self, rate, burst):
+        self.interval = BLOCK / SAMPLE_RATE / rate if rate > 0 else 0
+        self.tolerance = max(burst - 1, 0) * self.interval
+        self.tat = 0.0
+        self.paced = 0
+
+    def delay(self, now):
+        """[SendPacer.delay] Seconds to wait before the next block may go out (0 = send now)"""
+        if not self.interval:
+            return 0.0
+        tat = max(self.tat, now)
+        wait = tat - self.tolerance - now
+        if wait > 0:
+            self.paced += 1
+            return wait
+        self.tat = tat + self.interval
+        return 0.0
+
+class Room:
+    """[Room] One named stream with its own capture, history and listeners"""
+
+    def __init__(self, name, device=None, gain=1.0, sources=(), dsp=None):
+        self.name = name
+        self.device = device
+        self.gain = gain
+        self.sources = list(sources)   # Extra inputs mixed in: [{"device": ..., "gain": ...}]
+        self.mixer = None
+        self.source_streams = []
+        self.dsp = None
+        if dsp:
+            self.set_dsp(dsp)
+        self.ring = BlockRing(HISTORY_SLOTS, BLOCK, CHANNELS, path=history_path(name))
+        self.encoder = TierEncoder(self.ring)
+        self.tracer = StageTracer(TRACE_STAGES, TRACE_SAMPLES, enabled=args.trace)
+        self.written_at = 0.0   # When the newest block was written (perf_counter)
+        self.capture_s = 0.0    # Time the capture callback took for it
+        self.probe = None       # LatencyProbe waiting for its marked block / echoes
+        self.probes = deque(maxlen=PROBE_HISTORY)
+        self.stream = None
+        self.clients = {}       # websocket -> Listener
+        self.client_list = ()   # Immutable snapshot of all listeners, rebuilt on join/leave
+        self.interactive_list = ()  # ... the players, served first by audio_broadcast
+        self.tolerant_list = ()     # ... recorders and relays, served after them by background_broadcast
+        self.live_seq = 0       # First block not yet picked up by the live fan-out
+        self.block_ready = None
+        self.broadcaster = None
+        self.background_ready = None
+        self.background = None
+        self.fanned_out = 0     # First block the interactive fan-out has not finished yet
+        self.pacer = SendPacer(args.pace_rate, args.pace_burst)
+        self.recorder = None
+        self.paused = False          # Capture stopped for lack of listeners (device kept open)
+        self.idle_since = None
+        self.capture_lock = None     # asyncio.Lock serializing pause/resume
+        self.catching_up = 0         # Listeners still replaying history (not in clients yet)
+        self.first_audio_waiters = []
+        self.pauses = 0
+        self.resumes = 0
+        self.ttfa_ms = deque(maxlen=50)
+        self.startups = deque(maxlen=STARTUP_HISTORY)  # Player reports: time to first audio, early underruns
+        self.prebuffered = 0         # Blocks burst to joining players
+        self.prebuffer_cut = 0       # Bursts cut short by a full socket buffer
+        self.meter = LevelMeter(BLOCK, CHANNELS, SAMPLE_RATE)
+        self.watchers = set()     # Telemetry subscribers (admin panel, players, diagnostics)
+        self.watcher_list = ()
+        self.blocks_sent = 0
+        self.bytes_sent = 0
+        self.peak_clients = 0
+        self.opened_at = None
+
+    @property
+    def running(self):
+        return self.stream is not None
+
+    def capture_callback(self, indata, frames, time_info, status):
+        """[Room.capture_callback] Copy each captured block into the room's ring"""
+        if frames != BLOCK:
+            return
+        entered = time.perf_counter()
+        tracer = self.tracer
+        started = tracer.now()
+        mixer = self.mixer
+        if mixer is not None:
+            indata = mixer.mix(indata)
+            started = tracer.lap('mix', started)
+        dsp = self.dsp
+        if dsp is not None:
+            indata = dsp.process(indata)
+            started = tracer.lap('dsp', started)
+        now = time.time()
+        probe = self.probe
+        if probe is not None and probe.seq is None:
+            probe.mark(self.ring.seq, now * 1000, self.input_latency(time_info))
+        self.ring.write(indata, status.input_overflow, int(now * 1000))
+        tracer.lap('ring_write', started)
+        self.written_at = time.perf_counter()
+        self.capture_s = self.written_at - entered
+        ready = self.block_ready
+        if ready is not None:
+            event_loop.call_soon_threadsafe(ready.set)
+
+    def input_latency(self, time_info):
+        """[Room.input_latency] Age (ms) of a block's first sample at callback time, per the driver"""
+        try:
+            adc, current = time_info.inputBufferAdcTime, time_info.currentTime
+            if adc > 0 and current > adc:
+                return (current - adc) * 1000
+        except AttributeError:
+            pass
+        latency = getattr(self.stream, 'latency', None)  # Fall back to the reported input latency
+        return latency * 1000 if isinstance(latency, (int, float)) else 0.0
+
+    def set_dsp(self, config):
+        """[Room.set_dsp] Replace the processing chain (an empty config disables it); raises ValueError"""
+        try:
+            self.dsp = DspChain(config, BLOCK, CHANNELS, SAMPLE_RATE) if config else None
+        except (TypeError, KeyError) as e:
+            raise ValueError(f"Invalid DSP settings: {e}")
+
+    def open(self):
+        """[Room.open] Open the capture source (auto-detected when no device is set) and any mixed inputs"""
+        channels = [source_channels(source['device']) for source in self.sources]
+        if self.sources or self.gain != 1.0:
+            self.mixer = Mixer(BLOCK, CHANNELS, [self.gain] + [s.get('gain', 1.0) for s in self.sources], channels)
+
+        self.continue_numbering()
+        self.stream = setup_audio_capture(self.capture_callback, self.device)
+        if not self.stream:
+            self.mixer = None
+            return None
+
+        # A source that fails to open just stays silent in the mix
+        for i, source in enumerate(self.sources):
+            try:
+                self.source_streams.append(
+                    open_input_stream(source['device'], self.mixer.callback(i), channels=channels[i]))
+                logger.info(f"[Room.open] {self.name}: mixing device {source['device']} (gain {source.get('gain', 1.0)})")
+            except Exception as e:
+                logger.error(f"[Room.open] {self.name}: cannot open mix source {source['device']}: {e}")
+
+        self.opened_at = time.time()
+        self.paused = False
+        capture_changed()
+        return self.stream
+
+    def continue_numbering(self):
+        """[Room.continue_numbering] Number blocks on from where the replaced server's room is now
+        (its numbering at handover plus the blocks captured since), so ?resume= finds the same audio"""
+        previous = HANDOVER['rooms'].pop(self.name, None) if HANDOVER else None
+        if previous is None or self.ring.seq:
+            return
+        seq = previous['seq']
+        if previous['capturing']:
+            seq += int((time.time() - HANDOVER['time']) * SAMPLE_RATE / BLOCK)
+        self.ring.start_at(seq)
+        self.live_seq = self.fanned_out = seq
+        logger.info(f"[Room.continue_numbering] {self.name}: continuing stream {STREAM_ID} at block {seq}")
+
+    def close_capture(self):
+        """[Room.close_capture] Stop and release the capture device and mixed inputs"""
+        for stream in [self.stream] + self.source_streams:
+            if stream is None:
+                continue
+            try:
+                stream.stop()
+                stream.close()
+            except Exception as e:
+                logger.warning(f"[Room.close_capture] {self.name}: {e}")
+        self.stream = None
+        self.source_streams = []
+        self.paused = False
+        capture_changed()
+
+    def start_broadcast(self):
+        """[Room.start_broadcast] Start the room's broadcaster (must run on the event loop)"""
+        self.block_ready = asyncio.Event()
+        self.background_ready = asyncio.Event()
+        self.capture_lock = asyncio.Lock()
+        self.broadcaster = asyncio.ensure_future(audio_broadcast(self))
+        self.background = asyncio.ensure_future(background_broadcast(self))
+
+    def stop_broadcast(self):
+        """[Room.stop_broadcast] Cancel the room's broadcaster tasks"""
+        for task in (self.broadcaster, self.background):
+            if task:
+                task.cancel()
+        self.broadcaster = self.background = None
+
+    async def pause(self):
+        """[Room.pause] Stop capturing while nobody listens; the device stays open for a fast resume"""
+        async with self.capture_lock:
+            if not self.running or self.paused:
+                return
+            loop = asyncio.get_running_loop()
+            for stream in [self.stream] + self.source_streams:
+                await loop.run_in_executor(None, stream.stop)
+            self.paused = True
+            self.pauses += 1
+            capture_changed()
+        logger.info(f"[Room.pause] '{self.name}' idle for {IDLE_TIMEOUT:.0f}s, capture paused")
+
+    async def resume(self):
+        """[Room.resume] Restart a paused capture"""
+        async with self.capture_lock:
+            if not (self.running and self.paused):
+                return
+            started = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            for stream in [self.stream] + self.source_streams:
+                await loop.run_in_executor(None, stream.start)
+            self.paused = False
+            self.resumes += 1
+            capture_changed()
+        logger.info(f"[Room.resume] '{self.name}' capture resumed in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    def record_first_audio(self):
+        """[Room.record_first_audio] Time-to-first-audio of listeners that woke the room"""
+        now = time.perf_counter()
+        for ws, connected_at in self.first_audio_waiters:
+            if ws in self.clients:
+                ms = (now - connected_at) * 1000
+                self.ttfa_ms.append(ms)
+                log = logger.warning if ms > TTFA_TARGET_MS else logger.info
+                log(f"[Room.record_first_audio] '{self.name}' time to first audio {ms:.0f} ms (target {TTFA_TARGET_MS} ms)")
+        self.first_audio_waiters = []
+
+    def startup_stats(self):
+        """[Room.startup_stats] Players' time from Play to first audio and underruns in their first seconds"""
+        if not self.startups:
+            return None
+        ttfa = sorted(s['ttfa_ms'] for s in self.startups)
+        underruns = [s['underruns'] for s in self.startups]
+        return {
+            'players': len(ttfa),
+            'ttfa_ms_p50': round(ttfa[len(ttfa) // 2]),
+            'ttfa_ms_p90': round(ttfa[int(len(ttfa) * 0.9)]),
+            f'underruns_{STARTUP_WINDOW_S}s_mean': round(sum(underruns) / len(underruns), 2),
+            'clean_starts': round(sum(1 for u in underruns if u == 0) / len(underruns), 2)
+        }
+
+    async def shutdown(self, code=1001, reason='stream stopped'):
+        """[Room.shutdown] Stop capture, broadcaster and recorder and disconnect listeners"""
+        self.close_capture()
+        self.stop_broadcast()
+        self.block_ready = None
+        if self.recorder and self.recorder.active:
+            await asyncio.get_running_loop().run_in_executor(None, self.recorder.stop)
+        await asyncio.gather(*(client.ws.close(code, reason) for client in self.client_list), return_exceptions=True)
+
+    def add_client(self, listener):
+        """[Room.add_client] Register a listener and refresh the broadcast snapshot"""
+        self.clients[listener.ws] = listener
+        self.snapshot_clients()
+        self.peak_clients = max(self.peak_clients, len(self.clients))
+
+    def remove_client(self, ws):
+        """[Room.remove_client] Drop a listener and refresh the broadcast snapshot"""
+        if self.clients.pop(ws, None) is not None:
+            self.snapshot_clients()
+
+    def snapshot_clients(self):
+        """[Room.snapshot_clients] Rebuild the tuples the broadcasters iterate"""
+        self.client_list = tuple(self.clients.values())
+        self.interactive_list = tuple(client for client in self.client_list if not client.tolerant)
+        self.tolerant_list = tuple(client for client in self.client_list if client.tolerant)
+
+    def add_watcher(self, ws):
+        """[Room.add_watcher] Subscribe a socket to level readings"""
+        self.watchers.add(ws)
+        self.watcher_list = tuple(self.watchers)
+
+    def remove_watcher(self, ws):
+        """[Room.remove_watcher] Unsubscribe a socket from level readings"""
+        if ws in self.watchers:
+            self.watchers.discard(ws)
+            self.watcher_list = tuple(self.watchers)
+
+    def metrics(self):
+        """[Room.metrics] Per-stream counters for the status API"""
+        return {
+            'name': self.name,
+            'device': self.device,
+            'running': self.running,
+            'path': '/stream' if self.name == DEFAULT_ROOM else f'/stream/{self.name}',
+            'clients': len(self.clients),
+            'peak_clients': self.peak_clients,
+            'tiers': {tier: sum(1 for client in self.client_list if client.tier == tier) for tier in TIERS},
+            'tolerant_clients': len(self.tolerant_list),
+            'paced_blocks': self.pacer.paced,
+            'blocks_captured': self.ring.seq,
+            'overflows': self.ring.overflows,
+            'blocks_sent': self.blocks_sent,
+            'bytes_sent': self.bytes_sent,
+            'recording': bool(self.recorder and self.recorder.active),
+            'mix': self.mixer.stats() if self.mixer else None,
+            'dsp': self.dsp.stats() if self.dsp else None,
+            'watchers': len(self.watchers),
+            'paused': self.paused,
+            'pauses': self.pauses,
+            'resumes': self.resumes,
+            'ttfa_ms_last': round(self.ttfa_ms[-1]) if self.ttfa_ms else None,
+            'ttfa_ms_max': round(max(self.ttfa_ms)) if self.ttfa_ms else None,
+            'startup': self.startup_stats(),
+            'prebuffered_blocks': self.prebuffered,
+            'prebuffer_cut': self.prebuffer_cut,
+            'latency_ms': self.probes[-1].breakdown() if self.probes else None,
+            'uptime': time.time() - self.opened_at if self.running else None
+        }
+
+rooms = {}
+capture_epoch = 0   # Bumped whenever a room starts, stops, pauses or resumes capture
+
+def capture_changed():
+    """[capture_changed] Tell the supervisor's block-rate check to take a new baseline"""
+    global capture_epoch
+    capture_epoch += 1
+
+def history_path(name):
+    """[history_path] History file for a room when --history-file is set (one file per room)"""
+    if not args.history_file:
+        return None
+    os.makedirs(os.path.dirname(os.path.abspath(args.history_file)), exist_ok=True)
+    if name == DEFAULT_ROOM:
+        return args.history_file
+    root, ext = os.path.splitext(args.history_file)
+    return f"{root}-{name}{ext}"
+
+def source_channels(device):
+    """[source_channels] Channels to open on a mixed-in device (mono mics are upmixed by the mixer)"""
+    try:
+        return max(1, min(CHANNELS, sd.query_devices(device, 'input')['max_input_channels']))
+    except Exception:
+        return CHANNELS
+
+def load_dsp_config():
+    """[load_dsp_config] Default room processing chain from config/dsp.json (see dsp.DspChain)"""
+    try:
+        if os.path.exists(DSP_CONFIG):
+            with open(DSP_CONFIG, 'r') as f:
+                return json.load(f)
+    except Exception as e:
+        logger.warning(f"[load_dsp_config] Failed to load DSP settings: {e}")
+    return None
 
-stream = setup_audio_capture()
+def valid_room_name(name):
+    """[valid_room_name] Room names end up in URLs and file names"""
+    return bool(name) and len(name) <= 32 and all(c.isalnum() or c in '-_' for c in name)
 
-if not stream:
-    logger.error("[main] Failed to initialize SYSTEM AUDIO capture")
+def load_room_config():
+    """[load_room_config] Extra rooms from config/rooms.json:
+    {"rooms": [{"name": "kitchen", "device": "...", "gain": 1.0,
+                "mix": [{"device": "...", "gain": 0.5}], "dsp": {...}, "autostart": true}]}"""
+    try:
+        if not os.path.exists(ROOMS_CONFIG):
+            return
+        with open(ROOMS_CONFIG, 'r') as f:
+            entries = json.load(f).get('rooms', [])
+    except Exception as e:
+        logger.warning(f"[load_room_config] Failed to load rooms: {e}")
+        return
+
+    for entry in entries:
+        name = entry.get('name')
+        if not valid_room_name(name) or name in rooms:
+            logger.warning(f"[load_room_config] Skipping invalid or duplicate room: {name}")
+            continue
+        try:
+            room = Room(name, entry.get('device'), entry.get('gain', 1.0), entry.get('mix', []), entry.get('dsp'))
+        except ValueError as e:
+            logger.error(f"[load_room_config] Room '{name}': {e}")
+            continue
+        rooms[name] = room
+        if entry.get('autostart', True) and not room.open():
+            logger.error(f"[load_room_config] Room '{name}' could not open its capture device")
+        logger.info(f"[load_room_config] Room '{name}' configured (device={room.device}, running={room.running})")
+
+try:
+    rooms[DEFAULT_ROOM] = Room(DEFAULT_ROOM, args.device, args.gain, args.mix, load_dsp_config())
+except ValueError as e:
+    logger.error(f"[main] Ignoring DSP settings: {e}")
+    rooms[DEFAULT_ROOM] = Room(DEFAULT_ROOM, args.device, args.gain, args.mix)
+
+def print_setup_help():
+    """[print_setup_help] Platform hints when no system audio source could be opened"""
     print("\n" + "="*70)
     print("ERROR: Cannot capture SYSTEM AUDIO!")
     print("="*70)
@@ -409,98 +1247,1001 @@ if not stream:
         print("3. Route system audio through BlackHole")
 
     print("="*70 + "\n")
-    sys.exit(1)
 
-logger.info("[main] ✅ SYSTEM AUDIO capture initialized")
+def initialize():
+    """[initialize] Address discovery and device setup, run once the ports are bound"""
+    global HOST
+    set_startup_state('probing', 'discovering address')
+    HOST = get_ip()
 
-# ------------------ LOW-LATENCY STREAMING ------------------
-clients = set()
+    set_startup_state('probing', 'opening capture device')
+    logger.info("[initialize] ==============================================")
+    logger.info("[initialize] Starting SYSTEM AUDIO capture initialization")
+    logger.info("[initialize] (This captures playback audio, NOT microphone)")
+    logger.info("[initialize] ==============================================")
+
+    if not rooms[DEFAULT_ROOM].open():
+        logger.error("[initialize] Failed to initialize SYSTEM AUDIO capture")
+        print_setup_help()
+        set_startup_state('failed', 'no system audio capture device')
+        return False
 
-async def audio_broadcast():
+    logger.info("[initialize] ✅ SYSTEM AUDIO capture initialized")
+    load_room_config()
+    return True
+
+# ------------------ LOW-LATENCY STREAMING ------------------
+def socket_has_room(transport, *messages):
+    """[socket_has_room] True if sending ``messages`` (None = not sent) on ``transport`` keeps its buffer
+    within WRITE_LIMIT, so none of the sends has to wait for the peer to drain"""
+    if transport is None:
+        return True
+    pending = sum((m.nbytes if hasattr(m, 'nbytes') else len(m)) + FRAME_OVERHEAD
+                  for m in messages if m is not None)
+    return transport.get_write_buffer_size() + pending <= WRITE_LIMIT
+
+class Listener:
+    """[Listener] Per-connection state and counters (slotted - there can be many)"""
+    __slots__ = ('ws', 'transport', 'address', 'room', 'tier', 'adapt', 'connected_at', 'bytes_sent',
+                 'messages_sent', 'drops', 'rtt_ms', 'buffer_s', 'underruns', 'jitter_ms',
+                 'ping_id', 'ping_sent_at', 'listener_class', 'tolerant', 'held', 'held_blocks',
+                 'ttfa_ms', 'startup_underruns')
+
+    def __init__(self, ws, room, listener_class='interactive'):
+        self.ws = ws
+        self.transport = getattr(ws, 'transport', None)
+        self.address = ws.remote_address[0] if ws.remote_address else None
+        self.room = room.name
+        self.tier = 'full'        # Tier of the blocks sent so far
+        self.adapt = TierController(CLIENT_MAX_QUEUE)  # Tier the next block should use
+        self.connected_at = time.time()
+        self.bytes_sent = 0
+        self.messages_sent = 0
+        self.drops = 0
+        self.rtt_ms = None
+        self.buffer_s = None      # Reported by the player
+        self.underruns = None     # Reported by the player
+        self.jitter_ms = None     # Reported by the player
+        self.ping_id = 0
+        self.ping_sent_at = None
+        self.listener_class = listener_class
+        self.tolerant = listener_class == 'tolerant'
+        self.held = None          # Blocks kept back for one coalesced message
+        self.held_blocks = 0
+        self.ttfa_ms = None       # Reported by the player STARTUP_WINDOW_S after it started
+        self.startup_underruns = None
+
+    def hold(self, raw):
+        """[Listener.hold] Keep a block back; coalesced messages carry one header and the blocks' PCM back to back"""
+        if self.held_blocks:
+            self.held += raw[HEADER_BYTES:]
+        else:
+            self.held = bytearray(raw)
+        self.held_blocks += 1
+
+    def release_held(self):
+        """[Listener.release_held] The coalesced message for the blocks held so far"""
+        raw = memoryview(self.held)
+        self.held = None
+        self.held_blocks = 0
+        return raw
+
+    def has_room(self, *messages):
+        """[Listener.has_room] True if sending ``messages`` (None = not sent) keeps the socket buffer
+        within WRITE_LIMIT, so none of the sends has to wait for the listener to drain"""
+        return socket_has_room(self.transport, *messages)
+
+    def queue_bytes(self):
+        """[Listener.queue_bytes] Bytes written to the socket but not yet sent"""
+        return self.transport.get_write_buffer_size() if self.transport else 0
+
+    def handle_message(self, message):
+        """[Listener.handle_message] Player reports: {"type": "pong"|"report", "id", "buffer", "underruns", "jitter"}"""
+        try:
+            report = json.loads(message)
+        except (TypeError, ValueError):
+            return
+        if not isinstance(report, dict):
+            return
+        if report.get('type') == 'startup':
+            self.record_startup(report)
+            return
+        if report.get('type') == 'probe_echo':
+            room = rooms.get(self.room)
+            probe = room.probe if room else None
+            if probe is not None and report.get('id') == probe.id:
+                probe.echo(self, report)
+            return
+        if report.get('type') == 'pong' and report.get('id') == self.ping_id and self.ping_sent_at:
+            self.rtt_ms = round((time.perf_counter() - self.ping_sent_at) * 1000, 1)
+            self.ping_sent_at = None
+        if isinstance(report.get('buffer'), (int, float)):
+            self.buffer_s = round(report['buffer'], 3)
+        if isinstance(report.get('underruns'), int):
+            self.underruns = report['underruns']
+        if isinstance(report.get('jitter'), (int, float)):
+            self.jitter_ms = round(report['jitter'], 1)
+
+        switch = self.adapt.update(time.monotonic(), self.buffer_s, self.underruns, self.jitter_ms,
+                                   self.queue_bytes(), self.drops)
+        if switch:
+            logger.info(f"[Listener.handle_message] {self.address} in '{self.room}': {self.tier} -> {switch[0]} ({switch[1]})")
+
+    def record_startup(self, report):
+        """[Listener.record_startup] {"type": "startup", "ttfa_ms", "underruns", "preopened"} - sent once per start"""
+        ttfa, underruns = report.get('ttfa_ms'), report.get('underruns')
+        room = rooms.get(self.room)
+        if not isinstance(ttfa, (int, float)) or not isinstance(underruns, int) or room is None:
+            return
+        self.ttfa_ms = round(ttfa)
+        self.startup_underruns = underruns
+        room.startups.append({'ttfa_ms': ttfa, 'underruns': underruns, 'preopened': bool(report.get('preopened'))})
+        logger.info(f"[Listener.record_startup] {self.address} in '{self.room}': audible after {ttfa:.0f} ms, "
+                    f"{underruns} underrun(s) in the first {STARTUP_WINDOW_S}s")
+
+    async def ping(self):
+        """[Listener.ping] Application-level ping, answered by the player with its buffer level.
+        Skipped while the socket is backed up: the send would wait until this listener drains"""
+        message = json.dumps({'type': 'ping', 'id': self.ping_id + 1})
+        if not self.has_room(message):
+            return
+        self.ping_id += 1
+        self.ping_sent_at = time.perf_counter()
+        await self.ws.send(message)
+
+    def stats(self):
+        """[Listener.stats] Counters for the admin API"""
+        return {
+            'address': self.address,
+            'room': self.room,
+            'tier': self.tier,
+            'class': self.listener_class,
+            'connected_for': round(time.time() - self.connected_at),
+            'bytes_sent': self.bytes_sent,
+            'messages_sent': self.messages_sent,
+            'queue_bytes': self.queue_bytes(),
+            'drops': self.drops,
+            'rtt_ms': self.rtt_ms,
+            'buffer_s': self.buffer_s,
+            'underruns': self.underruns,
+            'jitter_ms': self.jitter_ms,
+            'ttfa_ms': self.ttfa_ms,
+            'startup_underruns': self.startup_underruns,
+            'tier_switches': self.adapt.switches
+        }
+
+PROBE_PARTS = ('device_ms', 'server_ms', 'network_ms', 'buffer_ms', 'output_ms')
+
+class LatencyProbe:
+    """[LatencyProbe] One capture-to-ear measurement.
+
+    The next captured block is marked; the broadcaster announces it to each
+    player right before sending it, and the player echoes once that block is
+    audible (web player) or received (stream_client), reporting how long it
+    sat in its buffer and the output latency. Per player the delay splits into:
+      device   driver-reported age of the first sample when capture saw it
+      server   capture callback until the block went out on that socket
+      network  one way, from the echo's round trip minus the time spent in the player
+      buffer   player: arrival until playback of the block starts
+      output   player: audio output latency
+    """
+
+    def __init__(self, probe_id, room):
+        self.id = probe_id
+        self.room = room.name
+        self.started = time.time()
+        self.seq = None
+        self.captured_ms = None
+        self.device_ms = None
+        self.sent = {}      # websocket -> wall-clock ms the marked block went out
+        self.results = []
+
+    def mark(self, seq, captured_ms, device_ms):
+        """[LatencyProbe.mark] Capture thread: ``seq`` is the marked block"""
+        self.captured_ms = captured_ms
+        self.device_ms = device_ms
+        self.seq = seq
+
+    def message(self):
+        return json.dumps({'type': 'probe', 'id': self.id, 'seq': self.seq & 0xFFFFFFFF})
+
+    def echo(self, listener, report):
+        """[LatencyProbe.echo] A player's echo: {"type": "probe_echo", "id", "buffer_ms", "output_ms", "played"}"""
+        sent_ms = self.sent.pop(listener.ws, None)
+        if sent_ms is None:
+            return
+        try:
+            buffer_ms = max(float(report.get('buffer_ms') or 0), 0.0)
+            output_ms = max(float(report.get('output_ms') or 0), 0.0)
+        except (TypeError, ValueError):
+            return
+        played = bool(report.get('played'))
+        round_trip = time.time() * 1000 - sent_ms
+        # A played echo left the player after buffer + output; an unplayed one on arrival
+        network_ms = max((round_trip - buffer_ms - output_ms) / 2 if played else round_trip / 2, 0.0)
+        result = {
+            'address': listener.address,
+            'tier': listener.tier,
+            'played': played,
+            'device_ms': round(self.device_ms, 1),
+            'server_ms': round(sent_ms - self.captured_ms, 1),
+            'network_ms': round(network_ms, 1),
+            'buffer_ms': round(buffer_ms, 1),
+            'output_ms': round(output_ms, 1)
+        }
+        result['total_ms'] = round(sum(result[k] for k in PROBE_PARTS), 1)
+        self.results.append(result)
+
+    def breakdown(self):
+        """[LatencyProbe.breakdown] Median of each part over the players that answered"""
+        if not self.results:
+            return None
+        summary = {'probe': self.id, 'age_s': round(time.time() - self.started), 'listeners': len(self.results)}
+        for key in PROBE_PARTS + ('total_ms',):
+            values = sorted(r[key] for r in self.results)
+            summary[key] = values[len(values) // 2]
+        return summary
+
+    def report(self):
+        return {
+            'id': self.id,
+            'room': self.room,
+            'time': self.started,
+            'seq': self.seq,
+            'pending': len(self.sent),
+            'breakdown': self.breakdown(),
+            'results': self.results
+        }
+
+def tier_message(tier):
+    """[tier_message] Announces the format of the blocks that follow (sent at a block boundary)"""
+    return json.dumps({'type': 'tier', 'tier': tier, **tier_format(tier, CHANNELS, SAMPLE_RATE)})
+
+async def audio_broadcast(room):
     """[audio_broadcast] Low-latency audio broadcast"""
-    logger.info("[audio_broadcast] Starting low-latency audio broadcast")
+    logger.info(f"[audio_broadcast] Starting low-latency audio broadcast for room '{room.name}'")
+
+    ring = room.ring
+    encoder = room.encoder
+    tracer = room.tracer
+    next_seq = ring.seq
+    overflows = ring.overflows
+    block_ready = room.block_ready
+    background_ready = room.background_ready
+    pacer = room.pacer
+    shed = shedder.shed
 
     while True:
         try:
-            frames, overflowed = stream.read(BLOCK)
-            if overflowed:
-                logger.warning("[audio_broadcast] Audio buffer overflow - reduce load")
+            await block_ready.wait()
+            block_ready.clear()
+            woke = time.perf_counter()
+            tracing = tracer.enabled
+            if tracing and room.written_at:
+                tracer.record('wake', woke - room.written_at)
+            # Load counts a late wake-up (event loop busy elsewhere) as well as the work itself
+            wake_lag = woke - room.written_at if room.written_at else 0.0
+            handled = 0
+            paced = 0.0
+
+            if ring.overflows != overflows:
+                overflows = ring.overflows
+                logger.warning(f"[audio_broadcast] Audio buffer overflow in room '{room.name}' - reduce load")
+
+            while next_seq < ring.seq:
+                # Fell too far behind live: resume at the newest block
+                if ring.seq - next_seq > LIVE_MAX_LAG:
+                    next_seq = ring.seq - 1
+                # A backlog after a stall goes out at PACE_RATE x real time, not all at once
+                delay = pacer.delay(time.perf_counter())
+                if delay > 0:
+                    paced += delay
+                    await asyncio.sleep(delay)
+                    continue  # More blocks may have arrived meanwhile
+
+                room.live_seq = next_seq + 1  # Catch-up readers hand over to the fan-out from here
+                probe = room.probe
+                probe_message = probe.message() if probe is not None and probe.seq == next_seq else None
+
+                # Send to all players without delay; a listener whose socket is backed up
+                # loses this block instead of making everyone else wait for it
+                started = tracer.now()
+                fanout_started = time.perf_counter()
+                encoding = 0.0
+                listeners = room.interactive_list
+                single_tier = shed['tiers']
+                for client in listeners:
+                    tier = client.adapt.tier
+                    if single_tier and tier == 'mono':
+                        tier = 'low'  # Shedding: one reduced encoding per block instead of two
+                    encode_started = time.perf_counter()
+                    raw = encoder.encode(tier, next_seq)
+                    encoding += time.perf_counter() - encode_started
+                    switch = tier_message(tier) if tier != client.tier else None
+                    if not client.has_room(switch, probe_message, raw):
+                        client.drops += 1
+                        continue
+                    try:
+                        if switch:
+                            # Switch between two blocks: the player applies the new format to the next one
+                            await client.ws.send(switch)
+                            client.tier = tier
+                        if probe_message:
+                            await client.ws.send(probe_message)
+                        await client.ws.send(raw)
+                        if probe_message:
+                            probe.sent[client.ws] = time.time() * 1000
+                        client.messages_sent += 1
+                        client.bytes_sent += raw.nbytes
+                        room.bytes_sent += raw.nbytes
+                    except Exception:
+                        room.remove_client(client.ws)
+
+                # Encoding is paid once per tier, not per listener: only the rest scales with the audience
+                capacity.record(time.perf_counter() - fanout_started - encoding, len(listeners))
+                if started:
+                    tracer.record('encode', encoding)
+                    started = tracer.lap('send', started + encoding)
+                room.fanned_out = next_seq + 1
+                background_ready.set()
+
+                room.blocks_sent += 1
+                if room.first_audio_waiters:
+                    room.record_first_audio()
+
+                # Levels are metered once per block; a reading goes out a few times per second
+                if not shed['telemetry']:
+                    reading = room.meter.update(ring.array(next_seq))
+                    tracer.lap('meter', started)
+                    if reading and room.watcher_list:
+                        await publish_levels(room)
+                next_seq += 1
+                handled += 1
+
+            shedder.add(wake_lag + room.capture_s * handled + time.perf_counter() - woke - paced)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[audio_broadcast] Error: {e}")
+            await asyncio.sleep(0.01)
 
-            raw = frames.tobytes()
+async def background_broadcast(room):
+    """[background_broadcast] Fan-out to tolerant listeners (recorders, relays), after the players.
+
+    Runs as its own task behind audio_broadcast and only sends blocks the
+    interactive fan-out has finished. It yields to the event loop every
+    BACKGROUND_YIELD listeners, and once more when a new block is waiting, so
+    however many tolerant consumers there are, players get every block first.
+    Tolerant listeners may lag as far as the history reaches. Blocks are
+    coalesced while load shedding asks for it. It has its own TierEncoder:
+    the broadcaster's buffers only hold its newest block.
+    """
+    ring = room.ring
+    encoder = TierEncoder(ring)
+    ready = room.background_ready
+    block_ready = room.block_ready
+    shed = shedder.shed
+    next_seq = room.fanned_out
 
-            # Send to all clients without delay
-            disconnected = []
-            for ws in list(clients):
-                try:
-                    await ws.send(raw)
-                except Exception:
-                    disconnected.append(ws)
+    while True:
+        try:
+            await ready.wait()
+            ready.clear()
+            if not room.tolerant_list:
+                next_seq = room.fanned_out  # Nobody to serve: the next tolerant listener starts live
+            while next_seq < room.fanned_out:
+                next_seq = max(next_seq, ring.oldest(HISTORY_MARGIN))
+                work_started = time.perf_counter()
+                work = 0.0
+                probe = room.probe
+                probe_message = probe.message() if probe is not None and probe.seq == next_seq else None
+                single_tier = shed['tiers']
+                coalescing = shed['coalesce']
+                listeners = room.tolerant_list
+                for i, client in enumerate(listeners):
+                    if i and i % BACKGROUND_YIELD == 0:
+                        work += time.perf_counter() - work_started
+                        await asyncio.sleep(0)
+                        if block_ready.is_set():
+                            await asyncio.sleep(0)  # Let the broadcaster serve the players first
+                        work_started = time.perf_counter()
+                    tier = client.adapt.tier
+                    if single_tier and tier == 'mono':
+                        tier = 'low'
+                    raw = encoder.encode(tier, next_seq)
+                    switch = tier_message(tier) if tier != client.tier else None
+                    # Held blocks may go out with this one (coalesced, or flushed before a tier switch)
+                    if not client.has_room(client.held, switch, probe_message, raw):
+                        client.drops += 1
+                        continue
+                    try:
+                        if switch:
+                            if client.held_blocks:
+                                await client.ws.send(client.release_held())  # Blocks of the old format
+                            await client.ws.send(switch)
+                            client.tier = tier
+                        if probe_message:
+                            await client.ws.send(probe_message)
+                            probe.sent[client.ws] = time.time() * 1000
+                        if coalescing or client.held_blocks:
+                            # Shedding: one send per COALESCE_BLOCKS blocks; flushed at once when it ends
+                            client.hold(raw)
+                            if coalescing and client.held_blocks < COALESCE_BLOCKS:
+                                continue
+                            raw = client.release_held()
+                        await client.ws.send(raw)
+                        client.messages_sent += 1
+                        client.bytes_sent += raw.nbytes
+                        room.bytes_sent += raw.nbytes
+                    except Exception:
+                        room.remove_client(client.ws)
+
+                work += time.perf_counter() - work_started
+                shedder.add(work)
+                next_seq += 1
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[background_broadcast] Error: {e}")
+            await asyncio.sleep(0.01)
 
-            # Clean up disconnected clients
-            for ws in disconnected:
-                clients.discard(ws)
+def request_path(websocket):
+    """[request_path] Request path of a connection (legacy and new websockets APIs)"""
+    path = getattr(websocket, 'path', None)
+    if path is None:
+        path = websocket.request.path
+    return path
+
+async def publish_levels(room):
+    """[publish_levels] Send the newest level reading to every telemetry subscriber"""
+    message = json.dumps(room.meter.latest)
+    for ws in room.watcher_list:
+        try:
+            await ws.send(message)
+        except Exception:
+            room.remove_watcher(ws)
 
-            # Minimal sleep for event loop
-            await asyncio.sleep(0)
+async def telemetry_handler(websocket, room):
+    """[telemetry_handler] Stream level readings of a room until the subscriber leaves"""
+    room.add_watcher(websocket)
+    try:
+        if room.meter.latest:
+            await websocket.send(json.dumps(room.meter.latest))
+        await websocket.wait_closed()
+    finally:
+        room.remove_watcher(websocket)
+
+def room_for_path(path, prefix='/ws'):
+    """[room_for_path] Room addressed by a WebSocket path: "/" or <prefix> (default room) or "<prefix>/<room>" """
+    route = urlsplit(path).path.rstrip('/')
+    if route in ('', prefix):
+        return rooms.get(DEFAULT_ROOM)
+    if route.startswith(prefix + '/'):
+        return rooms.get(route[len(prefix) + 1:])
+    return None
 
-        except Exception as e:
-            logger.error(f"[audio_broadcast] Error: {e}")
-            await asyncio.sleep(0.01)
+def listener_class(path):
+    """[listener_class] ?class= of a connection (LISTENER_CLASSES; interactive when absent or unknown)"""
+    requested = parse_qs(urlsplit(path).query).get('class', [None])[0]
+    return requested if requested in LISTENER_CLASSES else LISTENER_CLASSES[0]
+
+def requested_start(room, query):
+    """[requested_start] First block for a connection asking to resume (?resume=<seq>&stream=<id>)
+    or time-shift (?behind=<seconds>); None means join at the live edge"""
+    params = parse_qs(query)
+    ring = room.ring
+    start = None
+
+    try:
+        if 'resume' in params and params.get('stream', [None])[0] == f"{STREAM_ID}/{room.name}":
+            start = ring.resolve(int(params['resume'][0]))
+        elif 'behind' in params:
+            start = room.live_seq - int(float(params['behind'][0]) * SAMPLE_RATE / BLOCK)
+    except ValueError:
+        return None
+
+    if start is None or start >= room.live_seq:
+        return None
+    return max(start, ring.oldest(HISTORY_MARGIN))
+
+async def prebuffer(room, websocket, seq):
+    """[prebuffer] Send blocks from `seq` up to the live edge back to back, so a new player starts full.
+    Stops early once the socket buffer is full: a send past WRITE_LIMIT would wait for the player to drain"""
+    ring = room.ring
+    transport = getattr(websocket, 'transport', None)
+    while seq < room.live_seq:
+        # No await between the last check and add_client(): the fan-out continues exactly at live_seq
+        raw = ring.view(seq)
+        if not socket_has_room(transport, raw):
+            room.prebuffer_cut += 1
+            break
+        await websocket.send(raw)
+        room.prebuffered += 1
+        seq += 1
+
+async def catch_up(room, websocket, seq):
+    """[catch_up] Replay history from `seq` at CATCHUP_RATE x real time until the live edge"""
+    loop = asyncio.get_running_loop()
+    interval = BLOCK / SAMPLE_RATE / CATCHUP_RATE
+    next_send = loop.time()
+    ring = room.ring
+
+    while seq < room.live_seq:
+        if seq < ring.oldest(HISTORY_MARGIN):
+            seq = ring.oldest(HISTORY_MARGIN)  # History overtaken by capture: skip ahead
+        await websocket.send(ring.view(seq))
+        seq += 1
+
+        next_send += interval
+        delay = next_send - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+class Admission:
+    """[Admission] Paces new listeners so a reconnect storm cannot swamp the server.
+
+    A token bucket in its GCRA form: ``burst`` listeners are admitted at
+    once, then one every 1/``rate`` seconds in arrival order; the rest wait
+    (asyncio.sleep, no work done for them). Once admitting a newcomer would
+    mean waiting for more than ``queue`` earlier ones, it is turned away with
+    the number of seconds after which a slot is expected.
+    """
+
+    def __init__(self, rate, burst, queue):
+        self.rate = rate
+        self.interval = 1 / rate if rate > 0 else 0
+        self.tolerance = max(burst - 1, 0) * self.interval
+        self.max_wait = queue * self.interval
+        self.tat = 0.0      # Theoretical arrival time of the next conforming listener
+        self.waiting = 0
+        self.admitted = 0
+        self.delayed = 0
+        self.rejected = 0
+
+    async def admit(self):
+        """[Admission.admit] Wait for a slot; returns None once admitted or the retry-after seconds"""
+        if self.rate <= 0:
+            self.admitted += 1
+            return None
+        now = time.monotonic()
+        tat = max(self.tat, now)
+        wait = tat - self.tolerance - now
+        if wait > self.max_wait:
+            self.rejected += 1
+            return round(wait - self.max_wait + self.interval, 1)
+        self.tat = tat + self.interval
+        if wait > 0:
+            self.delayed += 1
+            self.waiting += 1
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self.waiting -= 1
+        self.admitted += 1
+        return None
+
+    def stats(self):
+        return {
+            'rate': self.rate,
+            'waiting': self.waiting,
+            'admitted': self.admitted,
+            'delayed': self.delayed,
+            'rejected': self.rejected
+        }
+
+admission = Admission(args.accept_rate, args.accept_burst, args.accept_queue)
+
+class Capacity:
+    """[Capacity] Global and per-address caps on the listeners served at once.
+
+    The global cap is ``max_listeners`` when set. Otherwise it follows from
+    the measured cost of a listener: the players' broadcaster reports how
+    long each block's fan-out took, and the cap is how many listeners fit into
+    ``budget`` of a block period at the smoothed per-listener cost. Until
+    CAPACITY_WARMUP blocks have been measured only the per-address cap
+    applies. Listeners already connected are never dropped; the cap only
+    turns newcomers away. ``full`` is kept current here; capacity_reporter()
+    passes changes on to the launcher so the landing page can say so.
+    """
+
+    def __init__(self, max_listeners, max_per_ip, budget):
+        self.max_listeners = max_listeners
+        self.max_per_ip = max_per_ip
+        self.budget_s = budget * BLOCK / SAMPLE_RATE
+        self.cost_s = None       # Smoothed fan-out seconds per listener per block
+        self.samples = 0
+        self.current = 0
+        self.peak = 0
+        self.per_ip = {}
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_ip = 0
+        self.full = False
+
+    def limit(self):
+        """[Capacity.limit] Global cap in force (None = not known yet)"""
+        if self.max_listeners > 0:
+            return self.max_listeners
+        if self.samples < CAPACITY_WARMUP:
+            return None
+        return max(CAPACITY_MIN, int(self.budget_s / max(self.cost_s, CAPACITY_COST_FLOOR)))
+
+    def record(self, seconds, listeners):
+        """[Capacity.record] Fan-out time of one block to ``listeners`` listeners"""
+        if listeners:
+            # Plain mean over the first samples, then an exponential average
+            self.samples += 1
+            cost = seconds / listeners
+            self.cost_s = cost if self.cost_s is None else self.cost_s + (cost - self.cost_s) / min(self.samples, 64)
+            self._check_full()
+
+    def acquire(self, address):
+        """[Capacity.acquire] Take a slot; returns None or (close code, reason) to turn the listener away"""
+        limit = self.limit()
+        if limit is not None and self.current >= limit:
+            self.rejected_full += 1
+            return 1013, rejection('full', retry_after=FULL_RETRY_AFTER, limit=limit)
+        if self.max_per_ip and self.per_ip.get(address, 0) >= self.max_per_ip:
+            self.rejected_ip += 1
+            return 1008, rejection('too_many_connections', limit=self.max_per_ip)
+        self.per_ip[address] = self.per_ip.get(address, 0) + 1
+        self.current += 1
+        self.admitted += 1
+        self.peak = max(self.peak, self.current)
+        self._check_full()
+        return None
+
+    def release(self, address):
+        """[Capacity.release] Give back a slot taken by acquire()"""
+        self.current -= 1
+        remaining = self.per_ip.pop(address, 1) - 1
+        if remaining:
+            self.per_ip[address] = remaining
+        self._check_full()
+
+    def _check_full(self):
+        limit = self.limit()
+        self.full = limit is not None and self.current >= limit
+
+    def stats(self):
+        per_ip = list(self.per_ip.values())
+        return {
+            'current': self.current,
+            'peak': self.peak,
+            'limit': self.limit(),
+            'derived': self.max_listeners <= 0,
+            'cost_us': round(self.cost_s * 1e6, 1) if self.cost_s is not None else None,
+            'measured_blocks': self.samples,
+            'full': self.full,
+            'max_per_ip': self.max_per_ip,
+            'busiest_ip': max(per_ip, default=0),
+            'admitted': self.admitted,
+            'rejected_full': self.rejected_full,
+            'rejected_ip': self.rejected_ip
+        }
+
+capacity = Capacity(args.max_listeners, args.max_per_ip, args.capacity_budget)
+
+def apply_shedding(level, shed):
+    """[apply_shedding] Levels read by the hot paths need nothing; recording is held / released here"""
+    if level == 'recording':
+        for room in list(rooms.values()):
+            if room.recorder:
+                room.recorder.held = shed
+
+shedder = LoadShedder(args.shed_high, args.shed_low, on_change=apply_shedding)
+
+def rejection(error, **details):
+    """[rejection] Machine-readable close reason for players: {"error": ..., "retry_after": ...}"""
+    return json.dumps({'error': error, **details})
+
+def tune_socket(websocket):
+    """[tune_socket] Apply --tcp-nodelay / --sndbuf to a listener's socket"""
+    transport = getattr(websocket, 'transport', None)
+    sock = transport.get_extra_info('socket') if transport else None
+    if sock is None:
+        return
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1 if args.tcp_nodelay else 0)
+        if args.sndbuf:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, args.sndbuf)
+    except OSError as e:
+        logger.debug(f"[tune_socket] Could not tune listener socket: {e}")
 
 async def ws_handler(websocket):
     """[ws_handler] Handle WebSocket connections"""
+    path = request_path(websocket)
+    if path == '/health':
+        # Supervisor handshake probe - accept and close without registering a listener
+        await websocket.close()
+        return
+
+    if path.startswith('/telemetry'):
+        room = room_for_path(path, '/telemetry')
+        if room is None:
+            await websocket.close(1008, 'unknown room')
+        else:
+            await telemetry_handler(websocket, room)
+        return
+
+    if startup['state'] != 'ready':
+        # 1013 (try again later): the player retries while capture is being set up
+        await websocket.close(1013, rejection('starting', retry_after=1.0))
+        return
+
+    retry_after = await admission.admit()
+    if retry_after is not None:
+        # 1013 with a hint, so players spread their retries out instead of hammering the handshake path
+        await websocket.close(1013, rejection('busy', retry_after=retry_after))
+        return
+
+    room = room_for_path(path)
+    if room is None or not room.running:
+        await websocket.close(1008, 'unknown or stopped room')
+        return
+
     client_addr = websocket.remote_address
-    clients.add(websocket)
-    logger.info(f"[ws_handler] Client connected: {client_addr} (Total: {len(clients)})")
+    client_ip = client_addr[0] if client_addr else None
+    refused = capacity.acquire(client_ip)
+    if refused is not None:
+        logger.info(f"[ws_handler] Turned away {client_addr}: {refused[1]}")
+        await websocket.close(*refused)
+        return
 
     try:
-        await asyncio.Future()
+        connected_at = time.perf_counter()
+        tune_socket(websocket)
+        woke_room = room.paused
+        if woke_room:
+            await room.resume()
+        start = requested_start(room, urlsplit(path).query)
+        cls = listener_class(path)
+        # A player joining live gets the newest audio at once - not after a paused room wakes
+        # (its history is from before the pause) and not tolerant consumers (no hurry)
+        bursting = start is None and not woke_room and cls == 'interactive' and PREBUFFER_BLOCKS > 0
+        burst_from = room.live_seq
+        if bursting:
+            burst_from = max(room.live_seq - PREBUFFER_BLOCKS, room.ring.oldest(HISTORY_MARGIN))
+
+        await websocket.send(json.dumps({
+            'type': 'hello',
+            'stream': f"{STREAM_ID}/{room.name}",
+            'room': room.name,
+            'sample_rate': SAMPLE_RATE,
+            'channels': CHANNELS,
+            'block': BLOCK,
+            'live': room.live_seq & 0xFFFFFFFF,
+            'start': (start if start is not None else burst_from) & 0xFFFFFFFF,
+            'prebuffer': room.live_seq - burst_from  # Blocks arriving as one burst (not paced in real time)
+        }))
+
+        if start is not None:
+            logger.info(f"[ws_handler] Client {client_addr} catching up from {(room.live_seq - start) * BLOCK / SAMPLE_RATE:.1f}s behind live")
+            room.catching_up += 1
+            try:
+                await catch_up(room, websocket, start)
+            finally:
+                room.catching_up -= 1
+
+        if bursting:
+            await prebuffer(room, websocket, burst_from)
+
+        listener = Listener(websocket, room, cls)
+        room.add_client(listener)
+        if woke_room and start is None:
+            room.first_audio_waiters.append((websocket, connected_at))
+        logger.info(f"[ws_handler] Client connected to '{room.name}': {client_addr} (Total: {len(room.clients)})")
+        async for message in websocket:
+            listener.handle_message(message)
     except Exception:
         pass
     finally:
-        clients.discard(websocket)
-        logger.info(f"[ws_handler] Client disconnected: {client_addr} (Total: {len(clients)})")
+        room.remove_client(websocket)
+        capacity.release(client_ip)
+        logger.info(f"[ws_handler] Client disconnected from '{room.name}': {client_addr} (Total: {len(room.clients)})")
+
+ws_server = None
+http_server = None
+shutdown_requested = None  # asyncio.Event set by DRAIN to end ws_main
+
+async def pinger():
+    """[pinger] Ping every listener each PING_INTERVAL seconds to keep RTT and buffer stats fresh"""
+    while True:
+        await asyncio.sleep(PING_INTERVAL)
+        if shedder.shed['telemetry']:
+            continue
+        for room in list(rooms.values()):
+            for client in room.client_list:
+                try:
+                    await client.ping()  # Never waits: a backed-up listener is skipped
+                except Exception:
+                    pass  # Closed sockets are removed by their handler
+
+async def capacity_reporter():
+    """[capacity_reporter] Report full/open to the launcher, at most once per CAPACITY_REPORT_S.
+    Kept off the broadcast path: listeners hovering at the cap would otherwise flood stdout."""
+    reported = False
+    while True:
+        await asyncio.sleep(CAPACITY_REPORT_S)
+        full = capacity.full
+        if full != reported:
+            reported = full
+            logger.warning(f"[capacity_reporter] Server {'full' if full else 'open again'}: "
+                           f"{capacity.current} of {capacity.limit()} listeners")
+            report_capacity(full)
+
+async def idle_monitor():
+    """[idle_monitor] Pause capture of rooms nobody has listened to for IDLE_TIMEOUT seconds"""
+    while True:
+        await asyncio.sleep(1)
+        now = time.time()
+        for room in list(rooms.values()):
+            busy = room.clients or room.catching_up or (room.recorder and room.recorder.active)
+            if not room.running or room.paused or busy:
+                room.idle_since = None
+            elif room.idle_since is None:
+                room.idle_since = now
+            elif now - room.idle_since >= IDLE_TIMEOUT:
+                await room.pause()
 
 async def ws_main():
     """[ws_main] Start WebSocket server"""
+    global event_loop, ws_server, shutdown_requested
+    shutdown_requested = asyncio.Event()
+    event_loop = asyncio.get_running_loop()
     logger.info(f"[ws_main] WebSocket server at ws://{HOST}:{PORT_WS}")
-    server = await websockets.serve(
+    ws_server = await websockets.serve(
         ws_handler,
         "0.0.0.0",
         PORT_WS,
         max_size=None,
         ping_interval=None,  # Disable ping for lower latency
-        ping_timeout=None
+        ping_timeout=None,
+        write_limit=WRITE_LIMIT,
+        backlog=args.backlog,
+        reuse_port=args.reuse_port
     )
-    logger.info("[ws_main] WebSocket server started")
-    await asyncio.gather(asyncio.Future(), audio_broadcast())
+    logger.info(f"[ws_main] WebSocket server started ({type(event_loop).__module__.split('.')[0]} loop, "
+                f"write limit {WRITE_LIMIT} bytes, backlog {args.backlog}, "
+                f"TCP_NODELAY {'on' if args.tcp_nodelay else 'off'}, SO_SNDBUF {args.sndbuf or 'default'})")
+    set_startup_state('listening')
+    report_status('LISTENING')
+
+    # Device probing blocks in PortAudio - keep the loop serving /health and status meanwhile
+    # (a standby has already initialized before it was promoted)
+    if startup['state'] != 'failed' and not rooms[DEFAULT_ROOM].running:
+        await event_loop.run_in_executor(None, initialize)
+
+    for room in rooms.values():
+        if room.running:
+            room.start_broadcast()
+    if startup['state'] != 'failed':
+        set_startup_state('ready')
+        print_banner()
+        report_status('READY')
+    else:
+        report_status('FAILED')
+    monitor = asyncio.ensure_future(idle_monitor()) if IDLE_TIMEOUT > 0 else None
+    stats_pinger = asyncio.ensure_future(pinger())
+    capacity_monitor = asyncio.ensure_future(capacity_reporter())
+    await shutdown_requested.wait()
+    stats_pinger.cancel()
+    capacity_monitor.cancel()
+    if monitor:
+        monitor.cancel()
+    for room in rooms.values():
+        room.stop_broadcast()
+
+async def drain():
+    """[drain] Hand listeners over to a replacement server and shut down"""
+    listeners = [client.ws for room in list(rooms.values()) for client in room.client_list]
+    logger.info(f"[drain] Draining {len(listeners)} listeners for reload")
+
+    # Stop accepting first so reconnects land on the replacement server
+    ws_server.server.close()
+    if http_server:
+        Thread(target=http_server.shutdown, daemon=True).start()
+
+    # 1012 (service restart) tells the player to reconnect right away
+    await asyncio.gather(*(ws.close(1012, 'server reload') for ws in listeners), return_exceptions=True)
+    ws_server.close()
+    shutdown_requested.set()
+
+# ------------------ LAUNCHER CONTROL CHANNEL ------------------
+promoted = Event()  # Set once this process should serve listeners
+
+def report_status(state):
+    """[report_status] Tell the launcher about a lifecycle change (read from our stdout)"""
+    print(f"STATUS {state}", flush=True)
+
+def report_capacity(full):
+    """[report_capacity] Tell the launcher whether newcomers are being turned away (read from our stdout)"""
+    print(f"CAPACITY {'FULL' if full else 'OPEN'}", flush=True)
+
+def control_reader():
+    """[control_reader] Read one-line commands from the launcher on stdin"""
+    for line in sys.stdin:
+        command = line.strip().upper()
+        if command == 'PROMOTE':
+            if not promoted.is_set():
+                logger.info("[control_reader] Promoted from standby")
+            promoted.set()
+        elif command == 'DRAIN':
+            if event_loop is None:
+                logger.warning("[control_reader] DRAIN before startup, exiting")
+                os._exit(0)
+            event_loop.call_soon_threadsafe(asyncio.ensure_future, drain())
+        elif command:
+            logger.warning(f"[control_reader] Unknown command: {command}")
+
+def bind_reuse_port(port):
+    """[bind_reuse_port] Listening socket that another process may bind alongside us"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(("0.0.0.0", port))
+    sock.listen(128)
+    return sock
 
 def http_start():
     """[http_start] Start HTTP server"""
+    global http_server
     logger.info(f"[http_start] HTTP server at http://{HOST}:{PORT_HTTP}")
-    app.run(host="0.0.0.0", port=PORT_HTTP, debug=False)
+    listener = bind_reuse_port(PORT_HTTP) if args.reuse_port else None
+    http_server = make_server("0.0.0.0", PORT_HTTP, app, threaded=True,
+                              fd=listener.fileno() if listener else None)
+    http_server.serve_forever()
+    http_server.server_close()
+    if listener:
+        listener.close()
 
 # ------------------ START ------------------
-if __name__ == "__main__":
+def run_event_loop(main):
+    """[run_event_loop] Run ``main`` on the loop chosen with --loop"""
+    if args.loop != 'asyncio' and uvloop is not None:
+        return uvloop.run(main)
+    if args.loop == 'uvloop':
+        logger.warning("[run_event_loop] uvloop is not installed (pip install uvloop) - using asyncio")
+    return asyncio.run(main)
+
+def print_banner():
+    """[print_banner] Addresses to connect to, once capture is running"""
     print("\n" + "="*70)
     print("  AUDIO STREAMING SERVER")
     print("="*70)
     print(f"  Platform: {get_platform()}")
-    print(f"  Capturing: SYSTEM AUDIO (what you hear, not microphone)")
-    print(f"  Latency: ~100-200ms optimized")
+    print("  Capturing: SYSTEM AUDIO (what you hear, not microphone)")
+    print("  Latency: measure with scripts/setup/probe_latency.py")
     print("="*70)
-    print(f"  🎵 Stream Player:")
+    print("  🎵 Stream Player:")
     print(f"     http://{HOST}:{PORT_HTTP}/stream")
-    print(f"  🔌 WebSocket:")
+    print("  🔌 WebSocket:")
     print(f"     ws://{HOST}:{PORT_WS}")
+    for name in rooms:
+        if name != DEFAULT_ROOM:
+            print(f"  🏠 Room '{name}': http://{HOST}:{PORT_HTTP}/stream/{name}")
     print("="*70)
     print("  This server is managed by launcher.py")
     print("  Press Ctrl+C to stop")
     print("="*70 + "\n")
 
+if __name__ == "__main__":
     try:
+        Thread(target=control_reader, daemon=True).start()
+        if args.standby:
+            # A standby is only useful pre-warmed: open the device before announcing it
+            if not initialize():
+                sys.exit(1)
+            logger.info("[main] Standby: capture device open, waiting for PROMOTE")
+            report_status('STANDBY')
+            promoted.wait()
+        promoted.set()
+
         Thread(target=http_start, daemon=True).start()
-        asyncio.run(ws_main())
+        run_event_loop(ws_main())
+        logger.info("[main] Drained, exiting")
     except KeyboardInterrupt:
         logger.info("[main] Server stopped by user")
         print("\nServer stopped.")
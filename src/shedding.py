@@ -0,0 +1,120 @@
+# shedding.py – Load shedding: drop optional work when the pipeline eats too much of each block period
+import time
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Shed first -> shed last. Restored in the opposite order.
+#   telemetry  level metering for the meters, listener pings
+#   tiers      only one reduced-quality encoding per block: 'mono' listeners get 'low'
+#   coalesce   tolerant listeners get several blocks per message (one send instead of four)
+#   recording  the recorder stops writing; it catches up from the history once restored
+SHED_LEVELS = ('telemetry', 'tiers', 'coalesce', 'recording')
+SHED_HIGH = 0.75          # Share of the block period in use above which the next level is shed
+SHED_LOW = 0.45           # ... below which, held for RESTORE_S, the last shed level is restored
+WINDOW_S = 0.5            # Load is measured over windows of this length
+STEP_S = 1.0              # Minimum time between two shedding steps (lets a step take effect)
+RESTORE_S = 5.0           # Calm this long before restoring one level
+DECISION_HISTORY = 50
+
+
+class LoadShedder:
+    """[LoadShedder] Sheds optional work in SHED_LEVELS order under CPU pressure.
+
+    The broadcaster reports the busy time of every block it handles (capture
+    callback, event-loop wake-up delay and fan-out) with ``add()``. Load is
+    busy time over wall time per WINDOW_S window, so several rooms add up.
+    Above ``high`` the next level is shed (at most once per STEP_S). Once
+    load has stayed below ``low`` for RESTORE_S, the most recently shed level
+    is restored. ``shed`` maps each level to whether it is currently shed and
+    is what the hot paths read. Every decision is counted and kept for
+    ``stats()``. ``high`` = 0 disables shedding.
+    """
+
+    def __init__(self, high=SHED_HIGH, low=SHED_LOW, on_change=None):
+        self.high = high
+        self.low = low
+        self.on_change = on_change      # Called as on_change(level, shed) after every decision
+        self.shed = {level: False for level in SHED_LEVELS}
+        self.depth = 0                  # Number of levels currently shed
+        self.load = 0.0
+        self.peak = 0.0
+        self.busy = 0.0
+        self.window_start = time.perf_counter()
+        self.changed_at = 0.0
+        self.calm_since = None
+        self.overloaded_windows = 0
+        self.counts = {level: {'shed': 0, 'restored': 0, 'seconds': 0.0, 'since': None} for level in SHED_LEVELS}
+        self.decisions = deque(maxlen=DECISION_HISTORY)
+
+    def add(self, seconds):
+        """[LoadShedder.add] Busy seconds spent on one block; re-evaluates once per window"""
+        self.busy += seconds
+        now = time.perf_counter()
+        elapsed = now - self.window_start
+        if elapsed >= WINDOW_S:
+            self.load = self.busy / elapsed
+            self.peak = max(self.peak, self.load)
+            self.busy = 0.0
+            self.window_start = now
+            if self.high > 0:
+                self._evaluate(now)
+
+    def _evaluate(self, now):
+        if self.load > self.high:
+            self.overloaded_windows += 1
+            self.calm_since = None
+            if self.depth < len(SHED_LEVELS) and now - self.changed_at >= STEP_S:
+                self._decide(self.depth, True, now)
+        elif self.load < self.low:
+            if self.calm_since is None:
+                self.calm_since = now
+            elif self.depth and now - self.calm_since >= RESTORE_S:
+                self._decide(self.depth - 1, False, now)
+                self.calm_since = now
+        else:
+            self.calm_since = None  # Between the thresholds: keep what is shed
+
+    def _decide(self, index, shed, now):
+        level = SHED_LEVELS[index]
+        self.shed[level] = shed
+        self.depth = index + 1 if shed else index
+        self.changed_at = now
+        counts = self.counts[level]
+        if shed:
+            counts['shed'] += 1
+            counts['since'] = now
+        else:
+            counts['restored'] += 1
+            counts['seconds'] += now - counts['since']
+            counts['since'] = None
+        self.decisions.append({'time': time.time(), 'level': level,
+                               'action': 'shed' if shed else 'restore', 'load': round(self.load, 3)})
+        log = logger.warning if shed else logger.info
+        log(f"[LoadShedder] {'Shedding' if shed else 'Restoring'} {level} at {self.load:.0%} of the block period")
+        if self.on_change:
+            self.on_change(level, shed)
+
+    def stats(self):
+        """[LoadShedder.stats] Load, current levels and per-level decision counters"""
+        now = time.perf_counter()
+        return {
+            'enabled': self.high > 0,
+            'load': round(self.load, 3),
+            'peak_load': round(self.peak, 3),
+            'high': self.high,
+            'low': self.low,
+            'shed': [level for level in SHED_LEVELS if self.shed[level]],
+            'overloaded_windows': self.overloaded_windows,
+            'levels': {
+                level: {
+                    'active': self.shed[level],
+                    'shed': c['shed'],
+                    'restored': c['restored'],
+                    'seconds': round(c['seconds'] + (now - c['since'] if c['since'] is not None else 0), 1)
+                }
+                for level, c in self.counts.items()
+            },
+            'decisions': list(self.decisions)
+        }
@@ -0,0 +1,268 @@
+# stream_client.py – Asyncio client for the audio stream (headless players, analytics, load tests)
+import json
+import time
+import random
+import asyncio
+from collections import namedtuple
+from urllib.parse import urlsplit, urlunsplit, urlencode, parse_qsl
+import numpy as np
+import websockets
+
+from audio_ring import HEADER_BYTES
+
+# One received block. ``pcm`` is int16 (frames, channels) in the block's own
+# format - channels and sample_rate change when the server switches tiers.
+Block = namedtuple('Block', 'seq captured_ms pcm channels sample_rate tier')
+
+# First reconnect delay per close code; doubles per failed attempt up to RETRY_MAX
+RETRY_BASE = {
+    1012: 0.1,   # Server reload: a replacement is already listening
+    1008: 3.0    # Room unknown or stopped
+}
+DEFAULT_RETRY = 0.5
+RETRY_MAX = 30.0
+
+
+def close_error(reason):
+    """Machine-readable error in a close reason sent by the server (None for a plain close)"""
+    try:
+        error = json.loads(reason).get('error')
+    except (TypeError, ValueError, AttributeError):
+        return None
+    return error if isinstance(error, str) else None
+
+
+def retry_delay(code, reason, attempts):
+    """Jittered exponential backoff (as web/client.html); the server's retry_after hint is a floor"""
+    cap = min(RETRY_MAX, RETRY_BASE.get(code, DEFAULT_RETRY) * 2 ** attempts)
+    delay = cap / 2 + random.random() * cap / 2
+    try:
+        hint = json.loads(reason).get('retry_after')
+    except (TypeError, ValueError, AttributeError):
+        hint = None
+    if isinstance(hint, (int, float)):
+        delay = max(delay, hint * (1 + random.random() * 0.5))
+    return delay
+
+
+class StreamClient:
+    """[StreamClient] Receive a room's stream as an async iterator of blocks.
+
+    Speaks the same protocol as web/client.html: reads the hello and tier
+    messages, answers pings, sends a report every ``report_interval``
+    seconds and reconnects after drops, resuming from the last block seen so
+    the server replays what was missed. The consumer may set ``buffer_s``,
+    ``underruns`` and ``output_ms`` so reports and latency probe echoes
+    reflect its playback; they stay None for a client that does not play.
+    A consumer that plays sets ``startup`` ({"ttfa_ms", "underruns"}) once
+    its first seconds are over; it is reported to the server once.
+
+    With ``decode=False`` blocks are not converted to arrays (``pcm`` is the
+    raw message), which keeps simulated listeners cheap in load tests.
+
+    ``listener_class='tolerant'`` (recorders, relays) tells the server the
+    client does not mind latency: under load it may get several blocks in
+    one message. Such a Block carries all of their PCM and the first seq.
+    """
+
+    def __init__(self, url, report_interval=1.0, reconnect=True, decode=True, listener_class=None):
+        self.url = url
+        self.report_interval = report_interval
+        self.reconnect = reconnect
+        self.decode = decode
+        self.listener_class = listener_class
+
+        self.stream_id = None
+        self.last_seq = None
+        self.hello = None
+        self.tier = 'full'
+        self.channels = None
+        self.sample_rate = None
+        self.block_seconds = None
+        self.block_frames = None # Frames per block in the current tier
+        self.buffer_s = None     # Set by the consumer (playback buffer level)
+        self.underruns = None    # Set by the consumer
+        self.output_ms = None    # Set by the consumer (output device latency)
+        self.startup = None      # Set by the consumer (time to first audio, early underruns)
+        self._startup_sent = False
+        self._burst = 0          # Blocks left of the server's prebuffer burst
+        self._probe = None       # Latency probe announced for an upcoming block
+        self._count = 1          # Blocks in the last message
+
+        self.blocks = 0
+        self.bytes = 0
+        self.gaps = 0            # Blocks missing between consecutive sequence numbers
+        self.jitter_ms = 0.0     # Smoothed arrival interval deviation (RFC 3550 style)
+        self.connects = 0
+        self.attempts = 0        # Failed connects since audio last arrived
+        self.last_close = None
+        self.last_error = None   # Machine-readable reason of the last refusal ("full", "too_many_connections", ...)
+        self.tier_switches = 0
+        self._last_arrival = None
+        self._ws = None
+        self._closing = False
+
+    def connect_url(self):
+        """[StreamClient.connect_url] URL for the next connection, resuming after the last block"""
+        resuming = self.stream_id is not None and self.last_seq is not None
+        if not resuming and self.listener_class is None:
+            return self.url
+        parts = urlsplit(self.url)
+        query = dict(parse_qsl(parts.query))
+        if self.listener_class is not None:
+            query['class'] = self.listener_class
+        if resuming:
+            query.pop('behind', None)
+            query.update(resume=(self.last_seq + 1) & 0xFFFFFFFF, stream=self.stream_id)
+        return urlunsplit(parts._replace(query=urlencode(query)))
+
+    async def close(self):
+        """[StreamClient.close] Stop iterating and close the connection"""
+        self._closing = True
+        if self._ws is not None:
+            await self._ws.close()
+
+    def stats(self):
+        """[StreamClient.stats] Counters since the client was created"""
+        return {
+            'blocks': self.blocks,
+            'bytes': self.bytes,
+            'gaps': self.gaps,
+            'jitter_ms': round(self.jitter_ms, 2),
+            'connects': self.connects,
+            'tier': self.tier,
+            'tier_switches': self.tier_switches,
+            'last_close': self.last_close,
+            'last_error': self.last_error
+        }
+
+    def __aiter__(self):
+        return self.receive()
+
+    async def receive(self):
+        """[StreamClient.receive] Yield Blocks until closed (or the first disconnect without ``reconnect``)"""
+        while not self._closing:
+            code, reason = 1006, None
+            try:
+                async with websockets.connect(self.connect_url(), max_size=None) as ws:
+                    self._ws = ws
+                    self.connects += 1
+                    self._last_arrival = None
+                    reporter = asyncio.ensure_future(self._report(ws))
+                    try:
+                        async for message in ws:
+                            if isinstance(message, str):
+                                await self._control(ws, json.loads(message))
+                            else:
+                                block = self._block(message)
+                                if self._probe is not None and self._probe_due(block):
+                                    await self._echo_probe(ws)
+                                yield block
+                    finally:
+                        reporter.cancel()
+                code, reason = ws.close_code, ws.close_reason
+                self.last_close = code
+                self.last_error = close_error(reason)
+                if code == 1000:
+                    return
+            except websockets.exceptions.ConnectionClosed as e:
+                if e.rcvd is not None:
+                    code, reason = e.rcvd.code, e.rcvd.reason
+                self.last_close = code
+                self.last_error = close_error(reason)
+            except (OSError, websockets.exceptions.InvalidHandshake) as e:
+                self.last_close = str(e)
+            finally:
+                self._ws = None
+            if not self.reconnect or self._closing:
+                return
+            await asyncio.sleep(retry_delay(code, reason, self.attempts))
+            self.attempts += 1
+
+    def _block(self, message):
+        # A coalesced message (tolerant clients under load) holds several blocks after one header
+        frames = (len(message) - HEADER_BYTES) // (2 * self.channels)
+        count = max(1, round(frames / self.block_frames)) if self.block_frames else 1
+        self._count = count
+
+        arrival = time.perf_counter()
+        if self._burst > 0:
+            # The prebuffer burst arrives back to back by design: not jitter
+            self._burst -= count
+            arrival = None
+        elif self._last_arrival is not None and self.block_seconds:
+            deviation = abs(arrival - self._last_arrival - self.block_seconds * count) * 1000
+            self.jitter_ms += (deviation - self.jitter_ms) / 16
+        self._last_arrival = arrival
+
+        header = np.frombuffer(message, dtype='<u4', count=2)
+        seq, captured_ms = int(header[0]), int(header[1])
+        if self.last_seq is not None:
+            self.gaps += max(0, ((seq - self.last_seq) & 0xFFFFFFFF) - 1)
+        self.last_seq = (seq + count - 1) & 0xFFFFFFFF
+        self.attempts = 0
+        self.blocks += count
+        self.bytes += len(message)
+
+        pcm = message
+        if self.decode:
+            pcm = np.frombuffer(message, dtype=np.int16, offset=HEADER_BYTES).reshape(-1, self.channels)
+        return Block(seq, captured_ms, pcm, self.channels, self.sample_rate, self.tier)
+
+    async def _control(self, ws, msg):
+        kind = msg.get('type')
+        if kind == 'hello':
+            if msg['stream'] != self.stream_id:
+                self.last_seq = None  # New server run: fresh numbering
+            self.stream_id = msg['stream']
+            self.hello = msg
+            self.tier = 'full'
+            self.channels = msg['channels']
+            self.sample_rate = msg['sample_rate']
+            self.block_seconds = msg['block'] / msg['sample_rate']
+            self.block_frames = msg['block']
+            self._burst = msg.get('prebuffer', 0)
+        elif kind == 'tier':
+            # Applies from the next block on
+            self.tier = msg['tier']
+            self.channels = msg['channels']
+            self.sample_rate = msg['sample_rate']
+            self.block_frames = self.hello['block'] * msg['sample_rate'] // self.hello['sample_rate']
+            self.tier_switches += 1
+        elif kind == 'probe':
+            self._probe = msg
+        elif kind == 'ping':
+            await ws.send(json.dumps({'type': 'pong', 'id': msg.get('id'), **self._report_fields()}))
+
+    def _probe_due(self, block):
+        return (self._probe['seq'] - block.seq) & 0xFFFFFFFF < self._count
+
+    async def _echo_probe(self, ws):
+        # Echoed on arrival; the buffer level says how long until it is heard
+        await ws.send(json.dumps({
+            'type': 'probe_echo',
+            'id': self._probe['id'],
+            'buffer_ms': (self.buffer_s or 0) * 1000,
+            'output_ms': self.output_ms or 0,
+            'played': False
+        }))
+        self._probe = None
+
+    def _report_fields(self):
+        fields = {'jitter': round(self.jitter_ms, 2)}
+        if self.buffer_s is not None:
+            fields['buffer'] = self.buffer_s
+        if self.underruns is not None:
+            fields['underruns'] = self.underruns
+        return fields
+
+    async def _report(self, ws):
+        while self.report_interval:
+            await asyncio.sleep(self.report_interval)
+            try:
+                await ws.send(json.dumps({'type': 'report', **self._report_fields()}))
+                if self.startup is not None and not self._startup_sent:
+                    await ws.send(json.dumps({'type': 'startup', **self.startup}))
+                    self._startup_sent = True
+            except websockets.exceptions.ConnectionClosed:
+                return
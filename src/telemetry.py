@@ -0,0 +1,70 @@
+# telemetry.py – Level and spectrum metering computed once per stream
+import numpy as np
+
+FLOOR_DB = -90.0
+
+
+def to_db(values, reference):
+    """Amplitudes -> dBFS rounded for the wire, floored at FLOOR_DB"""
+    with np.errstate(divide='ignore'):
+        db = 20 * np.log10(np.asarray(values) / reference)
+    return [round(float(v), 1) for v in np.maximum(db, FLOOR_DB)]
+
+
+class LevelMeter:
+    """[LevelMeter] Peak / RMS per channel and a coarse band spectrum.
+
+    ``update()`` runs on every block but only keeps running peak and energy
+    sums; the FFT is computed once per ``interval`` on the newest block, when
+    a new reading is published. Bands are log-spaced from ``low`` Hz to
+    Nyquist and reported in dB relative to a full-scale sine.
+    """
+
+    def __init__(self, frames, channels, rate, bands=16, interval=0.1, low=40.0):
+        self.frames = frames
+        self.every = max(1, round(interval * rate / frames))
+        self.work = np.empty((frames, channels), dtype=np.float32)
+        self.mono = np.empty(frames, dtype=np.float32)
+        self.window = np.hanning(frames).astype(np.float32)
+        self.peak = np.zeros(channels, dtype=np.float32)
+        self.energy = np.zeros(channels, dtype=np.float64)
+        self.count = 0
+
+        # FFT bin ranges per band; duplicate edges collapse at small block sizes
+        freqs = np.fft.rfftfreq(frames, 1 / rate)
+        edges = np.searchsorted(freqs, np.geomspace(low, rate / 2, bands + 1))
+        self.starts = np.unique(np.clip(edges[:-1], 1, len(freqs) - 1))
+        self.band_freqs = [round(float(freqs[i])) for i in self.starts]
+        # Band energy of a full-scale sine through the Hann window (Parseval): N * sqrt(3/32) * 32768
+        self.spectrum_ref = frames * np.sqrt(3 / 32) * 32768
+
+        self.latest = None
+        self.readings = 0
+
+    def update(self, block):
+        """[LevelMeter.update] Account one int16 block; True when a new reading is ready"""
+        np.copyto(self.work, block, casting='unsafe')
+        np.maximum(self.peak, np.abs(self.work).max(axis=0), out=self.peak)
+        self.energy += np.einsum('ij,ij->j', self.work, self.work)
+        self.count += 1
+        if self.count < self.every:
+            return False
+
+        np.mean(self.work, axis=1, out=self.mono)
+        self.mono *= self.window
+        power = np.abs(np.fft.rfft(self.mono)) ** 2
+        bands = np.sqrt(np.add.reduceat(power, self.starts))
+
+        self.readings += 1
+        self.latest = {
+            'type': 'levels',
+            'seq': self.readings,
+            'peak_db': to_db(self.peak, 32768),
+            'rms_db': to_db(np.sqrt(self.energy / (self.count * self.frames)), 32768),
+            'bands_db': to_db(bands, self.spectrum_ref),
+            'band_hz': self.band_freqs
+        }
+        self.peak.fill(0)
+        self.energy.fill(0)
+        self.count = 0
+        return True
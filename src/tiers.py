@@ -0,0 +1,145 @@
+# tiers.py – Quality tiers for listeners on weak links, chosen from player feedback
+import numpy as np
+
+from audio_ring import HEADER_BYTES
+
+# Best first. Every tier keeps the block duration, so sequence numbers and
+# timing are shared; only channels and sample rate change.
+TIERS = ('full', 'mono', 'low')
+TIER_FORMATS = {
+    'full': {'channels': None, 'rate_divisor': 1},  # As captured
+    'mono': {'channels': 1, 'rate_divisor': 1},     # Half the bandwidth of stereo
+    'low': {'channels': 1, 'rate_divisor': 2}       # A quarter: mono at half the sample rate
+}
+
+# Switching thresholds. The gap between the "unhealthy" and "healthy" limits
+# is the hysteresis band: inside it a listener stays where it is.
+DOWN_BUFFER_S = 0.06      # Player buffer below this -> step down
+DOWN_JITTER_MS = 60       # Arrival jitter above this -> step down
+UP_BUFFER_S = 0.15        # ... and above this (with low jitter and no losses) counts as healthy
+UP_JITTER_MS = 25
+UP_AFTER_S = 20           # Healthy this long before stepping back up
+HOLD_S = 3                # Minimum time on a tier before the next step down
+
+
+def tier_format(tier, channels, rate):
+    """Wire format of ``tier`` for a stream captured with ``channels`` at ``rate``"""
+    spec = TIER_FORMATS[tier]
+    return {'channels': spec['channels'] or channels, 'sample_rate': rate // spec['rate_divisor']}
+
+
+class TierEncoder:
+    """[TierEncoder] Reduced-quality copies of ring blocks, encoded once per block.
+
+    ``encode()`` returns the ring's own view for ``full`` and otherwise a
+    preallocated buffer holding the same 8-byte header followed by the
+    downmixed (and for ``low`` 2:1 decimated) PCM. Each tier is encoded at
+    most once per sequence number however many listeners use it.
+    """
+
+    def __init__(self, ring):
+        self.ring = ring
+        frames = ring.frames
+        self.pairs = frames // 2
+        self.sum = np.empty(frames, dtype=np.int32)
+        self.half = np.empty(self.pairs, dtype=np.int32)
+        self.summed = -1
+        self.buffers = {
+            'mono': np.zeros(HEADER_BYTES + frames * 2, dtype=np.uint8),
+            'low': np.zeros(HEADER_BYTES + self.pairs * 2, dtype=np.uint8)
+        }
+        self.headers = {tier: buf[:HEADER_BYTES].view('<u4') for tier, buf in self.buffers.items()}
+        self.pcm = {tier: buf[HEADER_BYTES:].view(np.int16) for tier, buf in self.buffers.items()}
+        self.views = {tier: memoryview(buf) for tier, buf in self.buffers.items()}
+        self.encoded = {tier: -1 for tier in self.buffers}
+
+    def encode(self, tier, seq):
+        """[TierEncoder.encode] Bytes view of block ``seq`` in ``tier`` (valid until the next block)"""
+        ring = self.ring
+        if tier == 'full':
+            return ring.view(seq)
+        if self.encoded[tier] != seq:
+            if self.summed != seq:
+                # Channel average, kept in int32 until the final narrowing copy
+                np.sum(ring.array(seq), axis=1, dtype=np.int32, out=self.sum)
+                if ring.channels > 1:
+                    np.floor_divide(self.sum, ring.channels, out=self.sum)
+                self.summed = seq
+            if tier == 'mono':
+                np.copyto(self.pcm[tier], self.sum, casting='unsafe')
+            else:
+                # Average sample pairs: a 2-tap low-pass before halving the rate
+                n = self.pairs * 2
+                np.add(self.sum[0:n:2], self.sum[1:n:2], out=self.half)
+                np.right_shift(self.half, 1, out=self.half)
+                np.copyto(self.pcm[tier], self.half, casting='unsafe')
+            self.headers[tier][:] = ring.headers[seq % ring.slots]
+            self.encoded[tier] = seq
+        return self.views[tier]
+
+
+class TierController:
+    """[TierController] Per-listener tier choice with hysteresis.
+
+    Fed with the player's reports (buffer level, underrun count, arrival
+    jitter) and the server's view of the connection (bytes queued in the
+    socket, blocks dropped). Any sign of trouble steps down one tier, at most
+    once per ``HOLD_S``; stepping back up needs ``UP_AFTER_S`` of clean
+    reports. ``update()`` returns ``(tier, reason)`` when the tier changes.
+    """
+
+    def __init__(self, queue_limit, tier='full'):
+        self.queue_limit = queue_limit
+        self.tier = tier
+        self.changed_at = 0.0
+        self.healthy_since = None
+        self.underruns = None   # Last counts seen, to detect new losses
+        self.drops = 0
+        self.switches = 0
+
+    def update(self, now, buffer_s=None, underruns=None, jitter_ms=None, queue_bytes=0, drops=0):
+        """[TierController.update] Re-evaluate after a report; (tier, reason) on a switch, else None"""
+        new_underruns = underruns - self.underruns if underruns is not None and self.underruns is not None else 0
+        new_drops = drops - self.drops
+        if underruns is not None:
+            self.underruns = underruns
+        self.drops = drops
+
+        trouble = None
+        if new_underruns > 0:
+            trouble = f"{new_underruns} underrun(s)"
+        elif new_drops > 0:
+            trouble = f"{new_drops} block(s) dropped on a full send queue"
+        elif queue_bytes > self.queue_limit // 2:
+            trouble = f"send queue at {queue_bytes // 1024} KB"
+        elif buffer_s is not None and buffer_s < DOWN_BUFFER_S:
+            trouble = f"player buffer at {buffer_s * 1000:.0f} ms"
+        elif jitter_ms is not None and jitter_ms > DOWN_JITTER_MS:
+            trouble = f"arrival jitter {jitter_ms:.0f} ms"
+
+        if trouble:
+            self.healthy_since = None
+            if now - self.changed_at >= HOLD_S:
+                return self._step(1, now, trouble)
+            return None
+
+        healthy = ((buffer_s is None or buffer_s >= UP_BUFFER_S)
+                   and (jitter_ms is None or jitter_ms <= UP_JITTER_MS)
+                   and queue_bytes <= self.queue_limit // 8)
+        if not healthy:
+            self.healthy_since = None  # Hysteresis band: hold the current tier
+        elif self.healthy_since is None:
+            self.healthy_since = now
+        elif now - self.healthy_since >= UP_AFTER_S:
+            self.healthy_since = now
+            return self._step(-1, now, f"healthy for {UP_AFTER_S}s")
+        return None
+
+    def _step(self, direction, now, reason):
+        index = TIERS.index(self.tier) + direction
+        if not 0 <= index < len(TIERS):
+            return None
+        self.tier = TIERS[index]
+        self.changed_at = now
+        self.switches += 1
+        return self.tier, reason
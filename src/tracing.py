@@ -0,0 +1,116 @@
+# tracing.py – Per-stage timing of the streaming pipeline and an on-demand sampling profiler
+import os
+import sys
+import time
+import threading
+from collections import Counter
+import numpy as np
+
+perf_counter = time.perf_counter
+
+
+class StageTracer:
+    """[StageTracer] Recent durations of each pipeline stage in fixed-size rings.
+
+    Callers bracket a stage with ``now()`` / ``lap()``; both return 0 and
+    record nothing while disabled, so the instrumentation costs a method call
+    per stage when off. Each stage must have a single writer thread (capture
+    stages are written by the PortAudio callback, the rest by the event loop).
+    """
+
+    def __init__(self, stages, size=2048, enabled=False):
+        self.stages = tuple(stages)
+        self.index = {stage: i for i, stage in enumerate(self.stages)}
+        self.size = size
+        self.samples = np.zeros((len(self.stages), size), dtype=np.float32)
+        self.counts = [0] * len(self.stages)
+        self.enabled = enabled
+
+    def now(self):
+        """[StageTracer.now] Start time for ``lap()`` (0 while disabled)"""
+        return perf_counter() if self.enabled else 0.0
+
+    def lap(self, stage, started):
+        """[StageTracer.lap] Record ``stage`` as ending now; returns the start time for the next stage"""
+        if not self.enabled:
+            return 0.0
+        now = perf_counter()
+        if started:
+            self.record(stage, now - started)
+        return now
+
+    def record(self, stage, seconds):
+        """[StageTracer.record] Add one duration (seconds) to ``stage``"""
+        i = self.index[stage]
+        self.samples[i, self.counts[i] % self.size] = seconds
+        self.counts[i] += 1
+
+    def reset(self):
+        """[StageTracer.reset] Forget all samples"""
+        self.counts = [0] * len(self.stages)
+
+    def summary(self):
+        """[StageTracer.summary] p50 / p99 / max / mean per stage over the recent samples, in µs"""
+        result = {}
+        for i, stage in enumerate(self.stages):
+            n = min(self.counts[i], self.size)
+            if n == 0:
+                result[stage] = {'count': self.counts[i], 'window': 0}
+                continue
+            window = self.samples[i, :n] * 1e6
+            p50, p99 = np.percentile(window, (50, 99))
+            result[stage] = {
+                'count': self.counts[i],
+                'window': n,
+                'p50_us': round(float(p50), 1),
+                'p99_us': round(float(p99), 1),
+                'max_us': round(float(window.max()), 1),
+                'mean_us': round(float(window.mean()), 1)
+            }
+        return result
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def sample_profile(seconds, interval=0.005, top=25, max_stacks=200):
+    """[sample_profile] Sample every thread's stack for ``seconds``; hottest functions and folded stacks.
+
+    ``own`` counts samples where a function was running, ``total`` where it
+    was anywhere on the stack. ``stacks`` uses the folded format
+    (``thread;outer;...;inner``) read by flamegraph tools.
+    """
+    me = threading.get_ident()
+    own = Counter()
+    total = Counter()
+    stacks = Counter()
+    samples = 0
+    deadline = perf_counter() + seconds
+
+    while perf_counter() < deadline:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(frame_label(frame))
+                frame = frame.f_back
+            if not labels:
+                continue
+            own[labels[0]] += 1
+            total.update(set(labels))
+            stacks[';'.join([names.get(ident, str(ident))] + labels[::-1])] += 1
+        samples += 1
+        time.sleep(interval)
+
+    return {
+        'seconds': seconds,
+        'interval_ms': interval * 1000,
+        'samples': samples,
+        'own': [{'function': f, 'samples': n, 'pct': round(n / samples * 100, 1)} for f, n in own.most_common(top)],
+        'total': [{'function': f, 'samples': n, 'pct': round(n / samples * 100, 1)} for f, n in total.most_common(top)],
+        'stacks': [f"{stack} {n}" for stack, n in stacks.most_common(max_stacks)]
+    }